@@ -0,0 +1,212 @@
+"""
+In-process client for the adb host protocol (the server on localhost:5037).
+
+Every request is a 4-hex-digit length followed by the service name; the server
+answers OKAY or FAIL + length-prefixed message. Talking to it directly avoids
+spawning adb.exe for every query. Results are returned as
+subprocess.CompletedProcess so callers can treat them exactly like `_run`.
+"""
+import os, socket, subprocess
+
+ADB_SERVER_HOST = "127.0.0.1"
+ADB_SERVER_PORT = int(os.environ.get("ANDROID_ADB_SERVER_PORT") or 5037)
+SOCKET_TIMEOUT_SEC = 6
+
+_RC_MARKER = ":LVC_RC:"  # נוסף לסוף כל פקודת shell כדי לקבל exit code
+
+
+class AdbError(Exception):
+    """The server answered FAIL, or spoke something we do not understand."""
+
+
+class Unsupported(Exception):
+    """The adb command has no host-protocol equivalent here; use adb.exe."""
+
+
+# ---------- wire protocol ----------
+
+def _recv_exact(sock: socket.socket, n: int) -> bytes:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            raise AdbError("adb server closed the connection")
+        buf += chunk
+    return bytes(buf)
+
+def _recv_all(sock: socket.socket) -> bytes:
+    chunks = []
+    while True:
+        chunk = sock.recv(65536)
+        if not chunk:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+def _send(sock: socket.socket, service: str):
+    data = service.encode("utf-8")
+    sock.sendall(b"%04x" % len(data) + data)
+
+def read_block(sock: socket.socket) -> str:
+    size = int(_recv_exact(sock, 4), 16)
+    return _recv_exact(sock, size).decode("utf-8", errors="ignore")
+
+def _read_status(sock: socket.socket):
+    status = _recv_exact(sock, 4)
+    if status == b"OKAY":
+        return
+    if status == b"FAIL":
+        raise AdbError(read_block(sock))
+    raise AdbError(f"unexpected reply from adb server: {status!r}")
+
+def open_connection(timeout: float = SOCKET_TIMEOUT_SEC) -> socket.socket:
+    """
+    Connect to the adb server. Raises OSError when nothing listens, which is
+    the caller's cue to fall back to adb.exe (that also starts the server).
+    """
+    return socket.create_connection((ADB_SERVER_HOST, ADB_SERVER_PORT), timeout=timeout)
+
+def request(service: str, timeout: float = SOCKET_TIMEOUT_SEC) -> socket.socket:
+    """Open a connection and send one service request; returns the socket after OKAY."""
+    sock = open_connection(timeout)
+    try:
+        _send(sock, service)
+        _read_status(sock)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+def open_transport(serial: str | None, timeout: float = SOCKET_TIMEOUT_SEC) -> socket.socket:
+    """Switch a fresh connection to the given device (or the only one); device services follow."""
+    service = f"host:transport:{serial}" if serial else "host:transport-any"
+    return request(service, timeout)
+
+def _timeout_guard(args, timeout, fn):
+    try:
+        return fn()
+    except socket.timeout as e:
+        # אותה התנהגות כמו subprocess.run(timeout=...)
+        raise subprocess.TimeoutExpired(["adb", *args], timeout) from e
+
+
+# ---------- host services ----------
+
+def host_query(service: str, timeout: float = SOCKET_TIMEOUT_SEC) -> str:
+    """A host:* service that replies with one length-prefixed block."""
+    def go():
+        with request(service, timeout) as sock:
+            return read_block(sock)
+    return _timeout_guard([service], timeout, go)
+
+def server_version(timeout: float = SOCKET_TIMEOUT_SEC) -> int:
+    """The running server's protocol version (`host:version`, 4 hex digits: 0029 → 41)."""
+    return int(host_query("host:version", timeout), 16)
+
+def devices_output(timeout: float = SOCKET_TIMEOUT_SEC) -> str:
+    """Same text as `adb devices -l` (including the header line)."""
+    return "List of devices attached\n" + host_query("host:devices-l", timeout)
+
+def wait_for(transport: str = "usb", state: str = "device", serial: str | None = None,
+             timeout: float = SOCKET_TIMEOUT_SEC):
+    """
+    `adb wait-for-<transport>-<state>`: the server answers a second OKAY once a
+    matching device is there. subprocess.TimeoutExpired if it is not by then.
+    """
+    service = f"{f'host-serial:{serial}:' if serial else 'host:'}wait-for-{transport}-{state}"
+    def go():
+        with request(service, timeout) as sock:
+            _read_status(sock)
+    _timeout_guard([service], timeout, go)
+
+def connect(target: str, timeout: float = SOCKET_TIMEOUT_SEC) -> str:
+    return host_query(f"host:connect:{target}", timeout)
+
+def disconnect(target: str, timeout: float = SOCKET_TIMEOUT_SEC) -> str:
+    return host_query(f"host:disconnect:{target}", timeout)
+
+
+# ---------- device services ----------
+
+def open_service(serial: str | None, service: str, timeout: float = SOCKET_TIMEOUT_SEC) -> socket.socket:
+    """Start a device service and hand back its stream (the caller reads, writes and closes it)."""
+    sock = open_transport(serial, timeout)
+    try:
+        _send(sock, service)
+        _read_status(sock)
+    except BaseException:
+        sock.close()
+        raise
+    return sock
+
+def device_service(serial: str | None, service: str, timeout: float = SOCKET_TIMEOUT_SEC) -> str:
+    """Run a device service (shell:, tcpip:, usb:) and read until the device closes it."""
+    def go():
+        with open_service(serial, service, timeout) as sock:
+            return _recv_all(sock).decode("utf-8", errors="ignore")
+    return _timeout_guard([service], timeout, go)
+
+def shell(serial: str | None, command: str, timeout: float = SOCKET_TIMEOUT_SEC) -> subprocess.CompletedProcess:
+    """
+    `adb [-s <serial>] shell <command>`. The legacy shell protocol carries no exit
+    status, so we echo it after the command and strip it from the output.
+    """
+    args = (["-s", serial] if serial else []) + ["shell", command]
+    out = device_service(serial, f"shell:{command}; echo {_RC_MARKER}$?", timeout)
+    out = out.replace("\r\n", "\n")
+    body, sep, tail = out.rpartition(_RC_MARKER)
+    if not sep:
+        return subprocess.CompletedProcess(args, 1, out, "")
+    try:
+        rc = int(tail.strip() or 1)
+    except ValueError:
+        rc = 1
+    return subprocess.CompletedProcess(args, rc, body, "")
+
+
+# ---------- adb argv -> host protocol ----------
+
+def _completed(args, stdout="", stderr="", rc=0):
+    return subprocess.CompletedProcess(["adb", *args], rc, stdout, stderr)
+
+def run(args: list[str], timeout: float = SOCKET_TIMEOUT_SEC) -> subprocess.CompletedProcess:
+    """
+    Execute an adb command line (without the adb executable) over the host
+    protocol. Supports: devices [-l], connect HOST:PORT, disconnect [HOST:PORT],
+    and [-s SERIAL] shell ... / tcpip PORT / usb / wait-for-TRANSPORT-STATE.
+    Raises OSError if the server is not reachable and Unsupported for anything else.
+    """
+    args = list(args)
+    serial = None
+    rest = args
+    if len(rest) >= 2 and rest[0] == "-s":
+        serial, rest = rest[1], rest[2:]
+    if not rest:
+        raise Unsupported(args)
+    cmd, params = rest[0], rest[1:]
+
+    try:
+        if cmd == "devices" and serial is None:
+            return _completed(args, devices_output(timeout))
+        if cmd.startswith("wait-for-") and cmd.count("-") == 3 and not params:
+            _, _, transport, state = cmd.split("-")
+            wait_for(transport, state, serial, timeout)
+            return _completed(args)
+        if cmd == "connect" and len(params) == 1:
+            msg = connect(params[0], timeout)
+            rc = 0 if ("connected to" in msg.lower()) else 1
+            return _completed(args, msg + "\n", rc=rc)
+        if cmd == "disconnect" and len(params) <= 1:
+            msg = disconnect(params[0] if params else "", timeout)
+            return _completed(args, msg + "\n")
+        if cmd == "shell" and params:
+            res = shell(serial, " ".join(params), timeout)
+            res.args = ["adb", *args]
+            return res
+        if cmd == "tcpip" and len(params) == 1:
+            return _completed(args, device_service(serial, f"tcpip:{params[0]}", timeout))
+        if cmd == "usb" and not params:
+            return _completed(args, device_service(serial, "usb:", timeout))
+    except AdbError as e:
+        # כמו adb.exe: שגיאה מהשרת → קוד יציאה 1 והודעה ב-stderr
+        return _completed(args, "", f"adb: error: {e}\n", rc=1)
+    raise Unsupported(args)
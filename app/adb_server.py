@@ -0,0 +1,327 @@
+"""
+The one adb server LoginVRCast talks to.
+
+Android Studio, Meta Quest Developer Hub and SideQuest ship their own adb.
+When two adb versions share port 5037 each client kills the other's server
+("adb server version (40) doesn't match this client (41); killing..."), every
+status tick stalls for seconds and Wi‑Fi headsets drop. AdbServer:
+
+  * starts the server once, in the background at launch — callers that need
+    it meanwhile wait for that start instead of spawning their own;
+  * compares the running server's version (`host:version`, no process spawned)
+    with the bundled adb and notices when the server keeps being restarted;
+  * lists the other adb executables running or installed on this PC, with
+    their versions, so the report names the tool that fights over the server;
+  * optionally runs our server on a dedicated port (`--adb-port PORT` or
+    LOGINVRCAST_ADB_PORT): ANDROID_ADB_SERVER_PORT is set for the in-process
+    client and in the environment every adb / scrcpy spawn inherits, so the
+    other tools keep 5037 to themselves.
+"""
+import ctypes, os, re, shutil, subprocess, threading, time
+from collections import deque
+
+from app import adb_client
+
+PORT_ENV = "ANDROID_ADB_SERVER_PORT"   # adb ו-scrcpy קוראים אותו בעצמם
+DEDICATED_PORT_ENV = "LOGINVRCAST_ADB_PORT"
+PORT_FLAG = "--adb-port"
+DEFAULT_PORT = 5037
+SUGGESTED_PORT = 5038
+
+START_TIMEOUT_SEC = 10
+VERSION_TIMEOUT_SEC = 3
+RESTART_WINDOW_SEC = 60
+RESTARTS_IN_WINDOW = 3   # יותר הפעלות מזה בדקה = מישהו אחר סוגר לנו את השרת
+
+_VERSION_RE = re.compile(r"Android Debug Bridge version \d+\.\d+\.(\d+)")
+
+# מיקומי התקנה מוכרים (Android Studio, MQDH, SideQuest): (משתנה סביבה / בית, נתיב יחסי)
+_KNOWN = [
+    ("LOCALAPPDATA", r"Android\Sdk\platform-tools\adb.exe"),
+    ("~", "Android/Sdk/platform-tools/adb"),
+    ("~", "Library/Android/sdk/platform-tools/adb"),
+    ("ProgramFiles", r"Meta Quest Developer Hub\resources\bin\adb.exe"),
+    ("LOCALAPPDATA", r"Programs\Meta Quest Developer Hub\resources\bin\adb.exe"),
+    ("LOCALAPPDATA", r"Programs\SideQuest\resources\app.asar.unpacked\build\platform-tools\adb.exe"),
+    ("ProgramFiles", r"SideQuest\resources\app.asar.unpacked\build\platform-tools\adb.exe"),
+]
+
+
+def tool_of(path: str) -> str:
+    p = path.lower().replace("\\", "/")
+    if "sidequest" in p:
+        return "SideQuest"
+    if "quest developer hub" in p or "oculus developer hub" in p:
+        return "Meta Quest Developer Hub"
+    if "/sdk/platform-tools" in p or "android studio" in p:
+        return "Android Studio / SDK"
+    if "scrcpy" in p:
+        return "scrcpy"
+    return "adb"
+
+
+def parse_version(text: str) -> int | None:
+    """`adb version` output → the protocol version the server reports (1.0.41 → 41)."""
+    m = _VERSION_RE.search(text or "")
+    return int(m.group(1)) if m else None
+
+
+def port_from(argv: list[str]) -> int | None:
+    """Dedicated server port from `--adb-port PORT` / `--adb-port=PORT`, else LOGINVRCAST_ADB_PORT."""
+    value = os.environ.get(DEDICATED_PORT_ENV)
+    for i, arg in enumerate(argv):
+        if arg == PORT_FLAG and i + 1 < len(argv):
+            value = argv[i + 1]
+        elif arg.startswith(PORT_FLAG + "="):
+            value = arg.split("=", 1)[1]
+    return int(value) if value and value.isdigit() and 0 < int(value) < 65536 else None
+
+
+def configure(port: int | None):
+    """Use this server port everywhere; call before anything talks to adb."""
+    if port is None:
+        return
+    adb_client.ADB_SERVER_PORT = port
+    os.environ[PORT_ENV] = str(port)   # ה-env של כל adb/scrcpy שמופעל מכאן
+
+
+def _same(a: str, b: str) -> bool:
+    try:
+        return os.path.normcase(os.path.realpath(a)) == os.path.normcase(os.path.realpath(b))
+    except (OSError, ValueError):
+        return False
+
+
+# ---------- running adb processes: [(pid, path or None)] ----------
+
+def _running_linux() -> list[tuple[int, str | None]]:
+    found = []
+    for pid in filter(str.isdigit, os.listdir("/proc")):
+        try:
+            with open(f"/proc/{pid}/comm") as f:
+                if f.read().strip() != "adb":
+                    continue
+        except OSError:
+            continue
+        try:
+            path = os.readlink(f"/proc/{pid}/exe")
+        except OSError:
+            path = None   # תהליך של משתמש אחר
+        found.append((int(pid), path))
+    return found
+
+
+def _running_windows() -> list[tuple[int, str | None]]:
+    class Entry(ctypes.Structure):
+        _fields_ = [("dwSize", ctypes.c_ulong), ("cntUsage", ctypes.c_ulong),
+                    ("th32ProcessID", ctypes.c_ulong), ("th32DefaultHeapID", ctypes.c_size_t),
+                    ("th32ModuleID", ctypes.c_ulong), ("cntThreads", ctypes.c_ulong),
+                    ("th32ParentProcessID", ctypes.c_ulong), ("pcPriClassBase", ctypes.c_long),
+                    ("dwFlags", ctypes.c_ulong), ("szExeFile", ctypes.c_wchar * 260)]
+
+    k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+    k32.CreateToolhelp32Snapshot.restype = ctypes.c_void_p
+    k32.OpenProcess.restype = ctypes.c_void_p
+    snap = k32.CreateToolhelp32Snapshot(0x2, 0)   # TH32CS_SNAPPROCESS
+    if not snap or snap == ctypes.c_void_p(-1).value:
+        return []
+    snap = ctypes.c_void_p(snap)
+    found = []
+    try:
+        entry = Entry(dwSize=ctypes.sizeof(Entry))
+        ok = k32.Process32FirstW(snap, ctypes.byref(entry))
+        while ok:
+            if entry.szExeFile.lower() == "adb.exe":
+                path = None
+                h = k32.OpenProcess(0x1000, False, entry.th32ProcessID)  # PROCESS_QUERY_LIMITED_INFORMATION
+                if h:
+                    h = ctypes.c_void_p(h)
+                    buf = ctypes.create_unicode_buffer(1024)
+                    size = ctypes.c_ulong(len(buf))
+                    if k32.QueryFullProcessImageNameW(h, 0, buf, ctypes.byref(size)):
+                        path = buf.value
+                    k32.CloseHandle(h)
+                found.append((entry.th32ProcessID, path))
+            ok = k32.Process32NextW(snap, ctypes.byref(entry))
+    finally:
+        k32.CloseHandle(snap)
+    return found
+
+
+def running_adbs() -> list[tuple[int, str | None]]:
+    try:
+        if os.name == "nt":
+            return _running_windows()
+        if os.path.isdir("/proc"):
+            return _running_linux()
+    except OSError:
+        pass
+    return []
+
+
+def installed_adbs() -> list[str]:
+    """adb executables in the usual tool locations, ANDROID_HOME / ANDROID_SDK_ROOT and on PATH."""
+    paths = []
+    for base, rel in _KNOWN:
+        root = os.path.expanduser("~") if base == "~" else os.environ.get(base)
+        if root and (os.sep == "\\") == ("\\" in rel):
+            paths.append(os.path.join(root, rel))
+    exe = "adb.exe" if os.name == "nt" else "adb"
+    for env in ("ANDROID_HOME", "ANDROID_SDK_ROOT"):
+        if os.environ.get(env):
+            paths.append(os.path.join(os.environ[env], "platform-tools", exe))
+    on_path = shutil.which("adb")
+    if on_path:
+        paths.append(on_path)
+    unique = []
+    for p in paths:
+        if os.path.isfile(p) and not any(_same(p, u) for u in unique):
+            unique.append(p)
+    return unique
+
+
+class AdbServer:
+    def __init__(self, adb: str, run):
+        """adb: the bundled executable; run(cmd, timeout) -> CompletedProcess (scrcpy_runner._run)."""
+        self.adb = adb
+        self._run = run
+        self._lock = threading.Lock()
+        self._starts = deque(maxlen=RESTARTS_IN_WINDOW + 1)
+        self._versions: dict[str, int | None] = {}   # path → גרסה (adb version רץ פעם אחת לכל קובץ)
+        self.server_version: int | None = None
+        self.others: list[dict] = []
+        self.problems: list[str] = []
+        self.on_problem = None   # on_problem(text) כשמתגלה בעיה חדשה (מ-thread רקע)
+        self._reported = ""
+
+    @property
+    def port(self) -> int:
+        return adb_client.ADB_SERVER_PORT
+
+    @property
+    def dedicated(self) -> bool:
+        return self.port != DEFAULT_PORT
+
+    @property
+    def client_version(self) -> int | None:
+        """The bundled adb's version, once ensure() has read it (never spawns here)."""
+        return self._versions.get(self.adb)
+
+    def start_in_background(self) -> threading.Thread:
+        """At launch: start/check the server, then look for other adb installations."""
+        def go():
+            self.ensure()
+            self.scan()
+        t = threading.Thread(target=go, name="adb-server", daemon=True)
+        t.start()
+        return t
+
+    def ensure(self) -> bool:
+        """
+        The server is up (started here if it was not) → True. Concurrent callers
+        wait for the one start in progress instead of spawning their own.
+        """
+        with self._lock:
+            version = self._query_version()
+            if version is None and os.path.exists(self.adb):
+                self._starts.append(time.monotonic())
+                try:
+                    self._run([self.adb, "start-server"], timeout=START_TIMEOUT_SEC)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+                version = self._query_version()
+            self.server_version = version
+        self.version_of(self.adb)
+        self._check()
+        return version is not None
+
+    def scan(self) -> list[dict]:
+        """Other adb executables, running or installed: [{"path", "tool", "version", "running", "pids"}]."""
+        running: dict[str, list[int]] = {}
+        unknown = []
+        for pid, path in running_adbs():
+            if path is None:
+                unknown.append(pid)
+            elif not _same(path, self.adb):
+                key = next((k for k in running if _same(k, path)), path)
+                running.setdefault(key, []).append(pid)
+        paths = list(running) + [p for p in installed_adbs()
+                                 if not _same(p, self.adb) and not any(_same(p, r) for r in running)]
+        others = [{"path": p, "tool": tool_of(p), "version": self.version_of(p),
+                   "running": p in running, "pids": running.get(p, [])} for p in paths]
+        if unknown:
+            others.append({"path": None, "tool": "adb", "version": None, "running": True, "pids": unknown})
+        with self._lock:
+            self.others = others
+        self._check()
+        return others
+
+    def conflicts(self) -> list[dict]:
+        """Other adb builds whose version differs from ours (running ones first)."""
+        mine = self.client_version
+        found = [o for o in self.others
+                 if (o["version"] is not None and mine is not None and o["version"] != mine)
+                 or (o["path"] is None and o["running"])]
+        return sorted(found, key=lambda o: not o["running"])
+
+    def version_of(self, path: str) -> int | None:
+        if path not in self._versions:
+            version = None
+            if os.path.exists(path):
+                try:
+                    version = parse_version(self._run([path, "version"], timeout=VERSION_TIMEOUT_SEC).stdout)
+                except (OSError, subprocess.TimeoutExpired):
+                    pass
+            self._versions[path] = version
+        return self._versions[path]
+
+    def report(self) -> dict:
+        return {"port": self.port, "dedicated": self.dedicated, "client_version": self.client_version,
+                "server_version": self.server_version, "problems": list(self.problems),
+                "conflicts": self.conflicts()}
+
+    def summary(self) -> str:
+        """Hebrew text for the window: what is wrong, who else runs adb, what to do."""
+        lines = list(self.problems)
+        conflicts = self.conflicts()
+        if conflicts:
+            lines.append("adb בגרסה אחרת במחשב:")
+            for o in conflicts:
+                state = "רץ עכשיו" if o["running"] else "מותקן"
+                version = f"1.0.{o['version']}" if o["version"] is not None else "גרסה לא ידועה"
+                lines.append(f"• {o['tool']} ({version}, {state}): {o['path'] or 'pid ' + ', '.join(map(str, o['pids']))}")
+        if lines and not self.dedicated:
+            lines.append(f"\nסגור את הכלי השני, או הפעל את LoginVRCast עם {PORT_FLAG} {SUGGESTED_PORT} "
+                         f"(או {DEDICATED_PORT_ENV}={SUGGESTED_PORT}) כדי שיהיה לו שרת adb משלו.")
+        return "\n".join(lines)
+
+    # ---------- internals ----------
+
+    def _query_version(self) -> int | None:
+        try:
+            return adb_client.server_version(timeout=VERSION_TIMEOUT_SEC)
+        except (OSError, adb_client.AdbError, subprocess.TimeoutExpired, ValueError):
+            return None
+
+    def _check(self):
+        problems = []
+        mine, theirs = self.client_version, self.server_version
+        if mine is not None and theirs is not None and mine != theirs:
+            problems.append(f"שרת ה-adb בפורט {self.port} הוא בגרסה 1.0.{theirs} ו-LoginVRCast בגרסה 1.0.{mine}: "
+                            "כל צד יסגור את השרת של השני.")
+        now = time.monotonic()
+        restarts = [t for t in self._starts if now - t <= RESTART_WINDOW_SEC]
+        if len(restarts) > RESTARTS_IN_WINDOW:
+            problems.append(f"שרת ה-adb הופעל מחדש {len(restarts)} פעמים בדקה האחרונה — "
+                            "כנראה כלי אחר סוגר אותו.")
+        if not problems and not self.dedicated and any(o["running"] for o in self.conflicts()):
+            problems.append("כלי אחר מריץ adb בגרסה אחרת במקביל — הוא עלול לסגור את השרת.")
+        self.problems = problems
+        text = self.summary() if problems else ""
+        if text and text != self._reported:
+            self._reported = text
+            if self.on_problem is not None:
+                self.on_problem(text)
+        elif not text:
+            self._reported = ""
+
@@ -0,0 +1,153 @@
+"""
+Admission control for new cast sessions against a host budget.
+
+Each scrcpy costs decode CPU/GPU and memory on this PC, and past a point all
+windows degrade together. Before a new session starts, its cost is projected
+from what the running sessions actually use (app/resources.py, normalized by
+their pixel rate) and added to the current total:
+
+  * fits at the requested quality           → admit;
+  * fits only lower on the quality ladder   → admit at that rung, and the
+                                              adaptive controller is kept
+                                              from climbing above it;
+  * does not fit at all / session cap hit   → queue: wait (up to
+                                              QUEUE_WAIT_SEC, within the job's
+                                              deadline) for a session to end,
+                                              then refuse with the reason.
+
+Restarts and automatic recoveries replace a running process and are not
+re-admitted.
+"""
+import time
+from typing import NamedTuple
+
+from app.quality import PROFILES, transport_of
+from app.resources import ProcessSample, cpu_count, host_memory
+
+CPU_BUDGET = 0.8             # חלק מכל הליבות ש-scrcpy-ים יכולים לתפוס יחד
+MEMORY_BUDGET = 0.5          # חלק מהזיכרון הפיזי
+MAX_SESSIONS = 0             # 0 = בלי תקרה קבועה
+DEFAULT_COST = ProcessSample(cpu_pct=30.0, rss=220 * 2**20)   # לפני שיש מדידה אחת (לרמה מלאה)
+REF_SIDE, REF_FPS = 1800, 72  # הרמה העליונה: חיתוך עין מלא, 72fps
+QUEUE_WAIT_SEC = 10
+QUEUE_POLL_SEC = 0.5
+
+# החלטות
+ADMIT, DEGRADE, QUEUE = "admit", "degrade", "queue"
+
+
+class Budget(NamedTuple):
+    cpu_pct: float       # סכום CPU% (100 = ליבה אחת)
+    rss: int             # bytes
+    max_sessions: int = MAX_SESSIONS
+
+
+def default_budget() -> Budget:
+    mem = host_memory()
+    rss = int(mem[0] * MEMORY_BUDGET) if mem else 4 * 2**30
+    return Budget(cpu_count() * 100 * CPU_BUDGET, rss)
+
+
+def cost_factor(level) -> float:
+    """Relative decode cost of a quality rung: pixels × frame rate against the top rung."""
+    if level is None:
+        return 1.0
+    side = min(level.max_size or REF_SIDE, REF_SIDE)
+    return (side / REF_SIDE) ** 2 * min(level.max_fps, REF_FPS) / REF_FPS
+
+
+class Decision(NamedTuple):
+    action: str
+    quality: object      # app.quality.QualityLevel to start with (None on QUEUE)
+    reason: str = ""
+
+
+class Admission:
+    def __init__(self, sessions, monitor, budget: Budget | None = None):
+        """sessions: app.sessions.SessionManager; monitor: app.resources.ResourceMonitor."""
+        self._sessions = sessions
+        self._monitor = monitor
+        self.budget = budget or default_budget()
+
+    def usage(self, exclude=()) -> ProcessSample:
+        """What the running sessions use now; sessions not sampled yet count at their estimate."""
+        samples = self._monitor.samples()
+        unit = self._unit_cost(samples)
+        cpu = rss = 0.0
+        for s in self._sessions.running():
+            if s.serial in exclude:
+                continue
+            sample = samples.get(s.serial)
+            if sample is None or sample.cpu_pct == 0:
+                cpu += unit.cpu_pct * cost_factor(s.quality)
+                rss += unit.rss
+            else:
+                cpu += sample.cpu_pct
+                rss += sample.rss
+        return ProcessSample(cpu, int(rss))
+
+    def decide(self, serial: str, level, pending: list = ()) -> Decision:
+        """pending: (level) of sessions admitted in the same batch but not started yet."""
+        unit = self._unit_cost(self._monitor.samples())
+        used = self.usage(exclude={serial})
+        cpu = used.cpu_pct + sum(unit.cpu_pct * cost_factor(p) for p in pending)
+        rss = used.rss + unit.rss * len(pending)
+        count = len([s for s in self._sessions.running() if s.serial != serial]) + len(pending)
+        if self.budget.max_sessions and count >= self.budget.max_sessions:
+            return Decision(QUEUE, None, f"הגעת לתקרה של {self.budget.max_sessions} שידורים במקביל")
+        if rss + unit.rss > self.budget.rss:
+            return Decision(QUEUE, None, f"אין מספיק זיכרון פנוי במחשב ({rss / 2**20:.0f}MB בשימוש)")
+        ladder = PROFILES[transport_of(serial)]
+        start = ladder.index(level) if level in ladder else 0
+        for level_ in ladder[start:]:
+            if cpu + unit.cpu_pct * cost_factor(level_) <= self.budget.cpu_pct:
+                return Decision(ADMIT if level_ == level else DEGRADE, level_,
+                                "" if level_ == level else f"עומס על המחשב — איכות מופחתת ({level_.label})")
+        return Decision(QUEUE, None, f"המעבד במחשב עמוס ({cpu:.0f}% מתוך {self.budget.cpu_pct:.0f}%)")
+
+    def admit(self, serials: list[str], quality_for, job=None) -> tuple[dict, dict[str, str]]:
+        """
+        Plan a batch → ({serial: level to start with}, {serial: refusal reason}).
+        Queued serials wait for capacity up to QUEUE_WAIT_SEC (never past the job's deadline).
+        """
+        plan, refused, queued = {}, {}, []
+        for serial in serials:
+            d = self.decide(serial, quality_for(serial), list(plan.values()))
+            if d.action == QUEUE:
+                queued.append(serial)
+            else:
+                plan[serial] = d.quality
+        deadline = time.monotonic() + QUEUE_WAIT_SEC
+        if job is not None and job.remaining() is not None:
+            deadline = min(deadline, time.monotonic() + job.remaining() - 1)
+        while queued:
+            d = self.decide(queued[0], quality_for(queued[0]), list(plan.values()))
+            if d.action != QUEUE:
+                plan[queued.pop(0)] = d.quality
+                continue
+            if time.monotonic() >= deadline:
+                break
+            if job is not None:
+                job.step(f"ממתין למקום במחשב: {d.reason}")
+                job.sleep(QUEUE_POLL_SEC)
+            else:
+                time.sleep(QUEUE_POLL_SEC)
+        refused.update(self._refuse(queued, quality_for, plan))
+        return plan, refused
+
+    # ---------- internals ----------
+
+    def _refuse(self, serials, quality_for, plan) -> dict[str, str]:
+        return {s: self.decide(s, quality_for(s), list(plan.values())).reason for s in serials}
+
+    def _unit_cost(self, samples: dict[str, ProcessSample]) -> ProcessSample:
+        """Average measured cost of one session at the top rung (DEFAULT_COST before any sample)."""
+        measured = []
+        for s in self._sessions.running():
+            sample = samples.get(s.serial)
+            if sample is not None and sample.cpu_pct > 0:
+                measured.append((sample.cpu_pct / max(cost_factor(s.quality), 0.05), sample.rss))
+        if not measured:
+            return DEFAULT_COST
+        return ProcessSample(sum(c for c, _ in measured) / len(measured),
+                             int(sum(r for _, r in measured) / len(measured)))
@@ -0,0 +1,78 @@
+"""
+Command line client for the local API (app/daemon.py, or the window started with --api).
+
+    python -m app.cli status
+    python -m app.cli connect SERIAL [SERIAL ...]
+    python -m app.cli provision               # every USB headset → Wi‑Fi
+    python -m app.cli cast --all --renderer Direct3D
+    python -m app.cli stop 192.168.1.20:5555
+    python -m app.cli metrics                 # CPU / RAM of every scrcpy on this PC
+
+Prints the JSON reply; the exit code is 0 only when the operation succeeded.
+"""
+import argparse, json, os, sys, urllib.error, urllib.request
+
+from app.daemon import HOST, PORT, TOKEN_ENV
+
+TIMEOUT_SEC = 330  # הפעולה הארוכה ביותר (benchmark) + מרווח
+
+
+def request(method: str, path: str, body: dict | None = None, host: str = HOST, port: int = PORT,
+            token: str | None = None) -> tuple[int, object]:
+    data = None if body is None else json.dumps(body).encode("utf-8")
+    req = urllib.request.Request(f"http://{host}:{port}{path}", data=data, method=method)
+    req.add_header("Content-Type", "application/json")
+    token = token if token is not None else os.environ.get(TOKEN_ENV)
+    if token:
+        req.add_header("Authorization", f"Bearer {token}")
+    try:
+        with urllib.request.urlopen(req, timeout=TIMEOUT_SEC) as resp:
+            return resp.status, json.loads(resp.read() or b"null")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"null")
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(prog="python -m app.cli", description="Drive LoginVRCast from scripts.")
+    p.add_argument("command", choices=["status", "devices", "outages", "metrics", "connect", "provision", "disconnect",
+                                       "cast", "stop", "reconnect", "discover", "job"])
+    p.add_argument("serials", nargs="*", help="device serials (job: the job id)")
+    p.add_argument("--all", action="store_true", help="cast: every castable headset / stop: every cast")
+    p.add_argument("--renderer", default="OpenGL", choices=["OpenGL", "Direct3D"])
+    p.add_argument("--crop", dest="crop_mode", default="crop", choices=["crop", "client-crop"])
+    p.add_argument("--no-wait", action="store_true", help="return the job id instead of waiting")
+    p.add_argument("--host", default=HOST)
+    p.add_argument("--port", type=int, default=PORT)
+    args = p.parse_args(argv)
+
+    if args.command in ("status", "devices", "outages", "metrics"):
+        method, path, body = "GET", f"/{args.command}", None
+    elif args.command == "job":
+        if len(args.serials) != 1:
+            p.error("job needs exactly one job id")
+        method, path, body = "GET", f"/jobs/{args.serials[0]}", None
+    else:
+        method, path, body = "POST", f"/{args.command}", {}
+        if args.serials:
+            body["serials"] = args.serials
+        elif args.command in ("disconnect",) or (args.command in ("cast", "stop") and not args.all):
+            p.error(f"{args.command} needs serials (or --all)" if args.command != "disconnect"
+                    else "disconnect needs serials")
+        if args.command == "cast":
+            body.update(renderer=args.renderer, crop_mode=args.crop_mode)
+        if args.no_wait:
+            body["wait"] = False
+
+    try:
+        status, reply = request(method, path, body, args.host, args.port)
+    except (urllib.error.URLError, OSError) as e:
+        print(f"LoginVRCast API not reachable on {args.host}:{args.port}: {e}", file=sys.stderr)
+        return 2
+    print(json.dumps(reply, ensure_ascii=False, indent=2))
+    if status >= 400:
+        return 1
+    return 1 if isinstance(reply, dict) and reply.get("ok") is False else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""
+Codec/encoder benchmark.
+
+Asks scrcpy which video encoders the device has (--list-encoders), runs a short
+trial cast with each codec/encoder pair, scores it from the live telemetry
+(sustained FPS, skipped frames, startup time) and stores the winner per device
+model + firmware in codecs.json. start_scrcpy then uses it automatically.
+"""
+import os, re, statistics, subprocess, time
+
+from app import scrcpy_runner as runner, tracing
+from app.telemetry import ScrcpyTelemetry
+
+TRIAL_SEC = 8
+LIST_TIMEOUT_SEC = 20
+STARTUP_WEIGHT = 5.0   # נקודות שמורדות לכל שנייה של עלייה
+SKIP_WEIGHT = 1.0      # כל פריים שדולג (לשנייה, בממוצע) שווה פריים שלא הוצג
+
+_ENCODER_RE = re.compile(r"--video-codec=(\w+)\s+--video-encoder=(\S+)(?:\s+\((\w+)\))?")
+
+
+def parse_encoders(text: str, include_sw: bool = False) -> list[tuple[str, str]]:
+    """(codec, encoder) pairs from `scrcpy --list-encoders`; software encoders only on request."""
+    pairs = []
+    for codec, encoder, kind in _ENCODER_RE.findall(text):
+        if kind == "sw" and not include_sw:
+            continue
+        if (codec, encoder) not in pairs:
+            pairs.append((codec, encoder))
+    return pairs
+
+
+def list_encoders(serial: str, exe: str | None = None, include_sw: bool = False) -> list[tuple[str, str]]:
+    exe = exe or runner.SCRCPY
+    cmd = [exe, f"--serial={serial}", "--list-encoders"]
+    with tracing.command(cmd, via="exe", timeout_sec=LIST_TIMEOUT_SEC) as span:
+        out = tracing.result(span, subprocess.run(
+            cmd,
+            cwd=os.path.dirname(exe) or None,
+            capture_output=True, text=True, encoding="utf-8", errors="ignore",
+            timeout=LIST_TIMEOUT_SEC, creationflags=runner.CREATE_NO_WINDOW,
+        ))
+    return parse_encoders(out.stdout + out.stderr, include_sw)
+
+
+def score(summary: dict, fps_samples: list[int]) -> float | None:
+    """Higher is better; None = the trial never produced frames."""
+    if not fps_samples:
+        return None
+    # בלי הדגימה הראשונה (חלקית) — "מתמשך" = חציון השאר
+    steady = fps_samples[1:] or fps_samples
+    sustained = statistics.median(steady)
+    skipped_per_sec = summary["skipped_total"] / len(fps_samples)
+    startup = summary["startup_sec"] if summary["startup_sec"] is not None else TRIAL_SEC
+    return round(sustained - SKIP_WEIGHT * skipped_per_sec - STARTUP_WEIGHT * startup, 2)
+
+
+def trial(serial: str, codec: str, encoder: str, renderer: str, crop_mode: str,
+          seconds: float = TRIAL_SEC, launcher=None, job=None) -> dict:
+    launcher = launcher or runner.start_scrcpy
+    started = time.monotonic()
+    proc = launcher(renderer, crop_mode, serial=serial, codec=(codec, encoder))
+    telemetry = ScrcpyTelemetry(proc)
+    try:
+        deadline = started + seconds
+        while time.monotonic() < deadline and proc.poll() is None:
+            if job is not None:
+                job.sleep(0.25)
+            else:
+                time.sleep(0.25)
+    finally:
+        if proc.poll() is None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=2)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+                proc.wait()
+        telemetry.join(timeout=1)
+    summary = telemetry.summary()
+    fps = telemetry.fps_history()
+    return {
+        "codec": codec,
+        "encoder": encoder,
+        "fps_samples": fps,
+        "skipped_total": summary["skipped_total"],
+        "errors": summary["errors"],
+        "startup_sec": summary["startup_sec"],
+        "exit_code": proc.returncode,
+        "score": score(summary, fps),
+    }
+
+
+def benchmark(serial: str, renderer: str = "OpenGL", crop_mode: str = "crop", seconds: float = TRIAL_SEC,
+              launcher=None, encoders: list[tuple[str, str]] | None = None, job=None) -> dict:
+    """
+    Trial every codec/encoder pair, store the winner for this model+firmware.
+    Returns {"key", "winner": (codec, encoder) | None, "results": [...]}.
+    """
+    if encoders is None:
+        if job is not None:
+            job.step("שואל את המכשיר אילו מקודדים קיימים...")
+        encoders = list_encoders(serial)
+    results = []
+    for i, (codec, encoder) in enumerate(encoders, 1):
+        if job is not None:
+            job.step(f"בדיקה {i}/{len(encoders)}: {codec} / {encoder}")
+        results.append(trial(serial, codec, encoder, renderer, crop_mode, seconds, launcher, job))
+    scored = [r for r in results if r["score"] is not None]
+    key = runner.device_key(serial)
+    winner = None
+    if scored:
+        best = max(scored, key=lambda r: r["score"])
+        winner = (best["codec"], best["encoder"])
+        if key:
+            runner.CODECS.put(key, best["codec"], best["encoder"], best["score"], results)
+    return {"key": key, "winner": winner, "results": results}
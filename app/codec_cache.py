@@ -0,0 +1,48 @@
+"""
+Winning video codec/encoder per device model + firmware (codecs.json), written
+by the codec benchmark (app/codec_bench.py) and read by start_scrcpy.
+"""
+import threading, time
+
+from app.storage import load_json, save_json
+
+CACHE_FILE = "codecs.json"
+
+
+class CodecCache:
+    def __init__(self, filename: str = CACHE_FILE):
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            data = load_json(self._filename, {})
+            self._entries = data if isinstance(data, dict) else {}
+        return self._entries
+
+    def __bool__(self):
+        with self._lock:
+            return bool(self._load())
+
+    def get(self, key: str) -> tuple[str, str] | None:
+        """(codec, encoder) chosen for this model/firmware, or None."""
+        with self._lock:
+            e = self._load().get(key)
+            return (e["codec"], e["encoder"]) if e else None
+
+    def put(self, key: str, codec: str, encoder: str, score: float, results: list[dict]):
+        with self._lock:
+            self._load()[key] = {
+                "codec": codec,
+                "encoder": encoder,
+                "score": score,
+                "measured_at": time.time(),
+                "results": results,
+            }
+            save_json(self._filename, self._entries)
+
+    def forget(self, key: str):
+        with self._lock:
+            if self._load().pop(key, None) is not None:
+                save_json(self._filename, self._entries)
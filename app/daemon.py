@@ -0,0 +1,319 @@
+"""
+Headless LoginVRCast: the same device operations as the window, over a local
+JSON/HTTP API for fleet automation.
+
+    python -m app.daemon [--port 27210]
+
+One asyncio loop serves every client (keep-alive, any number of concurrent
+requests); reads (GET /status, /devices, /outages, /metrics, /jobs/<id>) come
+straight from the shared device table and session state, and device operations
+run as jobs on a worker pool with the same timeouts as in the window:
+
+    POST /connect     {"serials": [...]}   no serials → the one-click flow
+    POST /provision   {"serials": [...]}   no serials → every USB headset
+    POST /disconnect  {"serials": [...]}
+    POST /cast        {"serials": [...], "renderer": "OpenGL", "crop_mode": "crop"}
+    POST /stop        {"serials": [...]}   no serials → every cast
+    POST /reconnect, POST /discover
+
+A bulk request handles its serials in parallel; a cast the host has no room
+for waits briefly and then fails with the reason (app/admission.py). "wait": false answers at once
+with a job id to poll. The server listens on 127.0.0.1 only; with
+LOGINVRCAST_API_TOKEN set every request needs `Authorization: Bearer <token>`.
+The window can serve the same API next to itself (`python -m app.main --api`).
+"""
+import argparse, asyncio, hmac, itertools, json, os, signal, sys, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+
+from app import adb_server, scrcpy_runner as runner
+from app.fleet import Fleet, JOB_TIMEOUTS
+from app.jobs import Job, execute
+
+HOST = "127.0.0.1"
+PORT = 27210                 # מחוץ לטווח של scrcpy (27183-27199)
+TOKEN_ENV = "LOGINVRCAST_API_TOKEN"
+MAX_BODY = 64 * 1024
+MAX_WORKERS = 16
+KEEP_JOBS = 200              # פעולות שהסתיימו ונשמרות לשאילתה (GET /jobs/<id>)
+IDLE_SEC = 60                # חיבור keep-alive בלי בקשה נסגר
+
+
+class HttpError(Exception):
+    def __init__(self, status: HTTPStatus, message: str = ""):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+
+def _serials(body: dict) -> list[str] | None:
+    serials = body.get("serials")
+    if serials is None:
+        return None
+    if isinstance(serials, str):
+        serials = [serials]
+    if not isinstance(serials, list) or not serials or not all(isinstance(s, str) and s for s in serials):
+        raise HttpError(HTTPStatus.BAD_REQUEST, '"serials" must be a non-empty list of strings (or left out)')
+    return list(dict.fromkeys(serials))
+
+
+class ApiServer:
+    def __init__(self, fleet: Fleet, host: str = HOST, port: int = PORT, token: str | None = None):
+        self.fleet = fleet
+        self.host = host
+        self.port = port
+        self.token = token if token is not None else os.environ.get(TOKEN_ENV) or None
+        self._ids = itertools.count(1)
+        self._jobs: dict[int, dict] = {}
+        self._pool = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="api-job")
+        self._server: asyncio.Server | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._routes = {
+            ("GET", "/status"): self._get_status,
+            ("GET", "/devices"): lambda body: self.fleet.status()["devices"],
+            ("GET", "/outages"): lambda body: self.fleet.supervisor.outages(),
+            ("GET", "/metrics"): self._get_metrics,
+            ("POST", "/connect"): lambda body: ("connect", self.fleet.connect, (_serials(body),)),
+            ("POST", "/provision"): lambda body: ("provision", self.fleet.provision, (_serials(body),)),
+            ("POST", "/disconnect"): lambda body: ("disconnect", self.fleet.disconnect, (_serials(body),)),
+            ("POST", "/cast"): self._cast_args,
+            ("POST", "/stop"): lambda body: ("stop", self.fleet.stop, (_serials(body),)),
+            ("POST", "/reconnect"): lambda body: ("reconnect", self.fleet.reconnect, ()),
+            ("POST", "/discover"): lambda body: ("discover", self.fleet.discover, ()),
+        }
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._client, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]  # port=0 → הפורט שנבחר
+        return self
+
+    async def serve_forever(self):
+        async with self._server:
+            await self._server.serve_forever()
+
+    def close(self):
+        """Stop listening and cancel running jobs (callable from any thread)."""
+        for entry in list(self._jobs.values()):
+            entry["job"].cancel()
+        if self._server is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._server.close)
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- HTTP ----------
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), IDLE_SEC)
+                except asyncio.TimeoutError:
+                    break
+                if not line.strip():
+                    break
+                keep_alive = await self._request(line, reader, writer)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, asyncio.LimitOverrunError):
+            pass
+        except Exception:
+            pass  # בקשה שלא ניתן לפענח (למשל כותרת שבורה): רק החיבור הזה נסגר
+        finally:
+            writer.close()
+
+    async def _request(self, line: bytes, reader, writer) -> bool:
+        headers = {}
+        while True:
+            h = await reader.readline()
+            if h in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = h.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        try:
+            method, target, version = line.decode("latin-1").split()
+        except ValueError:
+            self._respond(writer, HTTPStatus.BAD_REQUEST, {"error": "bad request line"}, False)
+            return False
+        keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+        length = headers.get("content-length") or "0"
+        if not length.isdigit() or int(length) > MAX_BODY:
+            # את הגוף לא קוראים — החיבור לא ממשיך
+            self._respond(writer, HTTPStatus.REQUEST_ENTITY_TOO_LARGE if length.isdigit()
+                          else HTTPStatus.BAD_REQUEST, {"error": "bad Content-Length"}, False)
+            return False
+        raw = await reader.readexactly(int(length)) if int(length) else b""
+        try:
+            status, payload = await self._dispatch(method.upper(), target.split("?", 1)[0], headers, raw)
+        except HttpError as e:
+            status, payload = e.status, {"error": str(e)}
+        except Exception as e:
+            # תקלה בתוך route: תשובה 500 במקום חיבור שנופל בלי תשובה; החיבור לא ממשיך
+            status, payload, keep_alive = HTTPStatus.INTERNAL_SERVER_ERROR, {"ok": False, "error": str(e)}, False
+        self._respond(writer, status, payload, keep_alive)
+        return keep_alive
+
+    @staticmethod
+    def _respond(writer, status: HTTPStatus, payload, keep_alive: bool):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + body)
+
+    async def _dispatch(self, method: str, path: str, headers: dict, raw: bytes):
+        if self.token is not None:
+            auth = headers.get("authorization", "")
+            if not hmac.compare_digest(auth.encode(), f"Bearer {self.token}".encode()):
+                raise HttpError(HTTPStatus.UNAUTHORIZED)
+        try:
+            body = json.loads(raw) if raw.strip() else {}
+        except ValueError:
+            raise HttpError(HTTPStatus.BAD_REQUEST, "body is not JSON")
+        if not isinstance(body, dict):
+            raise HttpError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+        if method == "GET" and path.startswith("/jobs/"):
+            return HTTPStatus.OK, self._job_info(path[len("/jobs/"):])
+        route = self._routes.get((method, path.rstrip("/") or "/"))
+        if route is None:
+            if any(p == path for _, p in self._routes):
+                raise HttpError(HTTPStatus.METHOD_NOT_ALLOWED)
+            raise HttpError(HTTPStatus.NOT_FOUND)
+        if method == "GET":
+            return HTTPStatus.OK, route(body)
+        wait = body.get("wait", True)
+        if not isinstance(wait, bool):
+            raise HttpError(HTTPStatus.BAD_REQUEST, '"wait" must be true or false')
+        name, fn, args = route(body)
+        entry = self._submit(name, fn, args)
+        if not wait:
+            return HTTPStatus.ACCEPTED, self._public(entry)
+        await asyncio.wrap_future(entry["future"])
+        return HTTPStatus.OK, self._public(entry)
+
+    # ---------- routes ----------
+
+    def _get_status(self, body):
+        status = self.fleet.status()
+        status["jobs"] = [self._public(e) for e in self._jobs.values() if e["ok"] is None]
+        return status
+
+    def _get_metrics(self, body):
+        """Per-session CPU / memory / threads / handles of every scrcpy, and the host totals."""
+        return {"host": self.fleet.host_usage(), "at": time.time(),
+                "sessions": {serial: sample.to_dict() for serial, sample in self.fleet.resources.samples().items()}}
+
+    def _cast_args(self, body):
+        renderer = body.get("renderer", "OpenGL")
+        crop_mode = body.get("crop_mode", "crop")
+        if renderer not in ("OpenGL", "Direct3D") or crop_mode not in ("crop", "client-crop"):
+            raise HttpError(HTTPStatus.BAD_REQUEST, 'renderer: "OpenGL"/"Direct3D", crop_mode: "crop"/"client-crop"')
+        return "cast", self.fleet.cast, (_serials(body), renderer, crop_mode, time.time())
+
+    # ---------- jobs ----------
+
+    def _submit(self, name: str, fn, args) -> dict:
+        job_id = next(self._ids)
+        entry = {"id": job_id, "name": name, "progress": "", "ok": None, "message": "",
+                 "started_at": time.time(), "ended_at": None}
+
+        def report(job, text):
+            entry["progress"] = text
+
+        entry["job"] = job = Job(job_id, name, JOB_TIMEOUTS.get(name), report)
+
+        def run():
+            ok, msg = execute(job, fn, args)
+            entry.update(ok=ok, message=msg, ended_at=time.time())
+
+        self._jobs[job_id] = entry
+        for old in [i for i, e in self._jobs.items() if e["ok"] is not None][:-KEEP_JOBS]:
+            del self._jobs[old]
+        entry["future"] = self._pool.submit(run)
+        return entry
+
+    def _job_info(self, job_id: str) -> dict:
+        entry = self._jobs.get(int(job_id)) if job_id.isdigit() else None
+        if entry is None:
+            raise HttpError(HTTPStatus.NOT_FOUND, f"no job {job_id}")
+        return self._public(entry)
+
+    @staticmethod
+    def _public(entry: dict) -> dict:
+        return {k: v for k, v in entry.items() if k not in ("job", "future")}
+
+
+def serve_in_thread(fleet: Fleet, host: str = HOST, port: int = PORT) -> ApiServer:
+    """Run the API on its own event loop thread next to another UI (returns once it listens)."""
+    api = ApiServer(fleet, host, port)
+    ready = threading.Event()
+
+    def loop():
+        async def main():
+            await api.start()
+            ready.set()
+            await api.serve_forever()
+        try:
+            asyncio.run(main())
+        except (OSError, asyncio.CancelledError):
+            pass
+        finally:
+            ready.set()
+
+    threading.Thread(target=loop, name="api", daemon=True).start()
+    ready.wait()
+    return api
+
+
+def main(argv=None):
+    from PySide6.QtCore import Qt
+    from app.device_tracker import DeviceTracker
+    p = argparse.ArgumentParser(prog="python -m app.daemon", description="LoginVRCast without a window.")
+    p.add_argument("--host", default=HOST)
+    p.add_argument("--port", type=int, default=PORT)
+    p.add_argument("--no-reconnect", action="store_true", help="skip reconnecting cached Wi-Fi endpoints")
+    p.add_argument(adb_server.PORT_FLAG, type=int, dest="adb_port",
+                   help=f"run our own adb server on this port (default: ${adb_server.DEDICATED_PORT_ENV} or 5037)")
+    args = p.parse_args(argv)
+
+    adb_server.configure(args.adb_port or adb_server.port_from([]))
+    runner.ADB_SERVER.on_problem = lambda text: print(text, file=sys.stderr, flush=True)
+    runner.start_adb_server()
+    threading.Thread(target=runner.ADB_SERVER.scan, name="adb-scan", daemon=True).start()
+    tracker = DeviceTracker()
+    fleet = Fleet(devices=tracker.devices,
+                  on_cast_failed=lambda serial, error: print(f"{serial}: {error}", file=sys.stderr, flush=True))
+
+    # בלי event loop של Qt קריאה בתור לא תרוץ אף פעם — DirectConnection: on_devices רץ ב-thread של ה-tracker
+    tracker.devices_changed.connect(fleet.on_devices, Qt.ConnectionType.DirectConnection)
+    tracker.start()
+    if not args.no_reconnect:
+        threading.Thread(target=fleet.reconnect, name="reconnect", daemon=True).start()
+
+    async def serve():
+        api = await ApiServer(fleet, args.host, args.port).start()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C מגיע כ-KeyboardInterrupt
+        print(f"LoginVRCast API on http://{api.host}:{api.port}", flush=True)
+        task = asyncio.create_task(api.serve_forever())
+        try:
+            await stop.wait()
+        finally:
+            api.close()
+            task.cancel()
+
+    try:
+        asyncio.run(serve())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tracker.stop()
+        fleet.shutdown()
+
+
+if __name__ == "__main__":
+    main()
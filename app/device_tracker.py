@@ -0,0 +1,104 @@
+"""
+Push-based device tracking over adb's `host:track-devices-l` stream.
+
+The adb server sends the full device list once and then again on every change,
+so a single blocking socket replaces polling `adb devices -l`. Every snapshot is
+pushed into the shared DEVICES table (which then stays live, no TTL), and Qt
+signals are emitted only for real differences.
+"""
+import threading
+from PySide6.QtCore import QObject, Signal
+
+from app import adb_client
+from app.devices import DeviceSnapshot
+from app.scrcpy_runner import DEVICES, start_adb_server
+
+RECONNECT_MIN_SEC = 0.5
+RECONNECT_MAX_SEC = 5.0
+
+
+class DeviceTracker(QObject):
+    device_added = Signal(str, str)     # serial, state
+    device_removed = Signal(str)        # serial
+    device_changed = Signal(str, str)   # serial, new state
+    devices_changed = Signal()          # אחרי כל שינוי בטבלה
+    snapshot_received = Signal()        # כל תמונת מצב מהזרם, גם בלי שינוי (למדידת זמן עלייה)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._lock = threading.Lock()
+        self._snap = DeviceSnapshot()
+        self._stop = threading.Event()
+        self._sock = None
+        self._thread = None
+
+    # ---------- public ----------
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="adb-track-devices", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        sock = self._sock
+        if sock is not None:
+            try:
+                sock.close()
+            except OSError:
+                pass
+
+    def devices(self) -> DeviceSnapshot:
+        """Latest snapshot — a cheap read, no adb round trip."""
+        with self._lock:
+            return self._snap
+
+    # ---------- worker thread ----------
+
+    def _loop(self):
+        delay = RECONNECT_MIN_SEC
+        while not self._stop.is_set():
+            try:
+                self._sock = adb_client.request("host:track-devices-l")
+                self._sock.settimeout(None)  # הזרם נשאר פתוח עד שינוי הבא
+                delay = RECONNECT_MIN_SEC
+                while not self._stop.is_set():
+                    self._apply(DeviceSnapshot.parse(adb_client.read_block(self._sock)))
+            except (OSError, adb_client.AdbError, ValueError):
+                pass
+            finally:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+            if self._stop.is_set():
+                break
+            # השרת נפל/הופעל מחדש: המכשירים כבר לא ידועים, ננסה להרים אותו שוב
+            DEVICES.detach()
+            self._apply(DeviceSnapshot(), push=False)
+            start_adb_server()
+            self._stop.wait(delay)
+            delay = min(delay * 2, RECONNECT_MAX_SEC)
+
+    def _apply(self, snap: DeviceSnapshot, push: bool = True):
+        if push:
+            DEVICES.push(snap)
+            self.snapshot_received.emit()
+        new = dict(snap.rows())
+        with self._lock:
+            old = dict(self._snap.rows())
+            self._snap = snap
+        changed = False
+        for serial in old.keys() - new.keys():
+            self.device_removed.emit(serial)
+            changed = True
+        for serial, state in new.items():
+            if serial not in old:
+                self.device_added.emit(serial, state)
+                changed = True
+            elif old[serial] != state:
+                self.device_changed.emit(serial, state)
+                changed = True
+        if changed:
+            self.devices_changed.emit()
@@ -0,0 +1,119 @@
+"""
+One shared view of `adb devices -l`.
+
+The text is parsed once into compact DeviceRecord rows (a DeviceSnapshot).
+DeviceTable hands the same snapshot to every helper until it is older than the
+TTL or explicitly invalidated after connect/disconnect. While DeviceTracker is
+streaming `host:track-devices-l`, the table is "live": pushed snapshots never
+expire, so reads cost no adb round trip at all.
+"""
+import re, threading, time
+from typing import NamedTuple
+
+SNAPSHOT_TTL_SEC = 1.0
+
+_IP_SERIAL = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}:\d{2,5}$")
+
+
+def is_ip_serial(serial: str) -> bool:
+    return ":" in serial and _IP_SERIAL.match(serial) is not None
+
+
+class DeviceRecord(NamedTuple):
+    serial: str
+    state: str
+    transport: str       # "wifi" / "usb"
+    model: str = ""
+    product: str = ""
+    transport_id: str = ""
+
+    @classmethod
+    def parse(cls, line: str) -> "DeviceRecord | None":
+        # 'SERIAL  device usb:1-1 product:hollywood model:Quest_2 device:hollywood transport_id:3'
+        parts = line.split()
+        if len(parts) < 2 or line.startswith(("List of devices", "*")):
+            return None
+        props = dict(p.split(":", 1) for p in parts[2:] if ":" in p)
+        serial = parts[0]
+        return cls(serial, parts[1], "wifi" if is_ip_serial(serial) else "usb",
+                   props.get("model", ""), props.get("product", ""), props.get("transport_id", ""))
+
+
+class DeviceSnapshot:
+    __slots__ = ("records", "taken_at")
+
+    def __init__(self, records=(), taken_at: float | None = None):
+        self.records: tuple[DeviceRecord, ...] = tuple(records)
+        self.taken_at = time.monotonic() if taken_at is None else taken_at
+
+    @classmethod
+    def parse(cls, text: str) -> "DeviceSnapshot":
+        """`adb devices -l` or track-devices text (header optional)."""
+        return cls(r for r in map(DeviceRecord.parse, text.splitlines()) if r is not None)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def get(self, serial: str) -> DeviceRecord | None:
+        for r in self.records:
+            if r.serial == serial:
+                return r
+        return None
+
+    def rows(self) -> list[tuple[str, str]]:
+        return [(r.serial, r.state) for r in self.records]
+
+    def ready(self) -> list[DeviceRecord]:
+        return [r for r in self.records if r.state == "device"]
+
+
+class DeviceTable:
+    def __init__(self, fetch, ttl: float = SNAPSHOT_TTL_SEC):
+        """fetch() -> `adb devices -l` text; called at most once per TTL."""
+        self._fetch = fetch
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        self._pushed = threading.Condition(self._lock)
+        self._snap: DeviceSnapshot | None = None
+        self._live = False
+        self.fetches = 0  # כמה פעמים באמת פנינו ל-adb (למדידה)
+
+    def snapshot(self) -> DeviceSnapshot:
+        with self._lock:  # single-flight: קוראים במקביל מחכים לאותה שליפה
+            snap = self._snap
+            if snap is not None and (self._live or time.monotonic() - snap.taken_at < self._ttl):
+                return snap
+            self.fetches += 1
+            snap = self._snap = DeviceSnapshot.parse(self._fetch())
+            return snap
+
+    @property
+    def live(self) -> bool:
+        return self._live
+
+    def wait(self, timeout: float) -> bool:
+        """Block until the tracker pushes the next snapshot (True) or timeout (False)."""
+        with self._pushed:
+            return self._pushed.wait(timeout)
+
+    def invalidate(self):
+        """After connect/disconnect/tcpip the next read must hit adb (unless live)."""
+        with self._lock:
+            if not self._live:
+                self._snap = None
+
+    def push(self, snap: DeviceSnapshot):
+        """Snapshot from the track-devices stream: the table becomes live."""
+        with self._lock:
+            self._snap = snap
+            self._live = True
+            self._pushed.notify_all()
+
+    def detach(self):
+        """Stream lost — back to TTL mode with nothing cached."""
+        with self._lock:
+            self._live = False
+            self._snap = None
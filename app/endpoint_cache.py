@@ -0,0 +1,80 @@
+"""
+Last known Wi‑Fi endpoint per headset, kept on disk so a headset that was
+wireless before can be reconnected with a plain `adb connect` — no USB cable,
+no `tcpip 5555`, no IP discovery.
+
+Keyed by the hardware (USB) serial. An entry is dropped when it is older than
+MAX_AGE_SEC or after MAX_FAILURES consecutive failed reconnects.
+"""
+import threading, time
+
+from app.storage import load_json, save_json
+
+CACHE_FILE = "endpoints.json"
+MAX_AGE_SEC = 7 * 24 * 3600
+MAX_FAILURES = 3
+
+
+class EndpointCache:
+    def __init__(self, filename: str = CACHE_FILE):
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._entries = None  # נטען בפעם הראשונה שצריך
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            data = load_json(self._filename, {})
+            self._entries = data if isinstance(data, dict) else {}
+        return self._entries
+
+    def _save(self):
+        save_json(self._filename, self._entries)
+
+    def record(self, hw_serial: str, ip: str, port: str | int, model: str = ""):
+        """Remember a working endpoint (after a successful connect)."""
+        with self._lock:
+            entries = self._load()
+            entries[hw_serial] = {
+                "ip": ip,
+                "port": int(port),
+                "model": model or entries.get(hw_serial, {}).get("model", ""),
+                "last_seen": time.time(),
+                "failures": 0,
+            }
+            self._save()
+
+    def entries(self) -> dict[str, dict]:
+        """Fresh entries only; anything older than MAX_AGE_SEC is evicted here."""
+        with self._lock:
+            entries = self._load()
+            now = time.time()
+            stale = [k for k, e in entries.items() if now - e.get("last_seen", 0) > MAX_AGE_SEC]
+            for k in stale:
+                del entries[k]
+            if stale:
+                self._save()
+            return {k: dict(e) for k, e in entries.items()}
+
+    def mark_ok(self, hw_serial: str):
+        with self._lock:
+            e = self._load().get(hw_serial)
+            if e:
+                e["last_seen"] = time.time()
+                e["failures"] = 0
+                self._save()
+
+    def mark_failed(self, hw_serial: str):
+        with self._lock:
+            entries = self._load()
+            e = entries.get(hw_serial)
+            if not e:
+                return
+            e["failures"] = e.get("failures", 0) + 1
+            if e["failures"] >= MAX_FAILURES:
+                del entries[hw_serial]
+            self._save()
+
+    def forget(self, hw_serial: str):
+        with self._lock:
+            if self._load().pop(hw_serial, None) is not None:
+                self._save()
@@ -0,0 +1,312 @@
+"""
+Device operations for one or many headsets, without any UI.
+
+Fleet owns the cast sessions, the adaptive quality controller, the recovery
+supervisor and the relays, and exposes connect / disconnect / cast / stop /
+restart / relay for any list of serials. Bulk operations run per device in
+parallel; new casts pass admission control first (app/admission.py) against
+the host cost of the running scrcpy processes (app/resources.py). Every
+operation is a job function (`job=` keyword, returns (ok, message)) so the Qt
+window (app.main, through JobRunner) and the headless daemon (app.daemon)
+drive the very same code. Status reads only the shared device table and
+session state — no adb round trip.
+"""
+import math, threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app import scrcpy_runner as runner, tracing
+from app.admission import Admission
+from app.quality import QualityController
+from app.resources import ResourceMonitor
+from app.sessions import FAILED, SessionManager
+from app.supervisor import CastSupervisor, established
+
+# זמן מקסימלי לכל סוג פעולה (שניות); הפעולה נעצרת בנקודת הביקורת הבאה
+JOB_TIMEOUTS = {"connect": 60, "disconnect": 20, "cast": 20, "stop": 10, "reconnect": 15,
+                "benchmark": 300, "discover": 30, "restart": 20, "provision": 300, "adb": 30}
+MAX_PARALLEL = 16
+
+
+def _errors_text(errors: dict[str, str]) -> str:
+    return "\n".join(f"{serial}: {err}" for serial, err in errors.items())
+
+
+def _limit(value: float) -> int | None:
+    """A budget figure for JSON; an unbounded one (inf) → None."""
+    return round(value) if math.isfinite(value) else None
+
+
+class Fleet:
+    def __init__(self, on_change=None, on_telemetry=None, devices=None, launcher=None, on_cast_failed=None):
+        """
+        on_change() when sessions or recoveries change, on_telemetry(serial, event)
+        for every scrcpy log event, on_cast_failed(serial, error) when a cast dies
+        before it ever came up or its automatic recovery gave up (all from worker threads).
+        devices() -> DeviceSnapshot; default: the shared DEVICES table.
+        """
+        self._on_telemetry = on_telemetry
+        self._on_cast_failed = on_cast_failed
+        self._devices = devices or runner.DEVICES.snapshot
+        self._lock = threading.Lock()
+        self.relays = {}    # serial → app.relay.Relay: שידור אחד → חלון + הקלטה + צופים ברשת
+        self._on_change = on_change
+        self.quality = QualityController(relaunch=self._relaunch_quality)
+        self.sessions = SessionManager(launcher or runner.start_scrcpy, on_change=self._changed,
+                                       on_telemetry=self._telemetry, on_exit=self._exited)
+        self.supervisor = CastSupervisor(self.sessions, on_change=on_change, on_gave_up=self._cast_failed)
+        self.resources = ResourceMonitor(self.sessions)
+        self.admission = Admission(self.sessions, self.resources)
+
+    # ---------- queries ----------
+
+    def castable(self) -> list[str]:
+        return runner.castable_devices(self._devices())
+
+    def on_devices(self, snap=None):
+        """Device table changed (tracker thread or GUI thread): warm-up and recovery triggers."""
+        snap = self._devices() if snap is None else snap
+        # scrcpy-server מאומת וגיאומטריית המסך נקראת ברקע בכל מכשיר חדש, לפני הלחיצה על "שידור"
+        runner.SERVERS.prestage(runner.castable_devices(snap))
+        runner.prefetch_geometry(snap)
+        # מכשיר ששידר ונעלם מ-adb → שחזור אוטומטי
+        self.supervisor.on_devices(snap)
+
+    def status(self) -> dict:
+        """Devices, casts, recoveries, host cost and the adb server check — from memory only."""
+        snap = self._devices()
+        sessions = {s.serial: s for s in self.sessions.sessions()}
+        recovering = set(self.supervisor.recovering())
+        devices = []
+        for r in snap:
+            s = sessions.get(r.serial)
+            devices.append({"serial": r.serial, "state": r.state, "transport": r.transport,
+                            "model": r.model, "casting": bool(s and s.running),
+                            "recovering": r.serial in recovering})
+        return {
+            "summary": runner.status(snap),
+            "devices": devices,
+            "sessions": [self._session_info(s, s.serial in recovering) for s in sessions.values()],
+            "host": self.host_usage(),
+            "adb": runner.ADB_SERVER.report(),
+        }
+
+    def host_usage(self) -> dict:
+        """What the running scrcpy processes cost this PC, against the admission budget."""
+        budget = self.admission.budget
+        return {"sampled": self.resources.available, "sessions": len(self.sessions.running()),
+                **self.resources.totals().to_dict(),
+                "budget": {"cpu_pct": _limit(budget.cpu_pct), "rss_mb": _limit(budget.rss / 2**20),
+                           "max_sessions": budget.max_sessions or None}}
+
+    def _session_info(self, s, recovering: bool) -> dict:
+        t = s.telemetry
+        sample = self.resources.sample(s.serial) if s.running else None
+        return {"serial": s.serial, "state": s.state, "running": s.running, "recovering": recovering,
+                "renderer": s.renderer, "crop_mode": s.crop_mode, "exit_code": s.exit_code,
+                "error": s.error or None,
+                "quality": s.quality.label if s.quality is not None else None,
+                "fps": t.current_fps() if t is not None else None,
+                "first_frame_sec": None if s.first_frame_sec is None else round(s.first_frame_sec, 3),
+                "relay": bool(s.extra_args),
+                "resources": sample.to_dict() if sample is not None else None}
+
+    # ---------- wireless ----------
+
+    def connect(self, serials: list[str] | None = None, job=None):
+        """None = the one-click flow (first headset found); otherwise provision() exactly these serials."""
+        if serials is None:
+            return runner.wireless_auto(job)
+        return self.provision(serials, job=job)
+
+    def provision(self, serials: list[str] | None = None, job=None, on_result=None):
+        """Every USB headset in `device` state (or these serials) → Wi‑Fi in parallel, failures retried."""
+        from app.provision import Provisioner
+        provisioner = Provisioner(job, on_result=on_result)
+        results = provisioner.run(serials)
+        if not results:
+            return False, "לא נמצאו משקפות מחוברות בכבל במצב 'device'."
+        if len(results) == 1:
+            (r,) = results.values()
+            return r["ok"], r["message"]
+        return not provisioner.failed(), provisioner.summary()
+
+    def disconnect(self, serials: list[str] | None = None, job=None):
+        """serials: Wi‑Fi endpoints (ip:port) or USB serials with a cached endpoint; None = the first one."""
+        if serials is None:
+            return runner.wireless_disconnect(job)
+        endpoints = runner.ENDPOINTS.entries()
+        targets = []
+        for serial in serials:
+            e = endpoints.get(serial)
+            targets.append(f"{e['ip']}:{e['port']}" if e and not runner._is_ip_serial(serial) else serial)
+        return self._each(targets, lambda target: runner.wireless_disconnect(job, serial=target),
+                          "החיבור האלחוטי נותק")
+
+    def reconnect(self, job=None):
+        connected = runner.reconnect_cached(job)
+        return bool(connected), ", ".join(connected)
+
+    def discover(self, job=None):
+        from app.lan_discovery import discover_and_connect
+        found = discover_and_connect(job)
+        if not found:
+            return False, "לא נמצאו ברשת משקפות שמאזינות ל-adb אלחוטי (פורט 5555)."
+        return True, "התחברו:\n" + "\n".join(found)
+
+    # ---------- casting ----------
+
+    def cast(self, serials: list[str] | None, renderer: str = "OpenGL", crop_mode: str = "crop",
+             requested_at: float | None = None, job=None):
+        """serials None = every castable headset."""
+        serials = self.castable() if serials is None else serials
+        if not serials:
+            return False, "אין מכשיר מחובר לשידור."
+        plan, errors, degraded = self._admit(serials, job)
+        if plan:
+            runner._step(job, f"מפעיל שידור ל-{len(plan)} מכשירים..." if len(plan) > 1 else "מפעיל שידור...")
+            errors.update(self.sessions.start_many(list(plan), renderer, crop_mode, job=job, quality_for=plan.get,
+                                                   requested_at=requested_at))
+            self.close_relays(list(plan))  # שידור רגיל במקום relay קודם (ה-scrcpy שלו כבר נסגר)
+        if errors:
+            return False, _errors_text(errors)
+        if degraded:
+            return True, "השידור התחיל.\nהמחשב עמוס — איכות מופחתת:\n" + _errors_text(degraded)
+        return True, "השידור התחיל."
+
+    def stop(self, serials: list[str] | None = None, job=None):
+        """serials None = every session."""
+        runner._step(job, "עוצר שידור...")
+        if serials is None:
+            serials = [s.serial for s in self.sessions.sessions()]
+        self.supervisor.cancel(serials)
+        for serial in serials:
+            self.quality.forget(serial)
+        self.sessions.stop_many(serials)
+        self.close_relays(serials)
+        return True, "השידור נעצר."
+
+    def restart(self, changes: dict, serials: list[str] | None = None, job=None):
+        """Running sessions again with renderer/crop_mode changed (old ones torn down meanwhile)."""
+        runner._step(job, "מפעיל מחדש עם ההגדרות החדשות...")
+        errors = self.sessions.restart_many(serials, **changes)
+        if errors:
+            return False, _errors_text(errors)
+        return True, ""
+
+    def relay(self, serial: str, renderer: str = "OpenGL", crop_mode: str = "crop",
+              requested_at: float | None = None, job=None, **options):
+        """Cast one headset through app.relay (window + recording + network viewers)."""
+        from app import relay as relay_mod
+        plan, errors, _ = self._admit([serial], job)
+        if errors:
+            return False, errors[serial]
+        runner._step(job, "מפעיל שידור עם הקלטה...")
+        with self._lock:
+            old = self.relays.pop(serial, None)   # נסגר אחרי שה-scrcpy שלו הוחלף
+        try:
+            relay = relay_mod.Relay(serial, **options).start()
+        except OSError:
+            relay = relay_mod.Relay(serial, **{**options, "view_port": 0}).start()  # הפורט תפוס (relay נוסף)
+        with self._lock:
+            self.relays[serial] = relay
+        try:
+            self.sessions.start(serial, renderer, crop_mode, job=job, quality=plan[serial],
+                                requested_at=requested_at, extra_args=relay.scrcpy_args())
+        except Exception:
+            self.close_relays([serial])
+            raise
+        finally:
+            if old is not None:
+                old.close()
+        lines = []
+        if relay.recorder is not None:
+            lines.append(f"מקליט אל: {relay.recorder.directory}")
+        if relay.viewers is not None:
+            from app.lan_discovery import local_ipv4
+            lines.append(f"צפייה ברשת: tcp://{local_ipv4() or '127.0.0.1'}:{relay.viewers.port}  (ffplay / VLC)")
+        return True, "\n".join(lines)
+
+    def close_relays(self, serials: list[str] | None = None):
+        with self._lock:
+            victims = [self.relays.pop(s) for s in (list(self.relays) if serials is None else serials)
+                       if s in self.relays]
+        for relay in victims:
+            relay.close()
+
+    def shutdown(self):
+        self.supervisor.close()
+        self.resources.close()
+        self.close_relays()
+
+    # ---------- internals ----------
+
+    def _admit(self, serials: list[str], job=None) -> tuple[dict, dict[str, str], dict[str, str]]:
+        """
+        Admission for new casts → ({serial: quality to start with}, {serial: why it was refused},
+        {serial: lowered quality label}).
+        """
+        requested = {serial: self.quality.initial(serial) for serial in serials}
+        plan, refused = self.admission.admit(serials, requested.get, job)
+        degraded = {}
+        for serial, level in plan.items():
+            if level != requested[serial]:
+                self.quality.limit(serial, level)
+                degraded[serial] = level.label
+        for serial in refused:
+            self.quality.forget(serial)
+        return plan, refused, degraded
+
+    def _changed(self):
+        # דגימת המשאבים רצה רק כשיש scrcpy חי
+        self.resources.poke()
+        if self._on_change is not None:
+            self._on_change()
+
+    def _each(self, items: list[str], fn, ok_text: str):
+        """fn(item) -> (ok, msg) for every item in parallel → one combined (ok, message)."""
+        if not items:
+            return False, "לא נבחרו מכשירים."
+        results: dict[str, tuple[bool, str]] = {}
+
+        def one(item):
+            try:
+                results[item] = fn(item)
+            except Exception as e:
+                results[item] = (False, str(e))
+
+        with ThreadPoolExecutor(max_workers=min(MAX_PARALLEL, len(items))) as pool:
+            list(pool.map(tracing.bind(one), items))
+        failed = {item: msg for item, (ok, msg) in results.items() if not ok}
+        if len(items) == 1:
+            return results[items[0]]
+        if failed:
+            return False, _errors_text(failed)
+        return True, f"{ok_text}: {', '.join(items)}"
+
+    def _relaunch_quality(self, serial: str, level):
+        # נקרא מ-thread של בקר האיכות: אותו session, הגדרות איכות אחרות
+        try:
+            self.sessions.restart(serial, quality=level)
+        except Exception:
+            self.quality.forget(serial)
+
+    def _exited(self, session):
+        # נקרא מ-thread המפקח של ה-session: נפילה של שידור שעלה → שחזור; כישלון בעלייה → שגיאה
+        self.supervisor.on_exit(session)
+        if (session.state != FAILED or established(session)
+                or self.sessions.get(session.serial) is not session):
+            return
+        if session.serial in self.supervisor.recovering():
+            return  # ניסיון הפעלה מחדש בתוך שחזור — השחזור ינסה שוב, ומדווח רק כשהוא מוותר
+        self._cast_failed(session.serial, session.error)
+
+    def _cast_failed(self, serial: str, error: str):
+        self.quality.forget(serial)
+        if self._on_cast_failed is not None:
+            self._on_cast_failed(serial, error)
+
+    def _telemetry(self, serial: str, ev):
+        # נקרא מ-thread הקורא של scrcpy
+        self.quality.on_event(serial, ev)
+        if self._on_telemetry is not None:
+            self._on_telemetry(serial, ev)
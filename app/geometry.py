@@ -0,0 +1,168 @@
+"""
+Display geometry per headset model: the eye crop and matching --max-size.
+
+The crop used to be hard-coded for the Quest 2 panel (3664x1920, both eyes
+side by side). Now the display size and density are read once per model
+(`wm size`, `wm density`, `dumpsys display` as fallback — one shell round
+trip), the crop is scaled from that reference to the model's own eye width
+and height, and the result is kept in geometry.json (where it can also be
+hand-tuned per model).
+
+With server-side `--crop` (the default) the headset encodes only the cropped
+region; `--max-size` is then capped at the crop's long side. With
+`--client-crop` the full frame is encoded and the crop has to follow
+whatever scaling --max-size applied to it.
+"""
+import re, subprocess, threading, time
+from typing import NamedTuple
+
+from app.storage import load_json, save_json
+
+CACHE_FILE = "geometry.json"
+
+REFERENCE_SIZE = (3664, 1920)           # Quest 2 / 3S: שתי עיניים זו לצד זו
+REFERENCE_CROP = (1600, 904, 2017, 510)  # החיתוך שהיה קבוע ב-start_scrcpy (w, h, x, y)
+DEFAULT_CROP = ":".join(map(str, REFERENCE_CROP))
+
+PROBE = "wm size; wm density; dumpsys display | grep -m 1 mBaseDisplayInfo"
+
+_SIZE_RE = re.compile(r"(Physical|Override) size:\s*(\d+)x(\d+)")
+_DENSITY_RE = re.compile(r"(Physical|Override) density:\s*(\d+)")
+_REAL_RE = re.compile(r"\breal (\d+) x (\d+)")
+_DUMPSYS_DENSITY_RE = re.compile(r"\bdensity (\d+)")
+
+
+def _down8(v: float) -> int:
+    # scrcpy מעגל מידות וידאו לכפולות של 8
+    return max(8, int(v) // 8 * 8)
+
+
+def compute_crop(width: int, height: int) -> tuple[int, int, int, int]:
+    """The reference crop scaled to another panel: same place within the eye, same share of it."""
+    ref_w, ref_h = REFERENCE_SIZE
+    cw, ch, cx, cy = REFERENCE_CROP
+    ref_eye, eye = ref_w // 2, width // 2
+    w = min(_down8(cw * eye / ref_eye), eye)
+    h = min(_down8(ch * height / ref_h), height)
+    x = min(eye + round((cx - ref_eye) * eye / ref_eye), width - w)
+    y = min(round(cy * height / ref_h), height - h)
+    return w, h, x, y
+
+
+def parse_probe(out: str) -> tuple[int, int, int] | None:
+    """PROBE output → (width, height, density), None when no size was reported."""
+    sizes = {kind: (int(w), int(h)) for kind, w, h in _SIZE_RE.findall(out)}
+    densities = {kind: int(d) for kind, d in _DENSITY_RE.findall(out)}
+    size = sizes.get("Override") or sizes.get("Physical")
+    density = densities.get("Override") or densities.get("Physical") or 0
+    if size is None:
+        m = _REAL_RE.search(out)
+        if m is None:
+            return None
+        size = int(m.group(1)), int(m.group(2))
+    if not density:
+        m = _DUMPSYS_DENSITY_RE.search(out)
+        density = int(m.group(1)) if m else 0
+    return size[0], size[1], density
+
+
+class Geometry(NamedTuple):
+    width: int
+    height: int
+    density: int
+    crop: tuple[int, int, int, int]     # w, h, x, y בפיקסלים של המסך
+
+    @property
+    def max_size(self) -> int:
+        """Long side of the crop: the most a server-side crop ever needs."""
+        return max(self.crop[0], self.crop[1])
+
+    def scrcpy_args(self, client: bool, max_size: int = 0) -> tuple[str, int]:
+        """(crop flag, --max-size to pass; 0 = none) for this panel and an optional quality cap."""
+        w, h, x, y = self.crop
+        if not client:
+            cap = min(max_size, self.max_size) if max_size else self.max_size
+            return f"--crop={w}:{h}:{x}:{y}", cap
+        # client-crop: המסגרת כולה הוקטנה ע"י --max-size, החיתוך בקואורדינטות המוקטנות
+        long_side = max(self.width, self.height)
+        if not max_size or max_size >= long_side:
+            return f"--client-crop={w}:{h}:{x}:{y}", max_size
+        k = _down8(max_size) / long_side
+        return f"--client-crop={_down8(w * k)}:{_down8(h * k)}:{int(x * k)}:{int(y * k)}", max_size
+
+
+class GeometryCache:
+    def __init__(self, adb, filename: str = CACHE_FILE):
+        """adb(args, timeout=...) -> CompletedProcess (normally scrcpy_runner._adb)."""
+        self._adb = adb
+        self._filename = filename
+        self._lock = threading.Lock()
+        self._entries = None
+        self._probing: set[str] = set()
+
+    def _load(self) -> dict:
+        if self._entries is None:
+            data = load_json(self._filename, {})
+            self._entries = data if isinstance(data, dict) else {}
+        return self._entries
+
+    def cached(self, model: str) -> Geometry | None:
+        with self._lock:
+            e = self._load().get(model)
+        if not e:
+            return None
+        try:
+            return Geometry(int(e["width"]), int(e["height"]), int(e.get("density", 0)),
+                            tuple(int(v) for v in e["crop"]))
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def get(self, serial: str, model: str) -> Geometry | None:
+        """Geometry for this model; probed on `serial` the first time (None if that fails)."""
+        if not model:
+            return None
+        geo = self.cached(model)
+        if geo is None:
+            geo = self._probe(serial, model)
+        return geo
+
+    def prefetch(self, devices: list[tuple[str, str]]):
+        """get() in the background for (serial, model) pairs whose model is not cached yet."""
+        for serial, model in devices:
+            with self._lock:
+                if not model or model in self._load() or model in self._probing:
+                    continue
+                self._probing.add(model)
+
+            def run(serial=serial, model=model):
+                try:
+                    self._probe(serial, model)
+                finally:
+                    with self._lock:
+                        self._probing.discard(model)
+            threading.Thread(target=run, name=f"geometry-{serial}", daemon=True).start()
+
+    def forget(self, model: str | None = None):
+        with self._lock:
+            entries = self._load()
+            if model is None:
+                entries.clear()
+            else:
+                entries.pop(model, None)
+            save_json(self._filename, entries)
+
+    def _probe(self, serial: str, model: str) -> Geometry | None:
+        try:
+            out = self._adb(["-s", serial, "shell", PROBE])
+        except subprocess.TimeoutExpired:
+            return None
+        found = parse_probe(out.stdout or "")
+        if found is None:
+            return None
+        width, height, density = found
+        geo = Geometry(width, height, density, compute_crop(width, height))
+        with self._lock:
+            self._load()[model] = {"width": width, "height": height, "density": density,
+                                   "crop": list(geo.crop), "measured_at": time.time()}
+            save_json(self._filename, self._entries)
+        return geo
@@ -0,0 +1,102 @@
+"""
+Help windows and their HTML content. Imported lazily by MainWindow the first
+time a help menu item is opened, so none of it costs startup time.
+"""
+from PySide6.QtCore import Qt
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QTextBrowser
+
+class HelpWindow(QWidget):
+    def __init__(self, title: str, html: str, parent=None):
+        super().__init__(parent)
+        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, True)
+        self.setWindowTitle(title)
+        self.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
+        self.resize(560, 460)
+
+        self.view = QTextBrowser(self)
+        self.view.setOpenExternalLinks(True)
+        self.view.setHtml(
+            f"""
+            <html dir="rtl">
+              <head>
+                <meta charset="utf-8">
+                <style>
+                  body {{ font-family: Segoe UI, Arial, sans-serif; line-height: 1.5; }}
+                  h1, h2 {{ margin: 0.4em 0; }}
+                  ol, ul {{ padding-inline-start: 20px; }}
+                  code {{ background:#f3f3f3; padding:2px 4px; border-radius:4px; }}
+                  .note {{ background:#fff8d8; border:1px solid #f0e0a0; padding:8px; border-radius:8px; }}
+                </style>
+              </head>
+              <body>{html}</body>
+            </html>
+            """
+        )
+
+        root = QVBoxLayout(self)
+        root.addWidget(self.view)
+
+INSTRUCTIONS_HTML = """
+        <h1>הוראות שימוש – LoginVRCast</h1>
+        <ol>
+          <li>הדלק את ה‑<b>Meta Quest</b> וודא שמצב מפתח (Developer Mode) פעיל.</li>
+          <li>חבר את הקווסט למחשב באמצעות <b>כבל USB</b>.</li>
+          <li>במסך המכשיר אשר <b>USB debugging</b> ולחץ <b>Always allow</b>.</li>
+          <li>בחלון התוכנה לחץ <b>שידור</b> כדי להתחיל הצגה.</li>
+          <li>רוצה לעבוד בלי כבל? לחץ <b>חיבור אלחוטי</b> — אם ההתחברות מצליחה, אפשר לנתק את ה‑USB.</li>
+        </ol>
+
+        <h2>טיפים</h2>
+        <ul>
+          <li>אם החיבור האלחוטי נכשל — ודא שהמחשב וה‑Quest באותה רשת Wi‑Fi.</li>
+          <li>בחר <b>מנוע גרפע</b> (OpenGL/Direct3D) לפי מה שעובד חלק יותר אצלך.</li>
+          <li>בחר מצב <b>מצב חיתוך</b>: client-crop או crop בהתאם לצורך.</li>
+        </ul>
+
+        <h2>קיצורים</h2>
+        <ul>
+          <li><b>מסך מלא</b> — alt + F </li>
+          <li><b>רענון</b> — alt + shift + R .</li>
+        </ul>
+        """
+
+FAQ_HTML = """
+        <h1>שאלות נפוצות (FAQ)</h1>
+
+        <h2>איך מפעילים מצב מפתח?</h2>
+        <p>
+          מדריך וידאו:
+          <a href="https://drive.google.com/file/d/1hYf4B3nKVmHpBGViHWfdY_qgfD-LOKPg/view?usp=drive_link">
+            לחץ כאן
+          </a>
+        </p>
+
+        <h2>חיבור אלחוטי לא מצליח</h2>
+        <ul>
+          <li>ודא שה‑PC וה‑Quest על אותה רשת.</li>
+          <li>חבר USB, אשר Debug, ואז לחץ שוב "חיבור אלחוטי".</li>
+        </ul>
+        
+        <h2>המסך מרצד?</h2>
+        <ul>
+          <li>נסה לשנות את <b>מצב חיתוך</b> ל־client-crop או crop בתפריט.
+          זה יכול לשפר את התצוגה.
+          </li>
+          <li>alt + shift + R מרענן את התצוגה.</li>
+        </ul>
+
+        <h2>יצירת קשר</h2>
+        <p>
+          מייל תמיכה:
+          <a href="mailto:info@loginvr.co.il?subject=%D7%90%D7%A4%D7%9C%D7%99%D7%A7%D7%A6%D7%99%D7%99%D7%AA%20%D7%A7%D7%90%D7%A1%D7%98%D7%99%D7%A0%D7%92&body=%D7%94%D7%99%2C%0A%0A%D7%90%D7%A0%D7%99%20%D7%A6%D7%A8%D7%99%D7%9A%20%D7%A2%D7%96%D7%A8%D7%94%20%D7%A2%D7%9D%E2%80%A6">
+            info@loginvr.co.il
+          </a>
+        </p>
+        """
+
+ABOUT_HTML = """
+        <h1>אודות</h1>
+        <p><b>LoginVRCast</b> — כלי לשיקוף מכשירי <b>Meta Quest</b> למחשב Windows באמצעות scrcpy, עם ממשק בעברית.</p>
+        <p>נוצר על ידי <b>Avi Kohen</b> · 2025 · גרסה v0.2.0</p>
+        <p>All rights reserved to LoginVR — internal use only.</p>
+        """
@@ -0,0 +1,140 @@
+"""
+Background job engine: runs blocking device operations (connect, disconnect,
+cast, stop) on a worker pool so the Qt GUI thread never waits on adb.
+
+A job function receives a `Job` handle as keyword `job=`; it reports progress
+with job.step(...), sleeps with job.sleep(...) and is stopped cooperatively by
+cancellation or by its deadline. Progress and completion are delivered back on
+the GUI thread, both as signals and as the optional per-job callbacks.
+"""
+import itertools, subprocess, threading, time
+from concurrent.futures import ThreadPoolExecutor
+from PySide6.QtCore import QObject, Signal, Qt
+
+from app import tracing
+
+
+class JobCancelled(Exception):
+    """Raised inside a job after cancel()."""
+
+
+class JobTimeout(Exception):
+    """Raised inside a job once its deadline has passed."""
+
+
+class Job:
+    def __init__(self, job_id: int, name: str, timeout: float | None, report):
+        self.id = job_id
+        self.name = name
+        self.deadline = (time.monotonic() + timeout) if timeout else None
+        self._cancel = threading.Event()
+        self._report = report
+
+    def cancel(self):
+        self._cancel.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def remaining(self) -> float | None:
+        if self.deadline is None:
+            return None
+        return max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        if self._cancel.is_set():
+            raise JobCancelled(self.name)
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            raise JobTimeout(self.name)
+
+    def step(self, text: str):
+        """Report progress (shown in the window) — also a cancellation point."""
+        self.check()
+        tracing.step(text)
+        self._report(self, text)
+
+    def sleep(self, seconds: float):
+        """Like time.sleep, but wakes up immediately on cancel and never outlives the deadline."""
+        self.check()
+        rem = self.remaining()
+        if rem is not None:
+            seconds = min(seconds, rem)
+        self._cancel.wait(max(0.0, seconds))
+        self.check()
+
+
+def execute(job: Job, fn, args=()) -> tuple[bool, str]:
+    """Run fn(*args, job=job) as a traced operation → (ok, message); failures become messages."""
+    try:
+        job.check()
+        with tracing.operation(f"job:{job.name}", job_id=job.id):
+            return fn(*args, job=job)
+    except JobCancelled:
+        return False, "הפעולה בוטלה."
+    except (JobTimeout, subprocess.TimeoutExpired):
+        return False, "הפעולה חרגה מהזמן המוקצב ובוטלה."
+    except Exception as e:
+        return False, f"שגיאה: {e}"
+
+
+class JobRunner(QObject):
+    started = Signal(int, str)              # job id, name
+    progress = Signal(int, str)             # job id, text
+    finished = Signal(int, str, bool, str)  # job id, name, ok, message
+    _event = Signal(object)                 # worker thread → GUI thread
+
+    def __init__(self, max_workers: int = 4, parent=None):
+        super().__init__(parent)
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._jobs = {}  # id -> (job, on_progress, on_done); נגיש רק מה-GUI thread
+        self._event.connect(self._dispatch, Qt.ConnectionType.QueuedConnection)
+
+    def submit(self, name: str, fn, *args, timeout: float | None = None,
+               on_progress=None, on_done=None) -> Job:
+        """
+        Run fn(*args, job=job) in the pool. fn returns (ok, message).
+        on_progress(text) / on_done(ok, message) are called on the GUI thread.
+        """
+        job = Job(next(self._ids), name, timeout,
+                  lambda j, text: self._event.emit(("progress", j, text)))
+        self._jobs[job.id] = (job, on_progress, on_done)
+        self.started.emit(job.id, name)
+        self._pool.submit(self._execute, job, fn, args)
+        return job
+
+    def active(self) -> list[Job]:
+        return [job for job, _, _ in self._jobs.values()]
+
+    def cancel(self, job_id: int):
+        entry = self._jobs.get(job_id)
+        if entry:
+            entry[0].cancel()
+
+    def cancel_all(self):
+        for job in self.active():
+            job.cancel()
+
+    def shutdown(self):
+        self.cancel_all()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+    # ---------- internals ----------
+
+    def _execute(self, job: Job, fn, args):
+        self._event.emit(("done", job, execute(job, fn, args)))
+
+    def _dispatch(self, event):
+        kind, job, payload = event
+        if kind == "progress":
+            entry = self._jobs.get(job.id)
+            self.progress.emit(job.id, payload)
+            if entry and entry[1]:
+                entry[1](payload)
+            return
+        entry = self._jobs.pop(job.id, None)
+        ok, msg = payload
+        self.finished.emit(job.id, job.name, ok, msg)
+        if entry and entry[2]:
+            entry[2](ok, msg)
@@ -0,0 +1,129 @@
+"""
+Find headsets that are already listening for wireless adb on the local network.
+
+Two sources, run concurrently:
+  * an asyncio TCP sweep of port 5555 over the host's /24 (tight per-host
+    timeout, capped number of connections in flight);
+  * mDNS: `_adb._tcp` / `_adb-tls-connect._tcp` records, browsed by the adb
+    server itself (`host:mdns:services`), so no extra dependency is needed.
+Every responder then gets `adb connect` in parallel, and the working endpoint
+is recorded in the endpoint cache for the next cable-free reconnect.
+"""
+import asyncio, ipaddress, socket, subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+from app import adb_client, tracing
+from app import scrcpy_runner as runner
+
+PROBE_TIMEOUT_SEC = 0.3
+MAX_IN_FLIGHT = 128
+MDNS_SERVICES = ("_adb._tcp", "_adb-tls-connect._tcp")
+
+
+def local_ipv4() -> str | None:
+    """The address of the interface that carries the default route (UDP connect sends nothing)."""
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            s.connect(("8.8.8.8", 80))
+            return s.getsockname()[0]
+    except OSError:
+        return None
+
+
+def subnet_hosts(ip: str | None = None) -> list[str]:
+    ip = ip or local_ipv4()
+    if not ip or ip.startswith("127."):
+        return []
+    net = ipaddress.ip_network(f"{ip}/24", strict=False)
+    return [str(h) for h in net.hosts() if str(h) != ip]
+
+
+# ---------- TCP sweep ----------
+
+async def _probe(host: str, port: int, timeout: float, gate: asyncio.Semaphore) -> str | None:
+    async with gate:
+        try:
+            _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            return None
+        writer.close()
+        try:
+            await writer.wait_closed()
+        except OSError:
+            pass
+        return host
+
+
+async def sweep_async(hosts: list[str], port: int = int(runner.WIRELESS_PORT),
+                      timeout: float = PROBE_TIMEOUT_SEC, limit: int = MAX_IN_FLIGHT) -> list[str]:
+    gate = asyncio.Semaphore(limit)
+    found = await asyncio.gather(*(_probe(h, port, timeout, gate) for h in hosts))
+    return [f"{h}:{port}" for h in found if h]
+
+
+@tracing.traced("lan_sweep")
+def sweep(hosts: list[str] | None = None, port: int = int(runner.WIRELESS_PORT),
+          timeout: float = PROBE_TIMEOUT_SEC, limit: int = MAX_IN_FLIGHT) -> list[str]:
+    """host:port of every host that accepts a TCP connection (default: this /24)."""
+    hosts = subnet_hosts() if hosts is None else hosts
+    if not hosts:
+        return []
+    return asyncio.run(sweep_async(hosts, port, timeout, limit))
+
+
+# ---------- mDNS (דרך שרת ה-adb) ----------
+
+def parse_mdns_services(text: str) -> list[str]:
+    # 'adb-1WMHH000000000-abc\t_adb-tls-connect._tcp\t192.168.1.50:37123'
+    targets = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) >= 3 and parts[1].rstrip(".") in MDNS_SERVICES and parts[2] not in targets:
+            targets.append(parts[2])
+    return targets
+
+
+def mdns_targets() -> list[str]:
+    try:
+        with tracing.command(["adb", "mdns", "services"], via="server"):
+            return parse_mdns_services(adb_client.host_query("host:mdns:services"))
+    except (OSError, adb_client.AdbError, subprocess.TimeoutExpired):
+        # שרת ישן בלי mDNS / שרת לא רץ — פשוט אין תוצאות מהמקור הזה
+        return []
+
+
+# ---------- discover + connect ----------
+
+def _record(target: str):
+    ip, _, port = target.rpartition(":")
+    out = runner._adb(["-s", target, "shell", "getprop ro.serialno; getprop ro.product.model"])
+    lines = [l.strip() for l in (out.stdout or "").splitlines() if l.strip()]
+    if out.returncode == 0 and lines:
+        runner.ENDPOINTS.record(lines[0], ip, port, lines[1] if len(lines) > 1 else "")
+
+
+def discover(hosts: list[str] | None = None, port: int = int(runner.WIRELESS_PORT)) -> list[str]:
+    """TCP sweep and mDNS browse at the same time → unique host:port candidates."""
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        swept = pool.submit(tracing.bind(sweep), hosts, port)
+        browsed = pool.submit(tracing.bind(mdns_targets))
+        candidates = swept.result() + browsed.result()
+    return list(dict.fromkeys(candidates))
+
+
+def discover_and_connect(job=None, hosts: list[str] | None = None,
+                         port: int = int(runner.WIRELESS_PORT)) -> list[str]:
+    """Connect every headset found on the LAN (in parallel) → list of connected targets."""
+    if job is not None:
+        job.step("סורק את הרשת המקומית...")
+    known = {r.serial for r in runner.DEVICES.snapshot() if r.state == "device"}
+    candidates = [t for t in discover(hosts, port) if t not in known]
+    if not candidates:
+        return []
+    if job is not None:
+        job.step(f"מתחבר ל-{len(candidates)} מכשירים שנמצאו ברשת...")
+    with ThreadPoolExecutor(max_workers=min(32, len(candidates))) as pool:
+        results = list(pool.map(tracing.bind(lambda t: runner.connect_target(t)[0]), candidates))
+        connected = [t for t, ok in zip(candidates, results) if ok]
+        list(pool.map(tracing.bind(_record), connected))
+    return connected
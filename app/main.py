@@ -1,78 +1,361 @@
-import sys
-from PySide6.QtCore import Qt, QLocale
+import sys, time
+_T0 = time.perf_counter()  # לפני ה-imports הכבדים — בסיס למדידת זמן העלייה
+from PySide6.QtCore import Qt, QLocale, QObject, Signal, QTimer
 from PySide6.QtWidgets import QApplication, QMessageBox
 from app.ui import MainWindow
-from app.scrcpy_runner import status, wireless_auto, wireless_disconnect, start_scrcpy
+from app.telemetry import sparkline, FPS, ERROR, DISCONNECT, FIRST_FRAME
+from app.devices import is_ip_serial
+from app import adb_server
+# app.fleet / app.scrcpy_runner / app.device_tracker / app.jobs (ועמם sessions, איכות, שחזור,
+# מדידת משאבים, tracing...) נטענים רק אחרי שהחלון צויר — _start_backend()
 
-_last_proc = None
+_runner = None        # app.scrcpy_runner, אחרי _start_backend()
+_fleet = None         # sessions, איכות אדפטיבית, שחזור אוטומטי ו-relays — משותף עם ה-API (app/daemon.py)
+_api = None           # שרת ה-API המקומי כשהופעל עם --api
+_tracker = None
+_jobs = None
+_window = None
 _renderer = "OpenGL"
 _crop_mode = "crop"   # ברירת מחדל לפי מה שהשתמשת בו עד עכשיו
 
 _is_wireless = False  # אם יש לך כבר את הטוגל של חיבור/ניתוק
 
-def _stop_if_running():
-    global _last_proc
-    if _last_proc and _last_proc.poll() is None:
-        _last_proc.terminate()
-        try:
-            _last_proc.wait(timeout=2)
-        except Exception:
-            _last_proc.kill()
-        _last_proc = None
+class _Events(QObject):
+    """Bridge from worker threads to the GUI thread."""
+    sessions_changed = Signal()
+    telemetry_changed = Signal()
+    adb_problem = Signal(str)
+    cast_failed = Signal(str, str)
+
+_events = None
+
+def _refresh():
+    if _window is not None:
+        _window.refresh_status()
+
+def _targets() -> list[str]:
+    """המכשיר שנבחר בחלון, או כל המכשירים הזמינים אם נבחר 'כל המכשירים'."""
+    choice = _window.selected_device()
+    if choice is None:
+        return get_devices()
+    return [choice]
+
+def _ready() -> bool:
+    """False until _start_backend() is done — a click during the first paint, or after it failed."""
+    return _fleet is not None
+
+def _submit(name: str, fn, *args, on_done=None):
+    """Run a device operation in the background; the window shows its progress and can cancel it."""
+    from app.fleet import JOB_TIMEOUTS
+    def done(ok, msg):
+        if not _jobs.active():
+            _window.set_busy(False)
+        _refresh()
+        if on_done:
+            on_done(ok, msg)
+    _window.set_busy(True)
+    return _jobs.submit(name, fn, *args, timeout=JOB_TIMEOUTS.get(name),
+                        on_progress=_window.set_progress, on_done=done)
 
 def on_cast():
-    global _last_proc, _renderer, _crop_mode
-    _stop_if_running()
-    try:
-        _last_proc = start_scrcpy(_renderer, _crop_mode)
-    except Exception as e:
-        QMessageBox.critical(None, "שגיאה", f"שגיאה בהפעלה: {e}")
+    if not _ready():
+        return
+    def done(ok, msg):
+        if not ok:
+            QMessageBox.critical(None, "שגיאה", f"שגיאה בהפעלה: {msg}")
+    _submit("cast", _fleet.cast, _targets(), _renderer, _crop_mode, time.time(), on_done=done)
 
 def on_stop():
-    _stop_if_running()
+    if not _ready():
+        return
+    choice = _window.selected_device()
+    _submit("stop", _fleet.stop, None if choice is None else [choice])
 
-def on_wireless(btn_widget):
-    global _is_wireless
-    if not _is_wireless:
-        ok, msg = wireless_auto()
+def on_relay():
+    if not _ready():
+        return
+    serial = _window.selected_device() or next(iter(get_devices()), None)
+    if serial is None:
+        QMessageBox.warning(None, "Relay", "אין מכשיר מחובר.")
+        return
+    def done(ok, msg):
         if ok:
-            _is_wireless = True
-            btn_widget.setText("נתק אלחוטי")
-            QMessageBox.information(None, "חיבור אלחוטי", msg)
+            QMessageBox.information(None, "Relay", msg)
         else:
-            QMessageBox.warning(None, "חיבור אלחוטי", msg)
-    else:
-        ok, msg = wireless_disconnect()
+            QMessageBox.critical(None, "שגיאה", f"שגיאה בהפעלה: {msg}")
+    _submit("cast", _fleet.relay, serial, _renderer, _crop_mode, time.time(), on_done=done)
+
+def _reconnect_at_startup():
+    """Headsets that were wireless before come back without a cable (no popup — quiet)."""
+    def done(ok, msg):
+        global _is_wireless
         if ok:
-            _is_wireless = False
-            btn_widget.setText("חיבור אלחוטי")
-            QMessageBox.information(None, "ניתוק אלחוטי", msg)
+            _is_wireless = True
+            _window.wireless_btn.setText("נתק אלחוטי")
+    _submit("reconnect", _fleet.reconnect, on_done=done)
+
+def _benchmark_job(serial: str, renderer: str, crop_mode: str, job):
+    from app import codec_bench  # נטען רק כשמריצים בדיקה
+    res = codec_bench.benchmark(serial, renderer, crop_mode, job=job)
+    if not res["results"]:
+        return False, "לא נמצאו מקודדי וידאו במכשיר."
+    lines = []
+    for r in res["results"]:
+        score = "נכשל" if r["score"] is None else f"{r['score']}"
+        lines.append(f"{r['codec']} / {r['encoder']}: {score}")
+    if res["winner"] is None:
+        return False, "אף מקודד לא הפיק פריימים.\n\n" + "\n".join(lines)
+    codec, encoder = res["winner"]
+    return True, f"נבחר: {codec} / {encoder} (יופעל אוטומטית בשידורים הבאים)\n\n" + "\n".join(lines)
+
+def on_benchmark():
+    if not _ready():
+        return
+    serial = _window.selected_device() or next(iter(get_devices()), None)
+    if serial is None:
+        QMessageBox.warning(None, "בדיקת מקודדים", "אין מכשיר מחובר.")
+        return
+    def done(ok, msg):
+        (QMessageBox.information if ok else QMessageBox.warning)(None, "בדיקת מקודדים", msg)
+    _submit("benchmark", _benchmark_job, serial, _renderer, _crop_mode, on_done=done)
+
+def on_discover():
+    if not _ready():
+        return
+    def done(ok, msg):
+        global _is_wireless
+        if ok:
+            _is_wireless = True
+            _window.wireless_btn.setText("נתק אלחוטי")
+            QMessageBox.information(None, "חיפוש ברשת", msg)
         else:
-            QMessageBox.warning(None, "ניתוק אלחוטי", msg)
+            QMessageBox.warning(None, "חיפוש ברשת", msg)
+    _submit("discover", _fleet.discover, on_done=done)
+
+def on_provision():
+    if not _ready():
+        return
+    def done(ok, msg):
+        global _is_wireless
+        if any(is_ip_serial(s) for s in _fleet.castable()):
+            _is_wireless = True
+            _window.wireless_btn.setText("נתק אלחוטי")
+        (QMessageBox.information if ok else QMessageBox.warning)(None, "חיבור אלחוטי לכל המשקפות", msg)
+    _submit("provision", _fleet.provision, on_done=done)
+
+def on_trace_export():
+    if not _ready():
+        return
+    from app import tracing
+    try:
+        paths = tracing.export()
+        # דגימות CPU/זיכרון של כל scrcpy, ליד קובצי ה-trace
+        resources = paths["jsonl"].removesuffix(".jsonl") + "-resources.jsonl"
+        _fleet.resources.export_jsonl(resources)
+    except OSError as e:
+        QMessageBox.warning(None, "ייצוא מדידות", f"שמירת הקבצים נכשלה: {e}")
+        return
+    stats = tracing.format_summary() or "עדיין לא נרשמו פקודות."
+    QMessageBox.information(None, "ייצוא מדידות",
+                            f"{stats}\n\nנשמר אל:\n{paths['jsonl']}\n{paths['chrome']} (chrome://tracing)"
+                            f"\n{resources} (CPU/RAM לכל שידור)")
+
+def on_adb_check():
+    if not _ready():
+        return
+    def check(job=None):
+        _runner.ADB_SERVER.ensure()
+        _runner.ADB_SERVER.scan()
+        return True, ""
+
+    def done(ok, msg):
+        r = _runner.ADB_SERVER.report()
+        server = f"1.0.{r['server_version']}" if r["server_version"] is not None else "לא פועל"
+        client = f"1.0.{r['client_version']}" if r["client_version"] is not None else "לא ידוע"
+        text = f"פורט: {r['port']}{' (ייעודי)' if r['dedicated'] else ''}\nשרת: {server}\nadb מצורף: {client}"
+        details = _runner.ADB_SERVER.summary()
+        (QMessageBox.warning if details else QMessageBox.information)(
+            None, "שרת adb", text + ("\n\n" + details if details else "\n\nלא נמצאה התנגשות עם adb אחר."))
+    _submit("adb", check, on_done=done)
+
+def _on_cast_failed(serial: str, error: str):
+    # scrcpy נסגר לפני שהשידור עלה: אותה הודעה כמו כישלון בלחיצה על "שידור"
+    QMessageBox.critical(None, "שגיאה", f"שגיאה בהפעלה: {serial}: {error}")
+
+def _on_adb_problem(text: str):
+    QMessageBox.warning(None, "שרת adb", text)
+
+def on_cancel():
+    if not _ready():
+        return
+    _jobs.cancel_all()
+
+def on_wireless(btn_widget):
+    if not _ready():
+        return
+    btn_widget.setEnabled(False)
+    if not _is_wireless:
+        def done(ok, msg):
+            global _is_wireless
+            btn_widget.setEnabled(True)
+            if ok:
+                _is_wireless = True
+                btn_widget.setText("נתק אלחוטי")
+                QMessageBox.information(None, "חיבור אלחוטי", msg)
+            else:
+                QMessageBox.warning(None, "חיבור אלחוטי", msg)
+        _submit("connect", _fleet.connect, on_done=done)
+    else:
+        def done(ok, msg):
+            global _is_wireless
+            btn_widget.setEnabled(True)
+            if ok:
+                _is_wireless = False
+                btn_widget.setText("חיבור אלחוטי")
+                QMessageBox.information(None, "ניתוק אלחוטי", msg)
+            else:
+                QMessageBox.warning(None, "ניתוק אלחוטי", msg)
+        _submit("disconnect", _fleet.disconnect, on_done=done)
+
+def _apply_to_running(**changes):
+    """שידור פעיל מתחיל מחדש מיד עם ההגדרה החדשה (הישן נסגר במקביל)."""
+    if _fleet is None or not _fleet.sessions.running():
+        return
+    def done(ok, msg):
+        if not ok:
+            QMessageBox.warning(None, "שגיאה", f"ההפעלה מחדש נכשלה: {msg}")
+    _submit("restart", _fleet.restart, changes, on_done=done)
 
 def on_renderer_changed(name: str):
     global _renderer
-    _renderer = name  # ייכנס לתוקף בלחיצת "שידור" הבאה
+    _renderer = name
+    _apply_to_running(renderer=name)
 
 def on_cropmode_changed(name: str):
     global _crop_mode
-    _crop_mode = name  # "client-crop" או "crop", ייכנס לתוקף בלחיצת "שידור" הבאה
+    _crop_mode = name  # "client-crop" או "crop"
+    _apply_to_running(crop_mode=name)
 
 def get_status():
-    s = status()
-    if _last_proc and _last_proc.poll() is None:
+    if _tracker is None:
+        return {"state": "none", "text": "מתחיל..."}  # הציור הראשון, לפני _start_backend()
+    s = _runner.status(_tracker.devices())  # קריאה זולה מהזיכרון, בלי adb ב-GUI thread
+    casting = _fleet.sessions.running() if _fleet else []
+    recovering = _fleet.supervisor.recovering() if _fleet else []
+    if casting:
         s["state"] = "casting"
-        s["text"] = "משדר..."
+        s["text"] = "משדר..." if len(casting) == 1 else f"משדר מ-{len(casting)} מכשירים..."
+    if recovering:
+        s["state"] = "pairing"
+        s["text"] = (f"החיבור ל-{recovering[0]} נפל — מתחבר מחדש..." if len(recovering) == 1
+                     else f"החיבור ל-{len(recovering)} מכשירים נפל — מתחבר מחדש...")
     return s
 
+def _on_telemetry(serial: str, ev):
+    # נקרא מ-thread הקורא של scrcpy;
+    # רק אירועים שמשנים את התצוגה
+    if ev.kind in (FPS, ERROR, DISCONNECT, FIRST_FRAME):
+        _events.telemetry_changed.emit()
+
+def get_telemetry() -> str:
+    if _window is None or _fleet is None:
+        return ""  # נקרא כבר מתוך הבנאי של החלון
+    choice = _window.selected_device()
+    sessions = [s for s in _fleet.sessions.running() if choice is None or s.serial == choice]
+    if not sessions:
+        return ""
+    if len(sessions) > 1:
+        host = _fleet.resources.totals()
+        text = "  |  ".join(f"{s.serial}: {s.telemetry.current_fps() or '–'} fps" for s in sessions)
+        return text + (f"  |  סה\"כ CPU {host.cpu_pct:.0f}% · RAM {host.rss / 2**20:.0f}MB" if host.rss else "")
+    t = sessions[0].telemetry
+    fps = t.current_fps()
+    if fps is None:
+        return "FPS: ממתין לפריימים..."
+    text = f"FPS: {fps}  {sparkline(t.fps_history(20))}"
+    first = sessions[0].first_frame_sec
+    if first is not None:
+        text += f"  פריים ראשון: {first:.2f}s"
+    if sessions[0].quality is not None:
+        text += f"  איכות: {sessions[0].quality.label}"
+    skipped = sum(t.skipped_history(20))
+    if skipped:
+        text += f"  דילוגים: {skipped}"
+    if t.errors:
+        text += f"  שגיאות: {t.errors}"
+    sample = _fleet.resources.sample(sessions[0].serial)
+    if sample is not None:
+        text += f"  CPU {sample.cpu_pct:.0f}% · RAM {sample.rss / 2**20:.0f}MB"
+    return text
+
+def get_devices() -> list[str]:
+    if _tracker is None:
+        return []
+    return _runner.castable_devices(_tracker.devices())
+
+def _start_backend(app, timer):
+    """After the first paint: device/cast modules, adb server, tracker, Fleet (and --api)."""
+    global _runner, _tracker, _jobs, _fleet, _api
+    from app import scrcpy_runner
+    from app.device_tracker import DeviceTracker
+    from app.fleet import Fleet
+    from app.jobs import JobRunner
+    _runner = scrcpy_runner
+    w = _window
+    # שרת adb עולה ברקע; התנגשות עם adb של כלי אחר → הודעה
+    _runner.ADB_SERVER.on_problem = _events.adb_problem.emit
+    _runner.ADB_SERVER.start_in_background()
+    _tracker = DeviceTracker()
+    _jobs = JobRunner()
+    _fleet = Fleet(on_change=_events.sessions_changed.emit, on_telemetry=_on_telemetry, devices=_tracker.devices,
+                   on_cast_failed=_events.cast_failed.emit)
+    if "--api" in sys.argv:
+        # אותו Fleet גם לאוטומציה: החלון הוא עוד לקוח (app/daemon.py, app/cli.py)
+        from app import daemon
+        _api = daemon.serve_in_thread(_fleet)
+        app.aboutToQuit.connect(_api.close)
+    # אירועים מה-thread של ה-tracker → רענון ב-GUI thread (QueuedConnection)
+    _tracker.devices_changed.connect(w.refresh_status, Qt.ConnectionType.QueuedConnection)
+    _tracker.devices_changed.connect(_fleet.on_devices, Qt.ConnectionType.QueuedConnection)
+    app.aboutToQuit.connect(_tracker.stop)
+    app.aboutToQuit.connect(_jobs.shutdown)
+    app.aboutToQuit.connect(_fleet.shutdown)
+    if timer is not None:
+        _tracker.snapshot_received.connect(timer.first_status, Qt.ConnectionType.QueuedConnection)
+    w.refresh_status()
+    _tracker.start()
+    _reconnect_at_startup()
+
 def main():
+    global _window, _events
+    t_imports = time.perf_counter()
+    # פורט ייעודי (--adb-port) חייב להיקבע לפני כל פנייה ל-adb
+    adb_server.configure(adb_server.port_from(sys.argv))
     app = QApplication(sys.argv)
+    timer = None
+    from app import startup
+    if startup.requested(sys.argv):
+        timer = startup.StartupTimer(_T0, app)
+        timer.mark("imports", t_imports)
     QLocale.setDefault(QLocale(QLocale.Language.Hebrew, QLocale.Country.Israel))
     app.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
     app.setApplicationName("LoginVRCast")
-    w = MainWindow(on_cast, on_wireless, on_renderer_changed, on_cropmode_changed, on_stop, get_status)
+    _events = _Events()
+    w = MainWindow(on_cast, on_wireless, on_renderer_changed, on_cropmode_changed, on_stop, get_status,
+                   on_cancel=on_cancel, get_devices=get_devices, get_telemetry=get_telemetry,
+                   on_benchmark=on_benchmark, on_discover=on_discover, on_provision=on_provision,
+                   on_trace_export=on_trace_export, on_relay=on_relay, on_adb_check=on_adb_check)
+    _window = w
+    _events.sessions_changed.connect(w.refresh_status, Qt.ConnectionType.QueuedConnection)
+    _events.telemetry_changed.connect(w.refresh_telemetry, Qt.ConnectionType.QueuedConnection)
+    _events.adb_problem.connect(_on_adb_problem, Qt.ConnectionType.QueuedConnection)
+    _events.cast_failed.connect(_on_cast_failed, Qt.ConnectionType.QueuedConnection)
+    if timer is not None:
+        timer.watch_first_paint(w)
     w.show()
+    # קודם החלון מצויר, אחר כך נטען כל השאר ומתחילים לעבוד מול adb
+    QTimer.singleShot(0, lambda: _start_backend(app, timer))
     sys.exit(app.exec())
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
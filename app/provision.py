@@ -0,0 +1,103 @@
+"""
+Bulk wireless provisioning: every USB headset on the hub → Wi‑Fi, in parallel.
+
+Each serial gets its own pinned WirelessConnect (IP read over its own USB
+transport, `-s SERIAL tcpip`, wait for its listener, `adb connect` to its own
+IP), on a bounded worker pool so a hub of 10+ headsets is not restarting all
+of its adbds at once. Failed headsets are retried for a few rounds with a
+pause in between; every result (ok, target, message, attempts, seconds) is
+reported as soon as it is known, and the run ends with a total-time summary.
+"""
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import scrcpy_runner as runner, tracing
+from app.jobs import JobCancelled, JobTimeout
+
+MAX_WORKERS = 6       # כמה מכשירים בו-זמנית (tcpip מאתחל את adbd; רכזת USB אחת)
+RETRY_ROUNDS = 2      # סבבים חוזרים רק למי שנכשל
+RETRY_PAUSE_SEC = 1.0
+
+
+def usb_serials(snap=None) -> list[str]:
+    """USB headsets in the `device` state (Wi‑Fi rows and unauthorized ones are skipped)."""
+    snap = runner.DEVICES.snapshot() if snap is None else snap
+    return [r.serial for r in snap.ready() if r.transport == "usb"]
+
+
+class Provisioner:
+    def __init__(self, job=None, workers: int = MAX_WORKERS, retries: int = RETRY_ROUNDS, on_result=None):
+        """on_result(serial, result) from worker threads, once per attempt that finishes."""
+        self.job = job
+        self.workers = workers
+        self.retries = retries
+        self.on_result = on_result
+        self.results: dict[str, dict] = {}
+        self.elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def run(self, serials: list[str] | None = None) -> dict[str, dict]:
+        serials = usb_serials() if serials is None else list(dict.fromkeys(serials))
+        started = time.perf_counter()
+        with tracing.operation("provision", devices=len(serials)) as span:
+            pending = serials
+            for round_no in range(1 + self.retries):
+                if not pending:
+                    break
+                if round_no:
+                    runner._sleep(self.job, RETRY_PAUSE_SEC)
+                runner._step(self.job, f"מחבר אלחוטית {len(pending)} מכשירים"
+                                       + (f" (ניסיון {round_no + 1})..." if round_no else "..."))
+                with ThreadPoolExecutor(max_workers=max(1, min(self.workers, len(pending))),
+                                        thread_name_prefix="provision") as pool:
+                    list(pool.map(tracing.bind(self._one), pending))
+                pending = [s for s in pending if not self.results[s]["ok"]]
+            self.elapsed = time.perf_counter() - started
+            span.set(ok=len(self.ok()), failed=len(self.failed()))
+        return self.results
+
+    def ok(self) -> list[str]:
+        return [s for s, r in self.results.items() if r["ok"]]
+
+    def failed(self) -> list[str]:
+        return [s for s, r in self.results.items() if not r["ok"]]
+
+    def summary(self) -> str:
+        lines = [f"{len(self.ok())}/{len(self.results)} מכשירים חוברו אלחוטית ב-{self.elapsed:.1f}s"]
+        for serial, r in self.results.items():
+            tries = f" (ניסיונות: {r['attempts']})" if r["attempts"] > 1 else ""
+            if r["ok"]:
+                lines.append(f"✔ {serial} → {r['target']}  {r['sec']:.1f}s{tries}")
+            else:
+                lines.append(f"✘ {serial}: {r['message'].splitlines()[0] if r['message'] else 'נכשל'}{tries}")
+        return "\n".join(lines)
+
+    # ---------- internals ----------
+
+    def _one(self, serial: str):
+        from app.wireless import WirelessConnect
+        if self.job is not None:
+            self.job.check()
+        t = time.perf_counter()
+        flow = WirelessConnect(self.job, serial=serial)
+        try:
+            flow.run()
+            ok, msg = flow.result   # בלי שורת הזמנים לכל שלב
+        except (JobCancelled, JobTimeout):
+            raise
+        except Exception as e:
+            ok, msg = False, str(e)
+        with self._lock:
+            prev = self.results.get(serial)
+            result = self.results[serial] = {
+                "ok": ok,
+                "target": flow.target if ok and flow.ip else None,
+                "message": msg,
+                "attempts": (prev["attempts"] if prev else 0) + 1,
+                "sec": round(time.perf_counter() - t, 3),
+                "stages": {name: round(sec, 3) for name, sec in flow.timings},
+            }
+            done = sum(1 for r in self.results.values() if r["ok"])
+        runner._step(self.job, f"{done}/{len(self.results)} חוברו · {serial}: {'✔' if ok else '✘'}")
+        if self.on_result is not None:
+            self.on_result(serial, result)
@@ -0,0 +1,182 @@
+"""
+Adaptive stream quality per transport.
+
+Each transport (USB / Wi‑Fi) has a ladder of scrcpy settings (bit rate,
+--max-fps, --max-size), best first. The controller watches the live FPS and
+skipped-frame samples of every session and moves one rung down when most of
+the recent samples are bad, or one rung up after a long run of good ones.
+Hysteresis: a rung that failed right after an upgrade needs twice as long
+before it is tried again. A rung that stayed good for STABLE_SAMPLES is
+remembered per device (quality.json) and used as the starting point next time.
+A session admitted below its rung for lack of host capacity (app/admission.py)
+is capped there: the controller may lower it further but not climb back above.
+"""
+import threading, time
+from collections import deque
+from typing import NamedTuple
+
+from app.devices import is_ip_serial
+from app.storage import load_json, save_json
+from app.telemetry import FPS
+
+STORE_FILE = "quality.json"
+
+GRACE_SEC = 5            # אחרי הפעלה/החלפה — לא שופטים (encoder מתחמם)
+WINDOW = 5               # דגימות (שניות) לחלון ההחלטה
+BAD_IN_WINDOW = 4        # כמה דגימות רעות בחלון מורידות דרגה
+UP_AFTER = 30            # דגימות טובות ברצף לפני ניסיון עלייה
+STABLE_SAMPLES = 60      # דגימות טובות ברצף → הדרגה נשמרת כ"יציבה" למכשיר
+LOW_FPS_RATIO = 0.75     # FPS מתחת ל-75% מהיעד = דגימה רעה
+SKIP_BAD_RATIO = 0.10    # יותר מ-10% פריימים שדולגו = דגימה רעה
+
+
+class QualityLevel(NamedTuple):
+    bit_rate: str
+    max_fps: int
+    max_size: int = 0    # 0 = ללא הגבלה
+
+    def args(self) -> list[str]:
+        args = [f"--video-bit-rate={self.bit_rate}", f"--max-fps={self.max_fps}"]
+        if self.max_size:
+            args.append(f"--max-size={self.max_size}")
+        return args
+
+    @property
+    def label(self) -> str:
+        return f"{self.bit_rate}/{self.max_fps}fps" + (f"/{self.max_size}" if self.max_size else "")
+
+
+PROFILES: dict[str, list[QualityLevel]] = {
+    "usb": [
+        QualityLevel("16M", 72),
+        QualityLevel("12M", 72, 1920),
+        QualityLevel("8M", 60, 1600),
+        QualityLevel("6M", 60, 1280),
+    ],
+    "wifi": [
+        QualityLevel("8M", 60, 1600),
+        QualityLevel("6M", 60, 1280),
+        QualityLevel("4M", 45, 1280),
+        QualityLevel("3M", 30, 1024),
+        QualityLevel("2M", 30, 800),
+    ],
+}
+
+
+def transport_of(serial: str) -> str:
+    return "wifi" if is_ip_serial(serial) else "usb"
+
+
+class _Track:
+    def __init__(self, transport: str, index: int):
+        self.transport = transport
+        self.index = index
+        self.started = time.monotonic()
+        self.window = deque(maxlen=WINDOW)
+        self.good_streak = 0
+        self.up_after = UP_AFTER
+        self.upgraded = False    # הדרגה הנוכחית הושגה בעלייה (ולא בירידה/התחלה)
+        self.saved_index = None
+        self.ceiling = 0         # הדרגה הגבוהה ביותר שמותרת (admission הוריד בהפעלה)
+
+    @property
+    def level(self) -> QualityLevel:
+        return PROFILES[self.transport][self.index]
+
+
+class QualityController:
+    def __init__(self, relaunch, store_file: str = STORE_FILE):
+        """relaunch(serial, level) restarts the session with new settings (called off-thread)."""
+        self._relaunch = relaunch
+        self._store_file = store_file
+        self._lock = threading.Lock()
+        self._tracks: dict[str, _Track] = {}
+        self._stable = None  # serial -> {"transport", "index"}; נטען בשימוש הראשון
+
+    # ---------- public ----------
+
+    def initial(self, serial: str) -> QualityLevel:
+        """Settings for a new session: the remembered stable rung, else the top of the ladder."""
+        transport = transport_of(serial)
+        with self._lock:
+            saved = self._load().get(serial, {})
+            index = saved.get("index", 0) if saved.get("transport") == transport else 0
+            index = min(index, len(PROFILES[transport]) - 1)
+            track = _Track(transport, index)
+            track.saved_index = index if saved else None
+            self._tracks[serial] = track
+            return track.level
+
+    def level(self, serial: str) -> QualityLevel | None:
+        with self._lock:
+            track = self._tracks.get(serial)
+            return track.level if track else None
+
+    def limit(self, serial: str, level: QualityLevel):
+        """Admitted below the requested rung: start there and never climb above it."""
+        with self._lock:
+            track = self._tracks.get(serial)
+            if track is None or level not in PROFILES[track.transport]:
+                return
+            track.ceiling = PROFILES[track.transport].index(level)
+            track.index = max(track.index, track.ceiling)
+
+    def forget(self, serial: str):
+        """Session stopped by the user — stop judging it."""
+        with self._lock:
+            self._tracks.pop(serial, None)
+
+    def on_event(self, serial: str, ev):
+        if ev.kind != FPS:
+            return
+        with self._lock:
+            track = self._tracks.get(serial)
+            if track is None or time.monotonic() - track.started < GRACE_SEC:
+                return
+            new_index = self._judge(serial, track, ev)
+            if new_index is None:
+                return
+            track.upgraded = new_index < track.index
+            track.index = new_index
+            track.started = time.monotonic()
+            track.window.clear()
+            track.good_streak = 0
+            level = track.level
+        threading.Thread(target=self._relaunch, args=(serial, level),
+                         name=f"quality-{serial}", daemon=True).start()
+
+    # ---------- internals ----------
+
+    def _judge(self, serial: str, track: _Track, ev) -> int | None:
+        level = track.level
+        bad = ev.fps < level.max_fps * LOW_FPS_RATIO or ev.skipped > max(1, ev.fps) * SKIP_BAD_RATIO
+        track.window.append(bad)
+        ladder = PROFILES[track.transport]
+
+        if sum(track.window) >= BAD_IN_WINDOW:
+            if track.index + 1 >= len(ladder):
+                track.window.clear()
+                return None
+            if track.upgraded and track.good_streak < UP_AFTER:
+                # נכשל זמן קצר אחרי עלייה → לנסות שוב רק אחרי זמן כפול
+                track.up_after = min(track.up_after * 2, UP_AFTER * 16)
+            return track.index + 1
+
+        if bad:
+            track.good_streak = 0
+            return None
+        track.good_streak += 1
+        if track.good_streak >= STABLE_SAMPLES and track.saved_index != track.index and not track.ceiling:
+            track.saved_index = track.index
+            self._load()[serial] = {"transport": track.transport, "index": track.index,
+                                    "label": level.label, "saved_at": time.time()}
+            save_json(self._store_file, self._stable)
+        if track.index > track.ceiling and track.good_streak >= track.up_after:
+            return track.index - 1
+        return None
+
+    def _load(self) -> dict:
+        if self._stable is None:
+            data = load_json(self._store_file, {})
+            self._stable = data if isinstance(data, dict) else {}
+        return self._stable
@@ -0,0 +1,475 @@
+"""
+Single-encode relay: one scrcpy run, several consumers.
+
+scrcpy is started once per headset with `--record` into a local pipe (a FIFO,
+or a named pipe on Windows) in Matroska format. The relay reads that stream,
+cuts it at cluster boundaries (every cluster starts on a keyframe) and hands
+the very same buffers to every consumer:
+
+  * scrcpy's own window — the local display (unless display=False → --no-playback);
+  * FileRecorder — .mkv files rotated by age/size, oldest removed;
+  * ViewerServer — a TCP port a player can open (`ffplay tcp://HOST:PORT`,
+    VLC), one consumer per connected viewer.
+
+Each consumer has its own bounded queue and thread. The reader never waits
+for a consumer: one that falls behind loses chunks and resumes at the next
+cluster (with the stream header resent where needed), so a slow viewer never
+stalls the recording or the others.
+"""
+import os, queue, shutil, socket, tempfile, threading, time, uuid
+from typing import NamedTuple
+
+from app.storage import data_path
+
+READ_SIZE = 64 * 1024
+QUEUE_CHUNKS = 256            # לכל צרכן; מעבר לזה — מדלגים עד ה-cluster הבא
+VIEW_PORT = 27184
+ROTATE_SEC = 10 * 60
+ROTATE_BYTES = 512 * 1024 * 1024
+KEEP_FILES = 12               # קבצי הקלטה אחרונים לכל מכשיר
+RECORD_DIR = "recordings"
+
+CLUSTER_ID = b"\x1f\x43\xb6\x75"  # Matroska Cluster
+
+
+class Chunk(NamedTuple):
+    data: memoryview | bytes
+    boundary: bool = False    # מתחיל ב-Cluster → נקודת כניסה תקינה לזרם
+    header: bool = False      # EBML + Segment + Tracks של זרם חדש
+
+
+END = Chunk(b"")               # scrcpy סיים; זרם חדש (אם יהיה) יתחיל ב-header משלו
+
+
+class ClusterSplitter:
+    """Bytes from the pipe → chunks cut right before each Cluster element."""
+
+    def __init__(self):
+        self._carry = b""
+
+    def fill(self, src, size: int = READ_SIZE) -> list[Chunk] | None:
+        """
+        One read from src (readinto) → chunks; None at end of stream (after the
+        held-back tail went out as a last chunk). Every read lands in a fresh
+        buffer that the chunks are views of — only the few carried bytes are
+        copied, never the data itself.
+        """
+        keep = len(self._carry)
+        buf = bytearray(keep + size)
+        buf[:keep] = self._carry
+        with memoryview(buf) as view:
+            n = src.readinto(view[keep:])
+        if not n:
+            if not keep:
+                return None
+            # סוף הזרם: הבתים שחיכו למזהה Cluster הם סוף ה-cluster האחרון
+            tail, self._carry = self._carry, b""
+            return [Chunk(tail)]
+        if n < size:
+            del buf[keep + n:]   # קריאה קצרה: לא מחזיקים את שאר ה-buffer בתורים
+        return self._split(buf)
+
+    def _split(self, buf: bytearray) -> list[Chunk]:
+        # 3 הבתים האחרונים מחכים לקריאה הבאה: אולי תחילת מזהה Cluster
+        limit = max(0, len(buf) - (len(CLUSTER_ID) - 1))
+        cuts, pos = [], buf.find(CLUSTER_ID, 1)
+        while pos != -1:
+            cuts.append(pos)
+            pos = buf.find(CLUSTER_ID, pos + 1)
+        view, out, start = memoryview(buf), [], 0
+        for end in cuts + [limit]:
+            if end > start:
+                out.append(Chunk(view[start:end], boundary=buf.startswith(CLUSTER_ID, start)))
+                start = end
+        self._carry = bytes(view[start:])
+        return out
+
+
+# ---------- consumers ----------
+
+class Consumer:
+    """Bounded queue + worker thread; offer() never blocks the reader."""
+    name = "consumer"
+
+    def __init__(self, max_queue: int = QUEUE_CHUNKS):
+        self._q: queue.Queue = queue.Queue(maxsize=max_queue)
+        self._synced = False          # מחכה ל-cluster (הצטרף באמצע / פיגר)
+        self.dropped = 0
+        self.bytes = 0
+        self.closed = False
+        self._thread = threading.Thread(target=self._loop, name=f"relay-{self.name}", daemon=True)
+
+    def start(self) -> "Consumer":
+        self._thread.start()
+        return self
+
+    def offer(self, chunk: Chunk):
+        if self.closed:
+            return
+        if chunk.header or chunk is END:
+            self._synced = False
+            self._force(chunk)
+            return
+        if not self._synced:
+            if not chunk.boundary:
+                return
+            self._synced = True
+        try:
+            self._q.put_nowait(chunk)
+        except queue.Full:
+            self.dropped += 1
+            self._synced = False
+
+    def close(self):
+        self.closed = True
+        self._force(None)
+
+    def stats(self) -> dict:
+        return {"queued": self._q.qsize(), "dropped": self.dropped, "bytes": self.bytes}
+
+    def _force(self, item):
+        # header / END / עצירה חייבים להגיע: מפנים מקום על חשבון נתונים ישנים
+        while True:
+            try:
+                self._q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self._q.get_nowait()
+                    self.dropped += 1
+                except queue.Empty:
+                    pass
+
+    def _loop(self):
+        try:
+            while True:
+                chunk = self._q.get()
+                if chunk is None:
+                    break
+                self.handle(chunk)
+                self.bytes += len(chunk.data)
+        except OSError:
+            pass
+        finally:
+            self.closed = True
+            self.finish()
+
+    def handle(self, chunk: Chunk):
+        raise NotImplementedError
+
+    def finish(self):
+        pass
+
+
+class FileRecorder(Consumer):
+    name = "recorder"
+
+    def __init__(self, serial: str, directory: str | None = None, rotate_sec: float = ROTATE_SEC,
+                 rotate_bytes: int = ROTATE_BYTES, keep: int = KEEP_FILES, **kw):
+        super().__init__(**kw)
+        self.directory = directory or data_path(RECORD_DIR)
+        self.prefix = "".join(c if c.isalnum() else "_" for c in serial)
+        self.rotate_sec = rotate_sec
+        self.rotate_bytes = rotate_bytes
+        self.keep = keep
+        self.files: list[str] = []
+        self._header = b""
+        self._f = None
+        self._opened_at = 0.0
+        self._written = 0
+
+    def handle(self, chunk: Chunk):
+        if chunk.header:
+            self._header = bytes(chunk.data)
+            self._open()
+            return
+        if chunk is END:
+            self._close()
+            return
+        if self._f is None:
+            return
+        if chunk.boundary and (time.monotonic() - self._opened_at >= self.rotate_sec
+                               or self._written >= self.rotate_bytes):
+            self._open()
+        self._f.write(chunk.data)
+        self._written += len(chunk.data)
+
+    def finish(self):
+        self._close()
+
+    def _open(self):
+        self._close()
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{self.prefix}-{time.strftime('%Y%m%d-%H%M%S')}")
+        path, n = base + ".mkv", 1
+        while os.path.exists(path):
+            path, n = f"{base}-{n}.mkv", n + 1
+        self._f = open(path, "wb")
+        self._f.write(self._header)
+        self._opened_at, self._written = time.monotonic(), len(self._header)
+        self.files.append(path)
+        self._prune()
+
+    def _close(self):
+        if self._f is not None:
+            self._f.close()
+            self._f = None
+
+    def _prune(self):
+        mine = sorted(f for f in os.listdir(self.directory)
+                      if f.startswith(self.prefix + "-") and f.endswith(".mkv"))
+        for name in mine[:-self.keep] if self.keep else []:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                pass
+
+
+class ViewerClient(Consumer):
+    name = "viewer"
+
+    def __init__(self, conn: socket.socket, header: bytes, **kw):
+        super().__init__(**kw)
+        self.conn = conn
+        self.peer = "%s:%s" % conn.getpeername()[:2]
+        self._sent_header = False
+        if header:
+            self.offer(Chunk(header, header=True))
+
+    def handle(self, chunk: Chunk):
+        if chunk is END or (chunk.header and self._sent_header):
+            # scrcpy הופעל מחדש → זרם חדש; הצופה מתחבר שוב ומקבל אותו מההתחלה
+            raise OSError("stream ended")
+        self.conn.sendall(chunk.data)
+        self._sent_header = self._sent_header or chunk.header
+
+    def finish(self):
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+
+
+class ViewerServer:
+    """TCP listener; every connection becomes a ViewerClient on the fan-out."""
+
+    def __init__(self, fanout: "Fanout", host: str = "0.0.0.0", port: int = VIEW_PORT):
+        self._fanout = fanout
+        self._sock = socket.create_server((host, port))
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, name="relay-viewers", daemon=True)
+
+    def start(self) -> "ViewerServer":
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            self._fanout.add(ViewerClient(conn, self._fanout.header).start())
+
+
+class Fanout:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._consumers: list[Consumer] = []
+        self.header = b""
+        self._pending = bytearray()   # לפני ה-Cluster הראשון: עוד header
+        self._in_header = True
+
+    def add(self, consumer: Consumer):
+        with self._lock:
+            self._consumers.append(consumer)
+
+    def consumers(self) -> list[Consumer]:
+        with self._lock:
+            self._consumers = [c for c in self._consumers if not c.closed]
+            return list(self._consumers)
+
+    def begin(self):
+        self.header, self._pending, self._in_header = b"", bytearray(), True
+
+    def publish(self, chunk: Chunk):
+        if self._in_header:
+            if not chunk.boundary:
+                self._pending += chunk.data
+                return
+            self.header, self._in_header = bytes(self._pending), False
+            self._pending = bytearray()
+            self._send(Chunk(self.header, header=True))
+        self._send(chunk)
+
+    def end(self):
+        self._send(END)
+        self.header = b""
+
+    def close(self):
+        for c in self.consumers():
+            c.close()
+
+    def _send(self, chunk: Chunk):
+        for c in self.consumers():
+            c.offer(chunk)
+
+
+# ---------- the pipe scrcpy records into ----------
+
+class _Fifo:
+    def __init__(self):
+        self._dir = tempfile.mkdtemp(prefix="lvc-relay-")
+        self.path = os.path.join(self._dir, "stream.mkv")
+        os.mkfifo(self.path)
+
+    def accept(self):
+        return open(self.path, "rb", buffering=0)   # חוסם עד ש-scrcpy פותח לכתיבה
+
+    def wake(self):
+        try:
+            os.close(os.open(self.path, os.O_WRONLY | os.O_NONBLOCK))
+        except OSError:
+            pass
+
+    def close(self):
+        shutil.rmtree(self._dir, ignore_errors=True)
+
+
+_PIPE_ACCESS_INBOUND = 0x1
+_PIPE_TYPE_BYTE_WAIT = 0x0           # PIPE_TYPE_BYTE | PIPE_READMODE_BYTE | PIPE_WAIT
+_PIPE_UNLIMITED_INSTANCES = 255
+_ERROR_PIPE_CONNECTED = 535          # הלקוח התחבר עוד לפני ConnectNamedPipe — תקין
+
+
+class _NamedPipe:
+    """
+    A byte-mode pipe server (CreateNamedPipe/ConnectNamedPipe): scrcpy opens
+    the path as a plain file and writes raw Matroska, read back with readinto.
+    The next instance is created as soon as one is accepted, so the path keeps
+    existing for the next scrcpy run.
+    """
+
+    def __init__(self):
+        import ctypes
+        self._k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._k32.CreateNamedPipeW.restype = ctypes.c_void_p
+        self._k32.ConnectNamedPipe.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        self._k32.CloseHandle.argtypes = [ctypes.c_void_p]
+        self.path = rf"\\.\pipe\lvc-relay-{uuid.uuid4().hex[:12]}"
+        self._lock = threading.Lock()
+        self._handle = self._create()
+
+    def accept(self):
+        import ctypes, msvcrt
+        with self._lock:
+            handle, self._handle = self._handle, None
+        if handle is None:
+            raise OSError("pipe closed")
+        if not self._k32.ConnectNamedPipe(handle, None) and ctypes.get_last_error() != _ERROR_PIPE_CONNECTED:
+            err = ctypes.get_last_error()
+            self._k32.CloseHandle(handle)
+            raise ctypes.WinError(err)
+        with self._lock:
+            if self._handle is None:
+                self._handle = self._create()
+        return open(msvcrt.open_osfhandle(handle, os.O_RDONLY), "rb", buffering=0)
+
+    def wake(self):
+        try:
+            open(self.path, "wb", buffering=0).close()   # משחרר ConnectNamedPipe שממתין
+        except OSError:
+            pass
+
+    def close(self):
+        with self._lock:
+            handle, self._handle = self._handle, None
+        if handle is not None:
+            self._k32.CloseHandle(handle)
+
+    def _create(self):
+        import ctypes
+        handle = self._k32.CreateNamedPipeW(self.path, _PIPE_ACCESS_INBOUND, _PIPE_TYPE_BYTE_WAIT,
+                                            _PIPE_UNLIMITED_INSTANCES, 0, READ_SIZE, 0, None)
+        if handle is None or handle == ctypes.c_void_p(-1).value:
+            raise ctypes.WinError(ctypes.get_last_error())
+        return handle
+
+
+# ---------- relay ----------
+
+class Relay:
+    """
+    One relayed cast: pass scrcpy_args() to the launch (SessionManager.start
+    extra_args=...), start() before it and close() after the cast stopped.
+    Survives scrcpy restarts: every new run starts a new recording file.
+    """
+
+    def __init__(self, serial: str, record: bool = True, record_dir: str | None = None,
+                 view_port: int | None = VIEW_PORT, display: bool = True,
+                 rotate_sec: float = ROTATE_SEC, rotate_bytes: int = ROTATE_BYTES):
+        self.serial = serial
+        self.display = display
+        self.fanout = Fanout()
+        self.recorder = FileRecorder(serial, record_dir, rotate_sec, rotate_bytes) if record else None
+        self._view_port = view_port
+        self.viewers: ViewerServer | None = None
+        self._pipe = None
+        self._closed = False
+        self._reader = threading.Thread(target=self._read_loop, name=f"relay-{serial}", daemon=True)
+
+    def scrcpy_args(self) -> list[str]:
+        args = [f"--record={self._pipe.path}", "--record-format=mkv"]
+        if not self.display:
+            args.append("--no-playback")
+        return args
+
+    def start(self) -> "Relay":
+        if self._view_port is not None:
+            # קודם הפורט: אם הוא תפוס, לא נשאר כלום פתוח מאחור
+            self.viewers = ViewerServer(self.fanout, port=self._view_port).start()
+        self._pipe = _NamedPipe() if os.name == "nt" else _Fifo()
+        if self.recorder is not None:
+            self.fanout.add(self.recorder.start())
+        self._reader.start()
+        return self
+
+    def close(self):
+        self._closed = True
+        if self.viewers is not None:
+            self.viewers.close()
+        if self._pipe is not None:
+            self._pipe.wake()
+        self._reader.join(0.5)
+        self.fanout.close()
+        if self._pipe is not None:
+            self._pipe.close()
+
+    def stats(self) -> dict[str, dict]:
+        return {getattr(c, "peer", c.name): c.stats() for c in self.fanout.consumers()}
+
+    def _read_loop(self):
+        while not self._closed:
+            try:
+                src = self._pipe.accept()
+            except OSError:
+                return
+            with src:
+                if self._closed:
+                    return
+                splitter = ClusterSplitter()
+                self.fanout.begin()
+                while True:
+                    try:
+                        chunks = splitter.fill(src)
+                    except OSError:   # הכותב נסגר (broken pipe)
+                        chunks = None
+                    if chunks is None:
+                        break
+                    for chunk in chunks:
+                        self.fanout.publish(chunk)
+                self.fanout.end()
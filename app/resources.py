@@ -0,0 +1,254 @@
+"""
+Host cost of every running scrcpy: CPU%, resident memory, threads, handles.
+
+Samples are read straight from the OS once per second — /proc/<pid>/stat,
+/proc/<pid>/fd on Linux; GetProcessTimes / K32GetProcessMemoryInfo /
+GetProcessHandleCount and one toolhelp process snapshot per round (thread
+counts) on Windows — no extra dependency and no process spawned.
+CPU% is per core (100 = one core busy), like top / Task Manager's per-process
+view times the core count. The sampler thread runs only while something is
+casting; the last HISTORY samples per session are kept for export.
+"""
+import ctypes, json, os, threading, time
+from collections import deque
+from typing import NamedTuple
+
+SAMPLE_EVERY_SEC = 1.0
+HISTORY = 300    # ~5 דקות לכל session
+
+
+class ProcessSample(NamedTuple):
+    cpu_pct: float
+    rss: int                    # bytes
+    threads: int | None = None
+    handles: int | None = None  # Linux: file descriptors
+    at: float = 0.0
+
+    def to_dict(self) -> dict:
+        return {"cpu_pct": round(self.cpu_pct, 1), "rss_mb": round(self.rss / 2**20, 1),
+                "threads": self.threads, "handles": self.handles}
+
+
+def cpu_count() -> int:
+    return os.cpu_count() or 1
+
+
+# ---------- OS readers: pid → (cpu seconds, rss, threads, handles) | None ----------
+
+class _ProcReader:
+    def __init__(self):
+        self._tick = os.sysconf("SC_CLK_TCK")
+        self._page = os.sysconf("SC_PAGE_SIZE")
+
+    def read(self, pid: int):
+        try:
+            with open(f"/proc/{pid}/stat", "rb") as f:
+                fields = f.read().rsplit(b")", 1)[1].split()
+            handles = len(os.listdir(f"/proc/{pid}/fd"))
+        except (OSError, IndexError):
+            return None
+        # השדות אחרי "(comm)" מתחילים בשדה 3 (state)
+        cpu = (int(fields[11]) + int(fields[12])) / self._tick
+        return cpu, int(fields[21]) * self._page, int(fields[17]), handles
+
+    @staticmethod
+    def memory() -> tuple[int, int] | None:
+        info = {}
+        try:
+            with open("/proc/meminfo") as f:
+                for line in f:
+                    key, _, rest = line.partition(":")
+                    info[key] = int(rest.split()[0]) * 1024
+        except (OSError, ValueError, IndexError):
+            return None
+        if "MemTotal" not in info:
+            return None
+        return info["MemTotal"], info.get("MemAvailable", info.get("MemFree", 0))
+
+
+class _WinReader:
+    QUERY = 0x1000 | 0x0010   # PROCESS_QUERY_LIMITED_INFORMATION | PROCESS_VM_READ
+
+    class _Counters(ctypes.Structure):
+        _fields_ = [("cb", ctypes.c_ulong), ("PageFaultCount", ctypes.c_ulong),
+                    ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                    ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                    ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                    ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+
+    class _MemoryStatus(ctypes.Structure):
+        _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                    ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                    ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                    ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                    ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+
+    class _Entry(ctypes.Structure):   # PROCESSENTRY32W
+        _fields_ = [("dwSize", ctypes.c_ulong), ("cntUsage", ctypes.c_ulong),
+                    ("th32ProcessID", ctypes.c_ulong), ("th32DefaultHeapID", ctypes.c_size_t),
+                    ("th32ModuleID", ctypes.c_ulong), ("cntThreads", ctypes.c_ulong),
+                    ("th32ParentProcessID", ctypes.c_ulong), ("pcPriClassBase", ctypes.c_long),
+                    ("dwFlags", ctypes.c_ulong), ("szExeFile", ctypes.c_wchar * 260)]
+
+    SNAPPROCESS = 0x2
+    SNAPSHOT_TTL_SEC = 0.5   # snapshot אחד משרת את כל ה-sessions באותו סבב
+
+    def __init__(self):
+        self._k32 = ctypes.WinDLL("kernel32", use_last_error=True)
+        self._k32.OpenProcess.restype = ctypes.c_void_p
+        self._k32.CreateToolhelp32Snapshot.restype = ctypes.c_void_p
+        self._threads: dict[int, int] = {}
+        self._threads_at = 0.0
+
+    def read(self, pid: int):
+        k32 = self._k32
+        h = k32.OpenProcess(self.QUERY, False, pid)
+        if not h:
+            return None
+        h = ctypes.c_void_p(h)
+        try:
+            times = [ctypes.c_ulonglong() for _ in range(4)]  # creation, exit, kernel, user (100ns)
+            if not k32.GetProcessTimes(h, *map(ctypes.byref, times)):
+                return None
+            counters = self._Counters(cb=ctypes.sizeof(self._Counters))
+            if not k32.K32GetProcessMemoryInfo(h, ctypes.byref(counters), counters.cb):
+                return None
+            handles = ctypes.c_ulong()
+            k32.GetProcessHandleCount(h, ctypes.byref(handles))
+            return ((times[2].value + times[3].value) / 1e7, counters.WorkingSetSize,
+                    self._thread_counts().get(pid), handles.value)
+        finally:
+            k32.CloseHandle(h)
+
+    def _thread_counts(self) -> dict[int, int]:
+        """pid → cntThreads from a toolhelp process snapshot (reused for SNAPSHOT_TTL_SEC)."""
+        now = time.monotonic()
+        if now - self._threads_at < self.SNAPSHOT_TTL_SEC:
+            return self._threads
+        k32, counts = self._k32, {}
+        snap = k32.CreateToolhelp32Snapshot(self.SNAPPROCESS, 0)
+        if not snap or snap == ctypes.c_void_p(-1).value:
+            return {}
+        snap = ctypes.c_void_p(snap)
+        try:
+            entry = self._Entry(dwSize=ctypes.sizeof(self._Entry))
+            ok = k32.Process32FirstW(snap, ctypes.byref(entry))
+            while ok:
+                counts[entry.th32ProcessID] = entry.cntThreads
+                ok = k32.Process32NextW(snap, ctypes.byref(entry))
+        finally:
+            k32.CloseHandle(snap)
+        self._threads, self._threads_at = counts, now
+        return counts
+
+    def memory(self) -> tuple[int, int] | None:
+        status = self._MemoryStatus(dwLength=ctypes.sizeof(self._MemoryStatus))
+        if not self._k32.GlobalMemoryStatusEx(ctypes.byref(status)):
+            return None
+        return status.ullTotalPhys, status.ullAvailPhys
+
+
+def _reader():
+    if os.path.exists("/proc/self/stat"):
+        return _ProcReader()
+    if os.name == "nt":
+        return _WinReader()
+    return None   # macOS וכו': אין דגימה, ה-admission עובד לפי הערכות בלבד
+
+
+READER = _reader()
+
+
+def host_memory() -> tuple[int, int] | None:
+    """(total, available) bytes of physical memory."""
+    return READER.memory() if READER is not None else None
+
+
+class ResourceMonitor:
+    def __init__(self, sessions, interval: float = SAMPLE_EVERY_SEC, reader=READER):
+        """sessions: app.sessions.SessionManager (its running sessions are sampled)."""
+        self._sessions = sessions
+        self.interval = interval
+        self._reader = reader
+        self._lock = threading.Lock()
+        self._prev: dict[int, tuple[float, float]] = {}   # pid → (cpu seconds, at)
+        self._latest: dict[str, ProcessSample] = {}
+        self._history: dict[str, deque] = {}
+        self._thread: threading.Thread | None = None
+        self._stop = threading.Event()
+
+    @property
+    def available(self) -> bool:
+        return self._reader is not None
+
+    def poke(self):
+        """Sessions changed: make sure the sampler runs (it stops by itself when nothing is casting)."""
+        if self._reader is None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, name="resource-monitor", daemon=True)
+                self._thread.start()
+
+    def close(self):
+        self._stop.set()
+
+    def sample(self, serial: str) -> ProcessSample | None:
+        with self._lock:
+            return self._latest.get(serial)
+
+    def samples(self) -> dict[str, ProcessSample]:
+        with self._lock:
+            return dict(self._latest)
+
+    def totals(self) -> ProcessSample:
+        samples = self.samples().values()
+        return ProcessSample(sum(s.cpu_pct for s in samples), sum(s.rss for s in samples),
+                             sum(s.threads or 0 for s in samples), sum(s.handles or 0 for s in samples),
+                             time.time())
+
+    def sample_now(self) -> dict[str, ProcessSample]:
+        """One pass over the running sessions (CPU% is relative to the previous pass)."""
+        running = {s.serial: s.proc.pid for s in self._sessions.running()}
+        now = time.monotonic()
+        fresh, prev = {}, {}
+        for serial, pid in running.items():
+            raw = self._reader.read(pid) if self._reader is not None else None
+            if raw is None:
+                continue
+            cpu, rss, threads, handles = raw
+            with self._lock:
+                before = self._prev.get(pid)
+            prev[pid] = (cpu, now)
+            pct = 0.0 if before is None or now <= before[1] else max(0.0, (cpu - before[0]) / (now - before[1]) * 100)
+            fresh[serial] = ProcessSample(pct, rss, threads, handles, time.time())
+        with self._lock:
+            self._prev = prev
+            self._latest = fresh
+            for serial, sample in fresh.items():
+                self._history.setdefault(serial, deque(maxlen=HISTORY)).append(sample)
+        return fresh
+
+    def export_jsonl(self, path: str):
+        """Every kept sample, one JSON line each ({"serial", "at", "cpu_pct", "rss_mb", ...})."""
+        with self._lock:
+            rows = [(serial, list(h)) for serial, h in self._history.items()]
+        with open(path, "w", encoding="utf-8") as f:
+            for serial, samples in rows:
+                for s in samples:
+                    f.write(json.dumps({"serial": serial, "at": s.at, **s.to_dict()}) + "\n")
+
+    def _loop(self):
+        idle = 0
+        while not self._stop.wait(self.interval):
+            if self.sample_now():
+                idle = 0
+                continue
+            idle += 1
+            if idle < 2:
+                continue
+            with self._lock:
+                # תחת המנעול: poke() שמגיע עכשיו רואה את ה-thread חי רק אם עוד יש שידור
+                if not self._sessions.running():
+                    self._thread = None
+                    return
@@ -1,5 +1,15 @@
-import os, sys, re, subprocess, time
-
+import os, sys, re, subprocess, time, functools
+from concurrent.futures import ThreadPoolExecutor
+from app import adb_client, tracing
+from app.adb_server import AdbServer
+from app.devices import DeviceSnapshot, DeviceTable, is_ip_serial
+from app.endpoint_cache import EndpointCache
+from app.codec_cache import CodecCache
+from app.shell_session import NoChannel, ShellPool
+from app.server_stage import ServerStage
+from app.geometry import GeometryCache, DEFAULT_CROP
+
+@functools.lru_cache(maxsize=None)
 def resource_path(name: str) -> str:
     """Resolve bundled resources for dev, onedir portable, and onefile."""
     if hasattr(sys, "_MEIPASS"):  # PyInstaller one-file temp dir
@@ -19,85 +29,139 @@ def resource_path(name: str) -> str:
     project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     return os.path.join(project_root, "bin", name)
 
-ADB = resource_path("adb.exe")
-SCRCPY = resource_path("scrcpy.exe")
-SCRCPY_SERVER = resource_path("scrcpy-server")  # if you need to check it exists
+# LOGINVRCAST_ADB / LOGINVRCAST_SCRCPY: קבצי הרצה חלופיים (למשל ה-stand-ins של bench/)
+ADB = os.environ.get("LOGINVRCAST_ADB") or resource_path("adb.exe")
+SCRCPY = os.environ.get("LOGINVRCAST_SCRCPY") or resource_path("scrcpy.exe")
+SCRCPY_SERVER = resource_path("scrcpy-server")  # מאומת מראש בכל מכשיר (app/server_stage.py)
 
-CREATE_NO_WINDOW = 0x08000000
+CREATE_NO_WINDOW = 0x08000000 if os.name == "nt" else 0  # מחוץ ל-Windows הדגל לא קיים
 ADB_TIMEOUT_SEC  = 6
 WIRELESS_PORT    = "5555"
+CACHED_CONNECT_TIMEOUT_SEC = 3   # נקודות קצה שמורות: מכשיר כבוי לא יעכב את זרימת ה-USB
+
+ENDPOINTS = EndpointCache()
+CODECS = CodecCache()      # codec/encoder מנצח לכל דגם+קושחה (app/codec_bench.py)
+SHELLS = ShellPool()       # ערוץ adb shell פתוח אחד לכל מכשיר
 
-def _run(cmd):
+def _run(cmd, timeout: float = ADB_TIMEOUT_SEC):
     """
     Run a subprocess with cwd set to the directory of the executable in cmd[0].
     This avoids invalid 'cwd' in one-file builds.
     """
     exe_path = cmd[0]
     workdir = os.path.dirname(exe_path) if os.path.isabs(exe_path) else None
-    return subprocess.run(
-        cmd,
-        cwd=workdir,
-        text=True,
-        capture_output=True,
-        encoding="utf-8",
-        errors="ignore",
-        timeout=ADB_TIMEOUT_SEC,
-        creationflags=CREATE_NO_WINDOW,
-    )
+    with tracing.command(cmd, via="exe", timeout_sec=timeout) as span:
+        return tracing.result(span, subprocess.run(
+            cmd,
+            cwd=workdir,
+            text=True,
+            capture_output=True,
+            encoding="utf-8",
+            errors="ignore",
+            timeout=timeout,
+            creationflags=CREATE_NO_WINDOW,
+        ))
+
+# שרת adb אחד: מופעל פעם אחת, גרסתו נבדקת מול ה-adb המצורף (app/adb_server.py)
+ADB_SERVER = AdbServer(ADB, _run)
+
+def start_adb_server():
+    """Make sure the adb server is up (started once, version checked) — blocking; call from a background thread."""
+    ADB_SERVER.ensure()
+
+# פקודות שמשנות את רשימת המכשירים → ה-snapshot המשותף לא תקף אחריהן
+_CHANGES_DEVICES = ("connect", "disconnect", "tcpip", "usb")
+# פקודות שמאתחלות את adbd במכשיר → ערוץ ה-shell הפתוח שלו מת
+_RESTARTS_ADBD = ("tcpip", "usb")
+# פקודות שפונות למכשיר אחד: בלי -s הן פוגעות ב"מכשיר כלשהו" כשמחוברים כמה
+_TARGETS_DEVICE = ("tcpip", "usb", "shell", "push", "pull", "install", "reboot", "forward", "reverse")
+
+def _adb(args: list[str], timeout: float = ADB_TIMEOUT_SEC):
+    """
+    Run one adb command. Goes in-process over the host protocol when the adb
+    server is up (`-s SERIAL shell` over the device's persistent shell channel);
+    falls back to spawning adb.exe (which also starts the server).
+    """
+    serial = args[1] if args[:1] == ["-s"] and len(args) > 1 else None
+    cmd = args[2] if serial else args[0]
+    if serial is None and cmd in _TARGETS_DEVICE:
+        ready = adb_devices()
+        if len(ready) != 1:
+            return subprocess.CompletedProcess(
+                ["adb", *args], 1, "", f"adb {cmd}: {len(ready)} devices attached, a serial is required")
+        serial = ready[0]
+        args = ["-s", serial, *args]
+    if cmd in _RESTARTS_ADBD:
+        SHELLS.close(serial)
+    try:
+        if serial and cmd == "shell" and len(args) > 3:
+            try:
+                with tracing.command(["adb", *args], ignore=(NoChannel,),
+                                     via="session", timeout_sec=timeout) as span:
+                    return tracing.result(span, SHELLS.run(serial, " ".join(args[3:]), timeout))
+            except NoChannel:
+                pass  # אין ערוץ (שרת למטה / מכשיר לא נמצא), שום דבר לא נשלח — פקודה בודדת כרגיל
+            except (OSError, adb_client.AdbError) as e:
+                # הפקודה כבר נשלחה ואולי רצה — לא מריצים שוב, מחזירים כישלון כמו adb
+                return subprocess.CompletedProcess(["adb", *args], 1, "", f"error: {e}")
+        # שרת לא זמין / פקודה לא נתמכת → ה-span נזרק, ה-adb.exe שאחריו נרשם במקומו
+        with tracing.command(["adb", *args], ignore=(OSError, adb_client.Unsupported),
+                             via="server", timeout_sec=timeout) as span:
+            return tracing.result(span, adb_client.run(args, timeout=timeout))
+    except (OSError, adb_client.Unsupported):
+        if not os.path.exists(ADB):
+            return subprocess.CompletedProcess([ADB, *args], 1, "", "adb not found")
+        return _run([ADB, *args], timeout=timeout)
+    finally:
+        if cmd in _CHANGES_DEVICES:
+            DEVICES.invalidate()
 
 # ---------- helpers from the working app ----------
 
 def _devices_output() -> str:
-    if not os.path.exists(ADB):
-        return ""
-    return _run([ADB, "devices", "-l"]).stdout
+    return _adb(["devices", "-l"]).stdout
+
+# תמונת מצב אחת משותפת לכל העוזרים; DeviceTracker דוחף אליה עדכונים חיים
+DEVICES = DeviceTable(_devices_output)
+# scrcpy-server מאומת (hash) בכל מכשיר מראש, לפני לחיצת "שידור"
+SERVERS = ServerStage(SCRCPY_SERVER, _adb)
+# גודל מסך וחיתוך העין לכל דגם (geometry.json)
+GEOMETRY = GeometryCache(_adb)
 
-def _is_ip_serial(serial: str) -> bool:
-    return ":" in serial and re.match(r"^\d{1,3}(?:\.\d{1,3}){3}:\d{2,5}$", serial) is not None
+_is_ip_serial = is_ip_serial
 
-def quest_state():
+def _snapshot(snap: DeviceSnapshot | None) -> DeviceSnapshot:
+    return DEVICES.snapshot() if snap is None else snap
+
+def quest_state(snap: DeviceSnapshot | None = None):
     wifi_row = None
     usb_row  = None
-    out = _devices_output().splitlines()
-    for line in out[1:]:
-        parts = line.split()
-        if len(parts) < 2: 
-            continue
-        serial, state = parts[0], parts[1]
-        if _is_ip_serial(serial):
+    for r in _snapshot(snap):
+        if r.transport == "wifi":
             if wifi_row is None:
-                wifi_row = ("wifi", state, serial)
+                wifi_row = ("wifi", r.state, r.serial)
         else:
             if usb_row is None:
-                usb_row = ("usb", state, serial)
+                usb_row = ("usb", r.state, r.serial)
     return wifi_row or usb_row or (None, "", None)
 
-def adb_devices():
+def adb_devices(snap: DeviceSnapshot | None = None):
     # רק רשימת serial-ים במצב device (נוח לשימוש פנימי)
-    out = _devices_output().splitlines()
-    res = []
-    for line in out[1:]:
-        parts = line.split()
-        if len(parts) >= 2 and parts[1] == "device":
-            res.append(parts[0])
-    return res
+    return [r.serial for r in _snapshot(snap).ready()]
 
-def first_device_or_none():
-    t, s, serial = quest_state()
+def first_device_or_none(snap: DeviceSnapshot | None = None):
+    t, s, serial = quest_state(snap)
     return serial if serial else None
 
-def first_usb_device_or_none():
-    out = _devices_output().splitlines()
-    for line in out[1:]:
-        parts = line.split()
-        if len(parts) >= 2 and parts[1] in ("device", "unauthorized", "offline"):
-            serial = parts[0]
-            if not _is_ip_serial(serial):
-                return serial
+def first_usb_device_or_none(snap: DeviceSnapshot | None = None):
+    for r in _snapshot(snap):
+        if r.state in ("device", "unauthorized", "offline") and r.transport == "usb":
+            return r.serial
     return None
 
-def status():
-    transport, state, serial = quest_state()
+def status(snap: DeviceSnapshot | None = None):
+    """snap: None = the shared DEVICES snapshot (live while DeviceTracker streams)."""
+    transport, state, serial = quest_state(snap)
     if not serial:
         return {"state": "none", "text": "אין מכשיר מחובר"}
     if state == "unauthorized":
@@ -113,15 +177,44 @@ def status():
             return {"state": "ready", "text": f"מכשיר מחובר בכבל: {serial}"}
     return {"state": "none", "text": "לא ניתן לקבוע מצב חיבור."}
 
-def _list_wlan_ifaces(serial: str) -> list[str]:
+# ---------- Wi-Fi IP discovery (סבב אחד של adb shell) ----------
+
+_IPV4 = r"\d{1,3}(?:\.\d{1,3}){3}"
+_SECTION = "@@LVC@@"
+
+# כל הבדיקות בסקריפט אחד; כל מקטע מסומן כדי לפרק את הפלט מקומית
+_WIFI_PROBE_SCRIPT = "; ".join(
+    f"echo {_SECTION}{name}; {cmd} 2>/dev/null"
+    for name, cmd in (
+        ("route_get", "ip route get 8.8.8.8"),
+        ("link",      "ip -o link show"),
+        ("addr",      "ip -o -4 addr"),
+        ("ifconfig",  "ifconfig"),
+        ("getprop",   "getprop | grep dhcp"),
+        ("route",     "ip route"),
+        ("model",     "getprop ro.product.model"),
+    )
+)
+
+def _split_sections(out: str) -> dict[str, str]:
+    sections, name, buf = {}, None, []
+    for line in out.splitlines():
+        if line.startswith(_SECTION):
+            if name is not None:
+                sections[name] = "\n".join(buf)
+            name, buf = line[len(_SECTION):].strip(), []
+        elif name is not None:
+            buf.append(line)
+    if name is not None:
+        sections[name] = "\n".join(buf)
+    return sections
+
+def _list_wlan_ifaces(link_out: str) -> list[str]:
     """
-    מאתר שמות ממשקים אלחוטיים (wlan*) ומעדיף כאלה שבמצב UP.
+    מאתר שמות ממשקים אלחוטיים (wlan*) מפלט `ip -o link show` ומעדיף כאלה שבמצב UP.
     """
-    out = _run([ADB, "-s", serial, "shell", "ip", "-o", "link", "show"])
-    if out.returncode != 0:
-        return []
     ifaces_up, ifaces_down = [], []
-    for line in out.stdout.splitlines():
+    for line in link_out.splitlines():
         # דוגמה: '3: wlan0: <BROADCAST,MULTICAST,UP,LOWER_UP> ...'
         parts = line.split(":")
         if len(parts) >= 3:
@@ -134,127 +227,144 @@ def _list_wlan_ifaces(serial: str) -> list[str]:
                     ifaces_down.append(name)
     return ifaces_up + ifaces_down  # קודם UP, אחר כך השאר
 
-def _get_ip_from_iface(serial: str, iface: str) -> str | None:
-    # ip -o -4 addr show dev <iface>  => 'inet X.X.X.X/..'
-    out = _run([ADB, "-s", serial, "shell", "ip", "-o", "-4", "addr", "show", "dev", iface])
-    if out.returncode == 0:
-        m = re.search(r"\binet\s+(\d{1,3}(?:\.\d{1,3}){3})/", out.stdout)
-        if m:
-            return m.group(1)
+def _ifconfig_block(ifconfig_out: str, iface: str) -> str:
+    block, inside = [], False
+    for line in ifconfig_out.splitlines():
+        if line and not line[0].isspace():
+            inside = line.split()[0].rstrip(":") == iface
+        if inside:
+            block.append(line)
+    return "\n".join(block)
+
+def _get_ip_from_iface(sections: dict[str, str], iface: str) -> str | None:
+    # ip -o -4 addr  => '3: wlan0    inet X.X.X.X/24 ...'
+    for line in sections.get("addr", "").splitlines():
+        parts = line.split()
+        if len(parts) >= 2 and parts[1] == iface:
+            m = re.search(rf"\binet\s+({_IPV4})/", line)
+            if m:
+                return m.group(1)
 
     # getprop dhcp.<iface>.ipaddress
-    out = _run([ADB, "-s", serial, "shell", "getprop", f"dhcp.{iface}.ipaddress"])
-    if out.returncode == 0:
-        val = (out.stdout or "").strip()
-        if re.match(r"^\d{1,3}(?:\.\d{1,3}){3}$", val):
-            return val
+    m = re.search(rf"\[dhcp\.{re.escape(iface)}\.ipaddress\]\s*:\s*\[({_IPV4})\]", sections.get("getprop", ""))
+    if m:
+        return m.group(1)
 
     # ifconfig <iface> (לבניות ישנות)
-    out = _run([ADB, "-s", serial, "shell", "ifconfig", iface])
-    if out.returncode == 0:
-        m = re.search(r"\binet(?:\s+addr:|\s+)(\d{1,3}(?:\.\d{1,3}){3})", out.stdout)
-        if m:
-            return m.group(1)
+    m = re.search(rf"\binet(?:\s+addr:|\s+)({_IPV4})", _ifconfig_block(sections.get("ifconfig", ""), iface))
+    if m:
+        return m.group(1)
     return None
 
-def _wifi_ip(serial: str) -> str | None:
+def _pick_wifi_ip(sections: dict[str, str]) -> str | None:
     """
-    זיהוי IP אלחוטי אמין:
+    זיהוי IP אלחוטי אמין מתוך פלט הסקריפט:
     1) ip route get 8.8.8.8 -> 'src X.X.X.X'
     2) אם אין, סרוק כל wlan* (UP תחילה) עם ip/addr/getprop/ifconfig
     3) נפילה אחרונה: חיפוש ב-getprop על dhcp.wlan*.ipaddress
     """
     # 1) מסלול ברירת מחדל
-    out = _run([ADB, "-s", serial, "shell", "ip", "route", "get", "8.8.8.8"])
-    if out.returncode == 0:
-        m = re.search(r"\bsrc\s+(\d{1,3}(?:\.\d{1,3}){3})", out.stdout)
-        if m:
-            return m.group(1)
+    m = re.search(rf"\bsrc\s+({_IPV4})", sections.get("route_get", ""))
+    if m:
+        return m.group(1)
 
     # 2) כל wlan*
-    wlans = _list_wlan_ifaces(serial)
+    wlans = _list_wlan_ifaces(sections.get("link", ""))
     if not wlans:
         wlans = ["wlan0", "wlan1"]  # נסיון "עיוור" אם הרשימה ריקה
     for iface in wlans:
-        ip = _get_ip_from_iface(serial, iface)
+        ip = _get_ip_from_iface(sections, iface)
         if ip:
             return ip
 
     # 3) חיפוש כללי ב-getprop
-    out = _run([ADB, "-s", serial, "shell", "getprop"])
-    if out.returncode == 0:
-        m = re.search(r"dhcp\.(wlan\d*).*?ipaddress\]\s*:\s*\[(\d{1,3}(?:\.\d{1,3}){3})\]", out.stdout)
-        if m:
-            return m.group(2)
+    m = re.search(rf"dhcp\.(wlan\d*).*?ipaddress\]\s*:\s*\[({_IPV4})\]", sections.get("getprop", ""))
+    if m:
+        return m.group(2)
     return None
 
+def _wifi_probe(serial: str) -> tuple[str | None, dict[str, str]]:
+    """One adb shell round trip → (ip or None, raw sections for diagnostics)."""
+    out = _adb(["-s", serial, "shell", _WIFI_PROBE_SCRIPT])
+    sections = _split_sections(out.stdout or "")
+    return _pick_wifi_ip(sections), sections
+
+def _wifi_ip(serial: str) -> str | None:
+    return _wifi_probe(serial)[0]
+
 # ---------- one-click wireless ----------
 
-def wireless_auto():
+def _step(job, text: str):
+    """Progress + cancellation point when running under app.jobs (job=None: plain call)."""
+    if job is not None:
+        job.step(text)
+    else:
+        tracing.step(text)
+
+def _sleep(job, seconds: float):
+    if job is None:
+        time.sleep(seconds)
+    else:
+        job.sleep(seconds)
+
+def connect_target(target: str, timeout: float = ADB_TIMEOUT_SEC):
+    """adb connect → (ok, CompletedProcess)."""
+    try:
+        out = _adb(["connect", target], timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return False, subprocess.CompletedProcess(["connect", target], 1, "", "timeout")
+    txt = (out.stdout + out.stderr).lower()
+    ok = out.returncode == 0 and ("connected to" in txt or "already connected" in txt)
+    return ok, out
+
+def reconnect_cached(job=None) -> list[str]:
     """
-    זרימה אוטומטית:
-      1) אם כבר מחובר Wi‑Fi → הצלחה מיד.
-      2) מצא USB 'device' (המתנה קצרה לאישור אם צריך).
-      3) adb tcpip 5555
-      4) חכה רגע קצר ואז שלוף IP (לא רק wlan0)
-      5) adb connect <ip>:5555
+    adb connect במקביל לכל נקודות הקצה השמורות (בלי כבל).
+    מחזיר את רשימת ה-targets שהתחברו; כישלון נרשם ב-cache (ומוחק רשומה שנכשלת שוב ושוב).
     """
-    # 1) כבר מחובר אלחוטית?
-    t, s, ser = quest_state()
-    if t == "wifi" and s == "device":
-        return True, f"המכשיר כבר מחובר אלחוטית ({ser}). אפשר לנתק את הכבל."
-
-    # 2) מצא USB 'device' (עד 6 שניות)
-    usb = None
-    for _ in range(3):
-        tt, st, sr = quest_state()
-        if tt == "usb" and st == "device":
-            usb = sr
-            break
-        time.sleep(2)
-    if not usb:
-        return False, "לא נמצא USB במצב 'device'. ודא שחיברת כבל ואישרת Debug (Always allow)."
-
-    # 3) מעבר ל-tcpip
-    out = _run([ADB, "-s", usb, "tcpip", WIRELESS_PORT])
-    if out.returncode != 0:
-        return False, f"שגיאה במעבר ל-tcpip {WIRELESS_PORT}:\n{out.stdout}\n{out.stderr}"
-
-    # 4) המתנה קצרה ואז שליפת IP
-    time.sleep(1.0)
-    ip = _wifi_ip(usb)
-    if not ip:
-        time.sleep(1.0)
-        ip = _wifi_ip(usb)
-    if not ip:
-        # דיאגנוסטיקה ממוקדת – תעזור אם עדיין נכשל
-        diag_route = _run([ADB, "-s", usb, "shell", "ip", "route"])
-        diag_addr  = _run([ADB, "-s", usb, "shell", "ip", "-o", "-4", "addr"])
-        return False, (
-            "לא נמצא IP אלחוטי. ודא שה‑Wi‑Fi פעיל ושהמחשב וה‑Quest באותה רשת.\n\n"
-            f"ip route:\n{diag_route.stdout}\n"
-            f"ip -o -4 addr:\n{diag_addr.stdout}\n"
-        )
-
-    # 5) חיבור
-    target = f"{ip}:{WIRELESS_PORT}"
-    out = _run([ADB, "connect", target])
-    txt = (out.stdout + out.stderr).lower()
-    if out.returncode != 0 or ("connected to" not in txt and "already connected" not in txt):
-        return False, f"חיבור אל {target} נכשל:\n{out.stdout}\n{out.stderr}"
+    entries = ENDPOINTS.entries()
+    if not entries:
+        return []
+    _step(job, f"מתחבר מחדש ל-{len(entries)} מכשירים שמורים...")
+    targets = {hw: f"{e['ip']}:{e['port']}" for hw, e in entries.items()}
+    with ThreadPoolExecutor(max_workers=min(16, len(targets))) as pool:
+        results = dict(zip(targets, pool.map(
+            tracing.bind(lambda t: connect_target(t, CACHED_CONNECT_TIMEOUT_SEC)[0]), targets.values())))
+    connected = []
+    for hw, ok in results.items():
+        if ok:
+            ENDPOINTS.mark_ok(hw)
+            connected.append(targets[hw])
+        else:
+            ENDPOINTS.mark_failed(hw)
+    return connected
 
-    return True, f"החיבור האלחוטי הצליח אל {target}. אפשר לנתק את הכבל."
+@tracing.traced("wireless_auto")
+def wireless_auto(job=None):
+    """
+    זרימה אוטומטית (מכונת מצבים ב-app/wireless.py):
+      1) אם כבר מחובר Wi‑Fi → הצלחה מיד. אחרת נסה קודם נקודות קצה שמורות (בלי כבל).
+      2) חכה ל-USB 'device' (לפי אירועי ה-tracker / wait-for-usb-device, לא שינה קבועה).
+         אין USB → חיפוש משקפות שכבר מאזינות ברשת (app/lan_discovery.py).
+      3) שלוף IP (עוד ב-USB), adb tcpip 5555, חכה שהפורט יאזין (backoff).
+      4) adb connect <ip>:5555
+    """
+    from app.wireless import WirelessConnect
+    return WirelessConnect(job).run()
 
-def wireless_disconnect():
+@tracing.traced("wireless_disconnect")
+def wireless_disconnect(job=None, serial: str | None = None):
     """
     ניתוק חיבור אלחוטי (adb disconnect) וחזרה ל-USB.
+    serial: נקודת קצה מסוימת (ip:port); None = המכשיר הראשון.
     """
-    dev = first_device_or_none()
+    _step(job, "מנתק חיבור אלחוטי...")
+    dev = serial or first_device_or_none()
     if dev and _is_ip_serial(dev):
-        # אם אנחנו כרגע על Wi-Fi, ננתק
-        _run([ADB, "disconnect", dev])
-        # החזר ל-USB (יעזור ל-ADB לחזור למצב חיבור בכבל)
-        _run([ADB, "usb"])
+        # adbd של המכשיר הזה חוזר ל-USB דרך החיבור האלחוטי עצמו, ואז מנתקים
+        # (אחרי disconnect, `adb usb` בלי -s היה פוגע במכשיר אחר שמחובר בכבל)
+        _adb(["-s", dev, "usb"])
+        _adb(["disconnect", dev])
         return True, f"החיבור האלחוטי נותק ({dev})."
     return False, "לא נמצא חיבור אלחוטי פעיל לנתק."
 
@@ -265,12 +375,64 @@ def _map_renderer_name(human_name: str) -> str:
     name = (human_name or "").strip().lower()
     return "opengl" if name.startswith("open") else "direct3d"
 
-def start_scrcpy(renderer: str = "OpenGL", crop_mode: str = "crop"):
+def castable_devices(snap: DeviceSnapshot | None = None) -> list[str]:
+    """
+    serial-ים במצב device שאפשר לשדר מהם, Wi‑Fi קודם.
+    Quest שמחובר גם בכבל וגם אלחוטית מופיע פעם אחת (לפי ה-cache של נקודות הקצה).
+    """
+    ready = [r.serial for r in _snapshot(snap).ready()]
+    wifi = [s for s in ready if _is_ip_serial(s)]
+    endpoints = ENDPOINTS.entries()
+    usb = [s for s in ready if not _is_ip_serial(s)
+           and not (s in endpoints and f"{endpoints[s]['ip']}:{endpoints[s]['port']}" in wifi)]
+    return wifi + usb
+
+def display_geometry(serial: str, snap: DeviceSnapshot | None = None):
+    """app.geometry.Geometry for this headset's model, None when it cannot be read (→ DEFAULT_CROP)."""
+    rec = _snapshot(snap).get(serial)
+    model = (rec.model if rec is not None else "") or device_key(serial).split("|")[0]
+    return GEOMETRY.get(serial, model)
+
+def prefetch_geometry(snap: DeviceSnapshot | None = None):
+    """Read the display of every model not seen yet, in the background."""
+    GEOMETRY.prefetch([(r.serial, r.model) for r in _snapshot(snap).ready()])
+
+_device_keys: dict[str, str] = {}
+
+def device_key(serial: str) -> str:
+    """'<model>|<build fingerprint>' — one shell round trip per serial, then memoized."""
+    key = _device_keys.get(serial)
+    if key is None:
+        out = _adb(["-s", serial, "shell", "getprop ro.product.model; getprop ro.build.fingerprint"])
+        lines = [l.strip() for l in (out.stdout or "").splitlines() if l.strip()]
+        if out.returncode != 0 or not lines:
+            return ""
+        key = _device_keys[serial] = "|".join(lines[:2])
+    return key
+
+@tracing.traced("cast_launch")
+def start_scrcpy(renderer: str = "OpenGL", crop_mode: str = "crop", job=None, serial: str | None = None,
+                 quality=None, codec: tuple[str, str] | None = None, extra_args: list[str] | None = None):
+    """
+    quality: app.quality.QualityLevel (bit rate / max fps / max size), None = scrcpy defaults.
+    codec: (video codec, encoder); None = the benchmark winner for this model, if any.
+    extra_args: more scrcpy flags (e.g. the --record pipe of app/relay.py).
+    """
     sdl_driver = _map_renderer_name(renderer)
 
-    # בחר את הדגל לפי הבורר: "crop" או "client-crop"
-    crop_key = "client-crop" if str(crop_mode).lower().startswith("client") else "crop"
-    crop_arg = f"--{crop_key}=1600:904:2017:510"
+    dev = serial
+    if dev is None:
+        _step(job, "מאתר מכשיר לשידור...")
+        dev = first_device_or_none()
+
+    # בחר את הדגל לפי הבורר: "crop" (חיתוך במכשיר — מקודדים רק את העין) או "client-crop"
+    client = str(crop_mode).lower().startswith("client")
+    max_size = quality.max_size if quality is not None else 0
+    geo = display_geometry(dev) if dev else None
+    if geo is not None:
+        crop_arg, max_size = geo.scrcpy_args(client, max_size)
+    else:
+        crop_arg = f"--{'client-crop' if client else 'crop'}={DEFAULT_CROP}"
 
     args = [
         SCRCPY,
@@ -279,14 +441,37 @@ def start_scrcpy(renderer: str = "OpenGL", crop_mode: str = "crop"):
         "--always-on-top",
         "--stay-awake",
         f"--render-driver={sdl_driver}",
+        "--print-fps",          # טלמטריה: שורת FPS בכל שנייה (app/telemetry.py)
     ]
+    if quality is not None:
+        args += quality._replace(max_size=max_size).args()
+    elif max_size:
+        args.append(f"--max-size={max_size}")
+    if extra_args:
+        args += extra_args
 
-    dev = first_device_or_none()
     if dev:
         args.append(f"--serial={dev}")
+        args.append(f"--window-title=LoginVRCast – {dev}")  # כמה חלונות במקביל: לדעת מי זה מי
+        if codec is None and CODECS:
+            codec = CODECS.get(device_key(dev))
+    if codec is not None:
+        args += [f"--video-codec={codec[0]}", f"--video-encoder={codec[1]}"]
 
     env = os.environ.copy()
     env["SDL_RENDER_DRIVER"] = sdl_driver
+    if os.path.exists(SCRCPY_SERVER):
+        env["SCRCPY_SERVER_PATH"] = SCRCPY_SERVER  # אותו קובץ שאומת במכשיר (SERVERS)
 
     scrcpy_dir = os.path.dirname(SCRCPY)
-    return subprocess.Popen(args, cwd=scrcpy_dir, env=env, creationflags=CREATE_NO_WINDOW)
\ No newline at end of file
+    _step(job, "מפעיל scrcpy...")
+    # הפלט נקרא ע"י threads של ScrcpyTelemetry — מי שמפעיל חייב לקרוא את ה-pipes
+    # ה-span מודד את ההפעלה בלבד (התהליך עצמו חי עד סוף השידור)
+    with tracing.command(args, via="spawn") as span:
+        proc = subprocess.Popen(
+            args, cwd=scrcpy_dir, env=env, creationflags=CREATE_NO_WINDOW,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="ignore", bufsize=1,
+        )
+        span.set(pid=proc.pid)
+    return proc
\ No newline at end of file
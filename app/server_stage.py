@@ -0,0 +1,96 @@
+"""
+scrcpy-server staged on each headset ahead of the cast.
+
+The bundled scrcpy-server is hashed once per run; on each device the copy at
+REMOTE_PATH is compared against that hash (one shell round trip) and pushed
+only when it is missing or different. Devices are staged in the background as
+soon as they show up, so a failing push (storage full, device gone) surfaces
+before the click instead of as a scrcpy that never draws a frame, and a
+verified copy is on the device for anything that starts the server directly.
+"""
+import functools, hashlib, subprocess, threading
+
+REMOTE_PATH = "/data/local/tmp/scrcpy-server.jar"   # אותו נתיב ש-scrcpy עצמו דוחף אליו
+PUSH_TIMEOUT_SEC = 20
+
+
+@functools.lru_cache(maxsize=None)
+def local_hash(path: str) -> str | None:
+    """sha256 of the bundled server (None when it is missing)."""
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()
+    except OSError:
+        return None
+
+
+class ServerStage:
+    def __init__(self, local_path: str, adb):
+        """adb(args, timeout=...) -> CompletedProcess (normally scrcpy_runner._adb)."""
+        self.local_path = local_path
+        self._adb = adb
+        self._lock = threading.Lock()
+        self._verified: dict[str, str] = {}          # serial → hash שאומת במכשיר
+        self._busy: dict[str, threading.Lock] = {}   # push אחד לכל מכשיר בו-זמנית
+        self.errors: dict[str, str] = {}
+
+    def ready(self, serial: str) -> bool:
+        h = local_hash(self.local_path)
+        with self._lock:
+            return h is not None and self._verified.get(serial) == h
+
+    def ensure(self, serial: str) -> bool:
+        """Verify (and push if needed) the server on one device → True when it matches."""
+        want = local_hash(self.local_path)
+        if want is None:
+            return False
+        with self._lock:
+            busy = self._busy.setdefault(serial, threading.Lock())
+        with busy:
+            if self.ready(serial):
+                return True
+            try:
+                ok = self._remote_hash(serial) == want or (self._push(serial) and self._remote_hash(serial) == want)
+            except subprocess.TimeoutExpired:
+                ok = False
+            with self._lock:
+                if ok:
+                    self._verified[serial] = want
+                    self.errors.pop(serial, None)
+                else:
+                    self.errors.setdefault(serial, "האימות של scrcpy-server במכשיר נכשל")
+            return ok
+
+    def prestage(self, serials: list[str]):
+        """ensure() in the background for every serial not staged yet (returns immediately)."""
+        for serial in serials:
+            if self.ready(serial):
+                continue
+            with self._lock:
+                busy = self._busy.setdefault(serial, threading.Lock())
+            if busy.locked():
+                continue
+            threading.Thread(target=self.ensure, args=(serial,), name=f"stage-{serial}", daemon=True).start()
+
+    def forget(self, serial: str | None = None):
+        with self._lock:
+            if serial is None:
+                self._verified.clear()
+                self.errors.clear()
+            else:
+                self._verified.pop(serial, None)
+                self.errors.pop(serial, None)
+
+    # ---------- internals ----------
+
+    def _remote_hash(self, serial: str) -> str | None:
+        out = self._adb(["-s", serial, "shell", f"sha256sum {REMOTE_PATH} 2>/dev/null"])
+        parts = (out.stdout or "").split()
+        return parts[0].lower() if out.returncode == 0 and parts else None
+
+    def _push(self, serial: str) -> bool:
+        out = self._adb(["-s", serial, "push", self.local_path, REMOTE_PATH], timeout=PUSH_TIMEOUT_SEC)
+        if out.returncode != 0:
+            with self._lock:
+                self.errors[serial] = (out.stderr or out.stdout or "push failed").strip()
+        return out.returncode == 0
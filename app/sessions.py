@@ -0,0 +1,236 @@
+"""
+Cast session manager: one supervised scrcpy process per device serial.
+
+Each session keeps its own renderer/crop settings, lifecycle state and exit
+code. Sessions start and stop in parallel; stopping everything terminates all
+processes first and then waits on one shared deadline, instead of 2 s per
+process in sequence. A restart (new renderer/crop/quality) launches the new
+process right after terminating the old one and reaps the old one in the
+background. Every session records when it was requested, so the time from
+the click to its first frame can be reported. The launcher is injectable so
+the manager can be driven by a stand-in scrcpy executable.
+"""
+import threading, time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import tracing
+from app.telemetry import ERROR, ScrcpyTelemetry
+
+STOP_TIMEOUT_SEC = 2
+
+# מצבי session
+STARTING, RUNNING, STOPPING, EXITED, FAILED = "starting", "running", "stopping", "exited", "failed"
+
+
+class CastSession:
+    def __init__(self, serial: str, renderer: str, crop_mode: str, quality=None,
+                 requested_at: float | None = None, extra_args: list[str] | None = None):
+        self.serial = serial
+        self.renderer = renderer
+        self.crop_mode = crop_mode
+        self.quality = quality
+        self.extra_args = list(extra_args or [])
+        self.state = STARTING
+        self.proc = None
+        self.exit_code = None
+        self.error = ""
+        self.requested_at = time.time() if requested_at is None else requested_at  # הלחיצה
+        self.started_at = None
+        self.ended_at = None
+        self.telemetry: ScrcpyTelemetry | None = None
+
+    @property
+    def running(self) -> bool:
+        return self.proc is not None and self.proc.poll() is None
+
+    @property
+    def first_frame_sec(self) -> float | None:
+        """Click (or restart) → first frame on screen, None until it arrives."""
+        if self.telemetry is None or self.telemetry.first_frame_at is None:
+            return None
+        return self.telemetry.first_frame_at - self.requested_at
+
+    def __repr__(self):
+        return f"CastSession({self.serial!r}, state={self.state}, exit_code={self.exit_code})"
+
+
+class SessionManager:
+    def __init__(self, launcher, on_change=None, on_telemetry=None, on_exit=None):
+        """
+        launcher(renderer, crop_mode, serial=..., job=..., quality=..., [extra_args=...]) -> Popen
+        (normally start_scrcpy).
+        on_change() is called from worker threads whenever a session changes state;
+        on_telemetry(serial, event) for every parsed scrcpy log event;
+        on_exit(session) once its process is gone (state already EXITED/FAILED).
+        """
+        self._launcher = launcher
+        self._on_change = on_change
+        self._on_telemetry = on_telemetry
+        self._on_exit = on_exit
+        self._lock = threading.Lock()
+        self._sessions: dict[str, CastSession] = {}
+
+    # ---------- queries ----------
+
+    def get(self, serial: str) -> CastSession | None:
+        with self._lock:
+            return self._sessions.get(serial)
+
+    def sessions(self) -> list[CastSession]:
+        with self._lock:
+            return list(self._sessions.values())
+
+    def running(self) -> list[CastSession]:
+        return [s for s in self.sessions() if s.running]
+
+    # ---------- start ----------
+
+    def start(self, serial: str, renderer: str, crop_mode: str, job=None, quality=None,
+              requested_at: float | None = None, extra_args: list[str] | None = None) -> CastSession:
+        """
+        Start (or restart) the session for one serial. A session already running
+        is terminated but not waited for: the new one starts meanwhile.
+        """
+        session = CastSession(serial, renderer, crop_mode, quality, requested_at, extra_args)
+        with self._lock:
+            old = self._sessions.pop(serial, None)
+            self._sessions[serial] = session
+        if old is not None:
+            # scrcpy שמקליט ל-pipe של relay: החדש יכול לפתוח אותו רק אחרי שהישן סגר
+            self._retire([old], background=not old.extra_args)
+        self._changed()
+        launch = {"extra_args": session.extra_args} if session.extra_args else {}
+        try:
+            session.proc = self._launcher(renderer, crop_mode, serial=serial, job=job, quality=quality, **launch)
+        except Exception as e:
+            session.state, session.error = FAILED, str(e)
+            session.ended_at = time.time()
+            self._changed()
+            raise
+        session.telemetry = ScrcpyTelemetry(session.proc, on_event=self._telemetry_cb(serial))
+        session.state = RUNNING
+        session.started_at = time.time()
+        threading.Thread(target=self._supervise, args=(session,),
+                         name=f"scrcpy-{serial}", daemon=True).start()
+        self._changed()
+        return session
+
+    def start_many(self, serials: list[str], renderer: str, crop_mode: str, job=None,
+                   quality_for=None, requested_at: float | None = None) -> dict[str, str]:
+        """
+        Start sessions in parallel → {serial: error text}, empty when all started.
+        quality_for(serial) gives each session its own quality settings;
+        requested_at is the click time (default: now).
+        """
+        errors = {}
+        if not serials:
+            return errors
+
+        def one(serial):
+            try:
+                quality = quality_for(serial) if quality_for else None
+                self.start(serial, renderer, crop_mode, job=job, quality=quality, requested_at=requested_at)
+            except Exception as e:
+                errors[serial] = str(e)
+
+        with ThreadPoolExecutor(max_workers=min(16, len(serials))) as pool:
+            list(pool.map(tracing.bind(one), serials))
+        return errors
+
+    # ---------- stop ----------
+
+    def stop(self, serial: str, timeout: float = STOP_TIMEOUT_SEC):
+        self.stop_many([serial], timeout)
+
+    def stop_all(self, timeout: float = STOP_TIMEOUT_SEC):
+        self.stop_many([s.serial for s in self.sessions()], timeout)
+
+    def stop_many(self, serials: list[str], timeout: float = STOP_TIMEOUT_SEC):
+        """terminate לכולם קודם, ואז המתנה משותפת אחת; מי שלא יצא עד אז — kill."""
+        with self._lock:
+            victims = [self._sessions.pop(s) for s in serials if s in self._sessions]
+        self._retire(victims, timeout)
+        if victims:
+            self._changed()
+
+    # ---------- restart ----------
+
+    def restart(self, serial: str, **changes) -> CastSession | None:
+        """Relaunch a running session with some settings changed (renderer/crop_mode/quality)."""
+        old = self.get(serial)
+        if old is None or not old.running:
+            return None
+        settings = {"renderer": old.renderer, "crop_mode": old.crop_mode, "quality": old.quality,
+                    "extra_args": old.extra_args, **changes}
+        return self.start(serial, settings["renderer"], settings["crop_mode"], quality=settings["quality"],
+                          extra_args=settings["extra_args"])
+
+    def restart_many(self, serials: list[str] | None = None, **changes) -> dict[str, str]:
+        """restart() in parallel (None = every running session) → {serial: error text}."""
+        if serials is None:
+            serials = [s.serial for s in self.running()]
+        errors = {}
+        if not serials:
+            return errors
+
+        def one(serial):
+            try:
+                self.restart(serial, **changes)
+            except Exception as e:
+                errors[serial] = str(e)
+
+        with ThreadPoolExecutor(max_workers=min(16, len(serials))) as pool:
+            list(pool.map(tracing.bind(one), serials))
+        return errors
+
+    # ---------- internals ----------
+
+    def _retire(self, victims: list[CastSession], timeout: float = STOP_TIMEOUT_SEC, background: bool = False):
+        """terminate עכשיו; ההמתנה ליציאה (ו-kill למי שלא יצא) — כאן או ב-thread ברקע."""
+        for session in victims:
+            if session.running:
+                session.state = STOPPING
+                session.proc.terminate()
+        if background:
+            threading.Thread(target=self._reap, args=(victims, timeout),
+                             name="scrcpy-retire", daemon=True).start()
+        else:
+            self._reap(victims, timeout)
+
+    @staticmethod
+    def _reap(victims: list[CastSession], timeout: float):
+        deadline = time.monotonic() + timeout
+        for session in victims:
+            if session.proc is None:
+                continue
+            try:
+                session.proc.wait(timeout=max(0.0, deadline - time.monotonic()))
+            except Exception:
+                session.proc.kill()
+                session.proc.wait()
+
+    def _supervise(self, session: CastSession):
+        code = session.proc.wait()
+        session.telemetry.join(timeout=1)
+        session.telemetry.record_exit(code)
+        session.exit_code = code
+        session.ended_at = time.time()
+        # session שהסתיים מעצמו נשאר ברשימה (עם קוד היציאה) עד start/stop הבא
+        if session.state == STOPPING or code == 0:
+            session.state = EXITED
+        else:
+            session.state = FAILED
+            errors = session.telemetry.events(ERROR)
+            session.error = errors[-1].text if errors else f"scrcpy נסגר עם קוד {code}"
+        self._changed()
+        if self._on_exit is not None:
+            self._on_exit(session)
+
+    def _telemetry_cb(self, serial: str):
+        if self._on_telemetry is None:
+            return None
+        return lambda ev: self._on_telemetry(serial, ev)
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change()
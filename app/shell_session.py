@@ -0,0 +1,220 @@
+"""
+Long-lived `adb shell` channel per device.
+
+Instead of a new transport handshake (or a new adb.exe) for every shell
+command, each device keeps one `shell:sh` stream open. Commands are written
+to it one at a time, each followed by a printf of a unique sentinel and the
+exit status, which frames its output. Callers on different threads are
+serialized per device, and each command's stdin is /dev/null. A channel that
+died (adbd restarted, cable pulled) is respawned and the command retried once
+only while nothing of it was sent; NoChannel means it was never sent at all.
+Channels idle for IDLE_SEC are closed in the background.
+"""
+import itertools, socket, subprocess, threading, time, uuid
+
+from app import adb_client
+
+IDLE_SEC = 30
+REAP_EVERY_SEC = 5
+
+
+class _Unsent(OSError):
+    """The command never left: the write failed before any byte was sent."""
+
+
+class NoChannel(adb_client.AdbError):
+    """No shell channel could be opened or written to — the command was not sent."""
+
+
+class ShellSession:
+    def __init__(self, serial: str):
+        self.serial = serial
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+        self.spawns = 0          # כמה פעמים נפתח ערוץ (למדידה)
+        self._sock: socket.socket | None = None
+        self._buf = b""
+        self._tag = uuid.uuid4().hex[:8]
+        self._ids = itertools.count(1)
+
+    @property
+    def alive(self) -> bool:
+        return self._sock is not None
+
+    def run(self, command: str, timeout: float = adb_client.SOCKET_TIMEOUT_SEC) -> subprocess.CompletedProcess:
+        """One command → CompletedProcess (stdout holds stdout+stderr, like adb's legacy shell)."""
+        with self.lock:
+            self.last_used = time.monotonic()
+            if self._sock is not None and self._stale():
+                self._close()   # ערוץ ישן מת בינתיים (adbd הופעל מחדש, כבל נותק)
+            fresh = self._sock is None
+            if fresh:
+                self._open(timeout)
+            try:
+                return self._exchange(command, timeout)
+            except _Unsent as e:
+                self._close()
+                if fresh:
+                    raise NoChannel(str(e)) from e
+            except (OSError, adb_client.AdbError, subprocess.TimeoutExpired):
+                # הפקודה אולי כבר רצה — לא מריצים אותה שוב
+                self._close()
+                raise
+            # הכתיבה לערוץ הישן נכשלה לפני שיצא ממנה בית אחד — פעם אחת על ערוץ חדש
+            self._open(timeout)
+            try:
+                return self._exchange(command, timeout)
+            except _Unsent as e:
+                self._close()
+                raise NoChannel(str(e)) from e
+            except (OSError, adb_client.AdbError, subprocess.TimeoutExpired):
+                self._close()
+                raise
+
+    def close(self):
+        with self.lock:
+            self._close()
+
+    # ---------- internals (under self.lock) ----------
+
+    def _open(self, timeout: float):
+        try:
+            self._spawn(timeout)
+        except (OSError, adb_client.AdbError) as e:
+            self._close()
+            raise NoChannel(str(e)) from e
+
+    def _spawn(self, timeout: float):
+        try:
+            self._sock = adb_client.open_service(self.serial, "shell:sh", timeout)
+        except socket.timeout as e:
+            raise subprocess.TimeoutExpired(["adb", "-s", self.serial, "shell"], timeout) from e
+        self._buf = b""
+        self.spawns += 1
+        self._sock.sendall(b"exec 2>&1\n")  # כמו adb shell: stderr באותו זרם
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._buf = b""
+
+    def _stale(self) -> bool:
+        """An idle channel the other side already closed (EOF or error waiting on it)."""
+        try:
+            self._sock.settimeout(0)
+            return self._sock.recv(1, socket.MSG_PEEK) == b""
+        except (BlockingIOError, socket.timeout):
+            return False
+        except OSError:
+            return True
+
+    def _send(self, data: bytes):
+        """sendall that raises _Unsent when the channel failed before taking a single byte."""
+        sent = 0
+        try:
+            while sent < len(data):
+                sent += self._sock.send(data[sent:])
+        except OSError as e:
+            if sent == 0:
+                raise _Unsent(str(e)) from e
+            raise
+
+    def _exchange(self, command: str, timeout: float) -> subprocess.CompletedProcess:
+        args = ["adb", "-s", self.serial, "shell", command]
+        sentinel = f"__LVC_{self._tag}_{next(self._ids)}__"
+        self._sock.settimeout(timeout)
+        # stdin מ-/dev/null: פקודה שקוראת קלט לא תבלע את השורות הבאות של הערוץ
+        self._send(f"{{ {command}\n}} </dev/null\nprintf '\\n%s:%s\\n' {sentinel} \"$?\"\n".encode("utf-8"))
+        marker = f"\n{sentinel}:".encode()
+        deadline = time.monotonic() + timeout
+        while True:
+            i = self._buf.find(marker)
+            if i >= 0:
+                j = self._buf.find(b"\n", i + len(marker))
+                if j >= 0:
+                    body, status = self._buf[:i], self._buf[i + len(marker):j]
+                    self._buf = self._buf[j + 1:]
+                    try:
+                        rc = int(status.strip() or 1)
+                    except ValueError:
+                        rc = 1
+                    out = body.decode("utf-8", errors="ignore").replace("\r\n", "\n")
+                    return subprocess.CompletedProcess(args, rc, out, "")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise subprocess.TimeoutExpired(args, timeout)
+            self._sock.settimeout(remaining)
+            try:
+                chunk = self._sock.recv(65536)
+            except socket.timeout as e:
+                raise subprocess.TimeoutExpired(args, timeout) from e
+            if not chunk:
+                raise adb_client.AdbError("shell channel closed")
+            self._buf += chunk
+
+
+class ShellPool:
+    """One ShellSession per serial, closed after IDLE_SEC without use."""
+
+    def __init__(self, idle_sec: float = IDLE_SEC):
+        self.idle_sec = idle_sec
+        self._lock = threading.Lock()
+        self._sessions: dict[str, ShellSession] = {}
+        self._reaper: threading.Thread | None = None
+
+    def run(self, serial: str, command: str,
+            timeout: float = adb_client.SOCKET_TIMEOUT_SEC) -> subprocess.CompletedProcess:
+        return self._get(serial).run(command, timeout)
+
+    def close(self, serial: str | None = None):
+        """Close one device's channel (e.g. before tcpip/usb restarts adbd), or all of them."""
+        with self._lock:
+            if serial is None:
+                victims = list(self._sessions.values())
+                self._sessions.clear()
+            else:
+                session = self._sessions.pop(serial, None)
+                victims = [session] if session is not None else []
+        for session in victims:
+            session.close()
+
+    def close_idle(self):
+        now = time.monotonic()
+        with self._lock:
+            idle = [s for s in self._sessions.values() if now - s.last_used >= self.idle_sec]
+        for session in idle:
+            # בשימוש כרגע → לא נוגעים; ייבדק שוב בסבב הבא
+            if not session.lock.acquire(blocking=False):
+                continue
+            try:
+                if time.monotonic() - session.last_used < self.idle_sec:
+                    continue
+                session._close()
+                with self._lock:
+                    if self._sessions.get(session.serial) is session:
+                        del self._sessions[session.serial]
+            finally:
+                session.lock.release()
+
+    def _get(self, serial: str) -> ShellSession:
+        with self._lock:
+            session = self._sessions.get(serial)
+            if session is None:
+                session = self._sessions[serial] = ShellSession(serial)
+            if self._reaper is None or not self._reaper.is_alive():
+                self._reaper = threading.Thread(target=self._reap, name="adb-shell-reaper", daemon=True)
+                self._reaper.start()
+            return session
+
+    def _reap(self):
+        while True:
+            time.sleep(REAP_EVERY_SEC)
+            self.close_idle()
+            with self._lock:
+                if not self._sessions:
+                    self._reaper = None
+                    return
@@ -0,0 +1,62 @@
+"""
+Startup timing mode: `python -m app.main --startup-timing` (or LoginVRCast.exe
+--startup-timing) measures import time, time to first paint and time to first
+device status, prints them as one JSON line, appends the same line to
+startup_timing.jsonl in the data directory and exits — so regressions can be
+compared between builds.
+"""
+import json, sys, time
+from PySide6.QtCore import QObject, QEvent, QTimer
+
+from app import __version__
+from app.storage import data_path
+
+FLAG = "--startup-timing"
+GIVE_UP_SEC = 30
+
+
+def requested(argv: list[str]) -> bool:
+    return FLAG in argv
+
+
+class StartupTimer(QObject):
+    def __init__(self, t0: float, app):
+        super().__init__()
+        self._t0 = t0
+        self._app = app
+        self.marks: dict[str, float] = {}
+        self._done = False
+        QTimer.singleShot(GIVE_UP_SEC * 1000, self.finish)
+
+    def mark(self, name: str, at: float | None = None):
+        """ms since process start (first mark of a name wins); `at` = an earlier perf_counter()."""
+        at = time.perf_counter() if at is None else at
+        self.marks.setdefault(name, round((at - self._t0) * 1000, 1))
+
+    def watch_first_paint(self, widget):
+        widget.installEventFilter(self)
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Type.Paint and "first_paint" not in self.marks:
+            self.mark("first_paint")
+            obj.removeEventFilter(self)
+        return False
+
+    def first_status(self):
+        self.mark("first_status")
+        self.finish()
+
+    def finish(self):
+        if self._done:
+            return
+        self._done = True
+        line = json.dumps({"version": __version__, "time": time.time(), **self.marks})
+        if sys.stdout is not None:  # --noconsole build: אין stdout, רק הקובץ
+            print(line, flush=True)
+        try:
+            with open(data_path("startup_timing.jsonl"), "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+        except OSError as e:
+            if sys.stderr is not None:
+                print(f"startup timing not saved: {e}", file=sys.stderr)
+        QTimer.singleShot(0, self._app.quit)
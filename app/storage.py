@@ -0,0 +1,45 @@
+"""
+Per-user data files (caches, remembered settings) as small JSON documents.
+
+Windows: %APPDATA%\\LoginVRCast. Elsewhere: $XDG_CONFIG_HOME/LoginVRCast or
+~/.config/LoginVRCast. LOGINVRCAST_DATA_DIR overrides both (handy for tests/benchmarks).
+"""
+import json, os, tempfile
+
+from app import __appname__
+
+
+def data_dir() -> str:
+    base = os.environ.get("LOGINVRCAST_DATA_DIR")
+    if not base:
+        root = os.environ.get("APPDATA") or os.environ.get("XDG_CONFIG_HOME") \
+            or os.path.join(os.path.expanduser("~"), ".config")
+        base = os.path.join(root, __appname__)
+    os.makedirs(base, exist_ok=True)
+    return base
+
+def data_path(name: str) -> str:
+    return os.path.join(data_dir(), name)
+
+def load_json(name: str, default):
+    """Read a JSON data file; a missing or corrupt file yields `default`."""
+    try:
+        with open(data_path(name), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+def save_json(name: str, data):
+    """Atomic write (temp file + replace) so a crash never leaves half a file."""
+    path = data_path(name)
+    fd, tmp = tempfile.mkstemp(prefix=name, suffix=".tmp", dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
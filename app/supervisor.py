@@ -0,0 +1,231 @@
+"""
+Self-healing casts.
+
+A cast that was up (first frame shown, or running for ESTABLISHED_SEC) whose
+scrcpy died on its own (non-zero exit: Wi‑Fi dropped, device disconnected) or
+whose adb transport vanished from the device tracker is recovered without
+anyone clicking: the transport is brought back (`adb
+connect` to the same Wi‑Fi endpoint, or waiting for the USB device to come
+back), retried with jittered exponential backoff, and the cast is relaunched
+with the same renderer/crop/quality settings. Reconnect attempts of all
+devices share one token bucket, so a router reboot with thirty headsets does
+not turn into thirty simultaneous reconnect loops. Every outage — reason,
+down/recovered times, attempts, outcome — is kept and saved to outages.json.
+A cast that never got going (unauthorized device, bad encoder or crop,
+missing server) is not an outage: it fails like any other cast error, and
+so does a recovery that gives up after MAX_OUTAGE_SEC.
+"""
+import random, threading, time
+
+from app import scrcpy_runner as runner, tracing
+from app.devices import is_ip_serial
+from app.sessions import FAILED
+from app.storage import load_json, save_json
+
+STORE_FILE = "outages.json"
+KEEP_OUTAGES = 200
+
+BACKOFF_START_SEC = 0.5
+BACKOFF_MAX_SEC = 10
+JITTER = 0.2                 # ±20% — מכשירים שנפלו יחד לא מנסים באותו רגע
+MAX_OUTAGE_SEC = 5 * 60      # אחרי זה מוותרים (והמשתמש רואה שהשידור נעצר)
+FIRST_FRAME_WAIT_SEC = 15
+ESTABLISHED_SEC = 10         # בלי פריים ראשון: כמה זמן scrcpy צריך לרוץ כדי להיחשב שידור שעלה
+CONNECT_TIMEOUT_SEC = 4
+RATE_PER_SEC = 8             # ניסיונות חיבור מחדש לשנייה, לכל המכשירים יחד
+RATE_BURST = 16
+
+# סיבות
+EXITED, TRANSPORT_LOST = "scrcpy_exit", "transport_lost"
+# תוצאות
+RECOVERED, GAVE_UP, CANCELLED = "recovered", "gave_up", "cancelled"
+
+
+class RateLimiter:
+    """Token bucket shared by all recoveries."""
+
+    def __init__(self, rate: float = RATE_PER_SEC, burst: int = RATE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, stop: threading.Event | None = None):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._at) * self.rate)
+                self._at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            if stop is not None:
+                stop.wait(wait)
+            else:
+                time.sleep(wait)
+
+
+def established(session) -> bool:
+    """The cast was up before it ended: a first frame arrived, or it ran for ESTABLISHED_SEC."""
+    if session.telemetry is not None and session.telemetry.first_frame_at is not None:
+        return True
+    if session.started_at is None:
+        return False
+    return (session.ended_at or time.time()) - session.started_at >= ESTABLISHED_SEC
+
+
+def _backoff():
+    delay = BACKOFF_START_SEC
+    while True:
+        yield delay * random.uniform(1 - JITTER, 1 + JITTER)
+        delay = min(delay * 2, BACKOFF_MAX_SEC)
+
+
+class CastSupervisor:
+    def __init__(self, sessions, on_change=None, limiter: RateLimiter | None = None,
+                 store_file: str = STORE_FILE, on_gave_up=None):
+        """
+        sessions: app.sessions.SessionManager — wire its on_exit to on_exit() here.
+        on_change() is called (from worker threads) when a recovery starts or ends,
+        on_gave_up(serial, error) when a recovery ran out of time.
+        """
+        self._sessions = sessions
+        self._on_change = on_change
+        self._on_gave_up = on_gave_up
+        self._limiter = limiter or RateLimiter()
+        self._store_file = store_file
+        self._lock = threading.Lock()
+        self._recovering: dict[str, dict] = {}    # serial → outage בתהליך
+        self._outages: list[dict] | None = None   # נטען בשימוש הראשון
+        self._stop = threading.Event()
+
+    # ---------- triggers ----------
+
+    def on_exit(self, session):
+        """SessionManager callback: a scrcpy process is gone."""
+        if session.state != FAILED or self._sessions.get(session.serial) is not session:
+            return  # נעצר ע"י המשתמש / יצא כרגיל (חלון נסגר) / כבר הוחלף
+        if not established(session):
+            return  # נכשל בעלייה — שגיאת שידור רגילה, לא נפילה לשחזר
+        self._begin(session, EXITED)
+
+    def on_devices(self, snap=None):
+        """Tracker update: a casting serial that is no longer 'device' lost its transport."""
+        ready = {r.serial for r in (runner.DEVICES.snapshot() if snap is None else snap).ready()}
+        for session in self._sessions.running():
+            if session.serial not in ready and established(session):
+                self._begin(session, TRANSPORT_LOST)
+
+    def cancel(self, serials: list[str] | None = None):
+        """The user stopped these casts (None = all): do not bring them back."""
+        with self._lock:
+            for serial, outage in self._recovering.items():
+                if serials is None or serial in serials:
+                    outage["cancel"] = True
+
+    def close(self):
+        self._stop.set()
+
+    # ---------- queries ----------
+
+    def recovering(self) -> list[str]:
+        with self._lock:
+            return list(self._recovering)
+
+    def outages(self) -> list[dict]:
+        with self._lock:
+            return list(self._load())
+
+    # ---------- recovery ----------
+
+    def _begin(self, session, reason: str):
+        with self._lock:
+            if session.serial in self._recovering or self._stop.is_set():
+                return
+            outage = {"serial": session.serial, "reason": reason, "down_at": time.time(),
+                      "recovered_at": None, "outage_sec": None, "attempts": 0, "result": None}
+            self._recovering[session.serial] = outage
+        threading.Thread(target=self._recover, args=(session, outage),
+                         name=f"recover-{session.serial}", daemon=True).start()
+        self._changed()
+
+    def _recover(self, session, outage: dict):
+        serial, current = session.serial, session
+        with tracing.operation("recover", serial=serial, reason=outage["reason"]) as span:
+            if session.running:
+                # ה-transport נעלם אבל scrcpy עוד תלוי — לא מחכים שיבין לבד
+                session.proc.terminate()
+            delays = _backoff()
+            while True:
+                if self._cancelled(outage, current):
+                    outage["result"] = CANCELLED  # המשתמש עצר / הפעיל מחדש בעצמו
+                    break
+                if time.time() - outage["down_at"] > MAX_OUTAGE_SEC:
+                    outage["result"] = GAVE_UP
+                    break
+                self._limiter.acquire(self._stop)
+                outage["attempts"] += 1
+                tracing.step(f"ניסיון {outage['attempts']}")
+                if self._transport_ready(serial):
+                    try:
+                        current = self._sessions.start(
+                            serial, session.renderer, session.crop_mode, quality=session.quality,
+                            extra_args=session.extra_args)
+                    except Exception:
+                        current = self._sessions.get(serial)
+                    else:
+                        if outage.get("cancel"):
+                            self._sessions.stop(serial)  # "עצור" נלחץ בדיוק בזמן ההפעלה
+                            continue
+                        if self._first_frame(current):
+                            outage["result"] = RECOVERED
+                            outage["recovered_at"] = time.time()
+                            break
+                self._stop.wait(next(delays))
+            span.set(result=outage["result"], attempts=outage["attempts"])
+        outage.pop("cancel", None)
+        if outage["recovered_at"] is not None:
+            outage["outage_sec"] = round(outage["recovered_at"] - outage["down_at"], 3)
+        with self._lock:
+            self._recovering.pop(serial, None)
+            outages = self._load()
+            outages.append(outage)
+            del outages[:-KEEP_OUTAGES]
+            save_json(self._store_file, outages)
+        self._changed()
+        if outage["result"] == GAVE_UP and self._on_gave_up is not None:
+            error = current.error if current is not None and current.error else \
+                f"השידור לא חזר תוך {MAX_OUTAGE_SEC // 60} דקות ({outage['attempts']} ניסיונות)"
+            self._on_gave_up(serial, error)
+
+    def _cancelled(self, outage: dict, current) -> bool:
+        return self._stop.is_set() or outage.get("cancel") or self._sessions.get(outage["serial"]) is not current
+
+    def _transport_ready(self, serial: str) -> bool:
+        if not is_ip_serial(serial):
+            return serial in runner.adb_devices()  # USB: מחכים שהכבל/המכשיר יחזור
+        # Wi‑Fi: adb connect לאותה נקודת קצה ("already connected" אם היא בכלל לא נפלה)
+        ok, _ = runner.connect_target(serial, CONNECT_TIMEOUT_SEC)
+        return ok and serial in runner.adb_devices()
+
+    def _first_frame(self, session) -> bool:
+        deadline = time.monotonic() + FIRST_FRAME_WAIT_SEC
+        while time.monotonic() < deadline and not self._stop.is_set():
+            if session.telemetry is not None and session.telemetry.first_frame_at is not None:
+                return True
+            if not session.running:
+                return False
+            time.sleep(0.05)
+        return False
+
+    def _load(self) -> list[dict]:
+        if self._outages is None:
+            data = load_json(self._store_file, [])
+            self._outages = data if isinstance(data, list) else []
+        return self._outages
+
+    def _changed(self):
+        if self._on_change is not None:
+            self._on_change()
@@ -0,0 +1,148 @@
+"""
+Live telemetry from a running scrcpy process.
+
+scrcpy is started with --print-fps and piped stdout/stderr. One reader thread
+per pipe turns its log lines into TelemetryEvent records (FPS samples, skipped
+frames, decoder/renderer errors, disconnects) kept in a bounded ring buffer.
+"""
+import re, threading, time
+from collections import deque
+from typing import NamedTuple
+
+EVENT_BUFFER = 500    # אירועים אחרונים לכל session
+FPS_HISTORY = 60      # דגימות FPS אחרונות (~דקה)
+
+# אירועים
+FPS, FIRST_FRAME, ERROR, WARNING, DISCONNECT, INFO, EXIT = (
+    "fps", "first_frame", "error", "warning", "disconnect", "info", "exit")
+
+_FPS_RE = re.compile(r"\b(\d+) fps(?: \(\+(\d+) frames? skipped\))?")
+_LEVEL_RE = re.compile(r"^(?:\[\S+\]\s*)?(VERBOSE|DEBUG|INFO|WARN|ERROR)\s*:\s*(.*)$")
+# "Server connection failed" נשאר ERROR: זו הסיבה האמיתית שהשידור לא עלה, לא ניתוק
+_DISCONNECT_MARKERS = ("device disconnected", "connection lost", "device not found",
+                       "connection reset")
+_SPARK = "▁▂▃▄▅▆▇█"
+
+
+class TelemetryEvent(NamedTuple):
+    t: float            # time.time()
+    kind: str
+    fps: int = 0
+    skipped: int = 0
+    text: str = ""
+
+
+def parse_line(line: str, now: float | None = None) -> TelemetryEvent | None:
+    """One scrcpy log line → event (None for lines we do not care about)."""
+    line = line.strip()
+    if not line:
+        return None
+    now = time.time() if now is None else now
+    m = _LEVEL_RE.match(line)
+    level, msg = (m.group(1), m.group(2)) if m else ("", line)
+    low = msg.lower()
+    if any(k in low for k in _DISCONNECT_MARKERS):
+        return TelemetryEvent(now, DISCONNECT, text=msg)
+    fm = _FPS_RE.search(msg)
+    if fm and level in ("", "INFO"):
+        return TelemetryEvent(now, FPS, int(fm.group(1)), int(fm.group(2) or 0), msg)
+    if level == "ERROR" or low.startswith("error"):
+        return TelemetryEvent(now, ERROR, text=msg)
+    if level == "WARN":
+        return TelemetryEvent(now, WARNING, text=msg)
+    if low.startswith("texture:"):
+        # scrcpy מדפיס "Texture: WxH" כשהפריים הראשון מגיע למסך
+        return TelemetryEvent(now, FIRST_FRAME, text=msg)
+    if level == "INFO":
+        return TelemetryEvent(now, INFO, text=msg)
+    return None
+
+
+def sparkline(values, ceiling: int = 60) -> str:
+    if not values:
+        return ""
+    top = max(ceiling, max(values))
+    return "".join(_SPARK[min(len(_SPARK) - 1, int(v * (len(_SPARK) - 1) / top))] for v in values)
+
+
+class ScrcpyTelemetry:
+    def __init__(self, proc, on_event=None):
+        """Start reading proc.stdout / proc.stderr (text pipes) in daemon threads."""
+        self._lock = threading.Lock()
+        self._events = deque(maxlen=EVENT_BUFFER)
+        self._fps = deque(maxlen=FPS_HISTORY)
+        self._on_event = on_event
+        self.started_at = time.time()
+        self.first_frame_at = None
+        self.skipped_total = 0
+        self.errors = 0
+        self.disconnected = False
+        self._readers = [
+            threading.Thread(target=self._read, args=(pipe,), name="scrcpy-log", daemon=True)
+            for pipe in (proc.stdout, proc.stderr) if pipe is not None
+        ]
+        for t in self._readers:
+            t.start()
+
+    # ---------- queries ----------
+
+    def current_fps(self) -> int | None:
+        with self._lock:
+            return self._fps[-1].fps if self._fps else None
+
+    def fps_history(self, n: int = FPS_HISTORY) -> list[int]:
+        with self._lock:
+            return [e.fps for e in list(self._fps)[-n:]]
+
+    def skipped_history(self, n: int = FPS_HISTORY) -> list[int]:
+        with self._lock:
+            return [e.skipped for e in list(self._fps)[-n:]]
+
+    def events(self, kind: str | None = None) -> list[TelemetryEvent]:
+        with self._lock:
+            return [e for e in self._events if kind is None or e.kind == kind]
+
+    def summary(self) -> dict:
+        hist = self.fps_history()
+        return {
+            "fps": hist[-1] if hist else None,
+            "fps_avg": round(sum(hist) / len(hist), 1) if hist else None,
+            "skipped_total": self.skipped_total,
+            "errors": self.errors,
+            "disconnected": self.disconnected,
+            "startup_sec": round(self.first_frame_at - self.started_at, 3) if self.first_frame_at else None,
+        }
+
+    def record_exit(self, code: int):
+        self._record(TelemetryEvent(time.time(), EXIT, text=f"exit code {code}"))
+
+    def join(self, timeout: float | None = None):
+        """Wait for the pipes to drain (after the process exits)."""
+        for t in self._readers:
+            t.join(timeout)
+
+    # ---------- reader threads ----------
+
+    def _read(self, pipe):
+        try:
+            for line in iter(pipe.readline, ""):
+                ev = parse_line(line)
+                if ev is not None:
+                    self._record(ev)
+        except (OSError, ValueError):
+            pass
+
+    def _record(self, ev: TelemetryEvent):
+        with self._lock:
+            self._events.append(ev)
+            if ev.kind == FPS:
+                self._fps.append(ev)
+                self.skipped_total += ev.skipped
+            elif ev.kind == ERROR:
+                self.errors += 1
+            elif ev.kind == DISCONNECT:
+                self.disconnected = True
+            elif ev.kind == FIRST_FRAME and self.first_frame_at is None:
+                self.first_frame_at = ev.t
+        if self._on_event is not None:
+            self._on_event(ev)
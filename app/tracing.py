@@ -0,0 +1,281 @@
+"""
+Command-level instrumentation.
+
+Every external adb/scrcpy command (in-process over the adb socket or as a
+spawned executable) is recorded as a span: argv, serial, duration, return
+code, whether it timed out, stdout/stderr sizes. Spans nest under the
+operation that issued them (a background job and its steps, a status tick, a
+cast launch) through a per-thread stack. The last MAX_SPANS finished spans are
+kept in memory and can be exported as JSONL, as a Chrome trace
+(chrome://tracing / Perfetto) and as a p50/p95 summary per command type.
+"""
+import functools, itertools, json, math, os, subprocess, threading, time
+from collections import deque
+from contextlib import contextmanager
+
+from app.storage import data_path
+
+MAX_SPANS = 5000
+TRACE_DIR = "traces"
+
+# סוגי span
+OP, STEP, CMD = "op", "step", "cmd"
+
+# perf_counter → זמן קיר (לייצוא)
+_EPOCH = time.time() - time.perf_counter()
+
+
+class Span:
+    __slots__ = ("id", "parent", "kind", "name", "start", "end", "thread", "attrs")
+
+    def __init__(self, kind: str, name: str, parent: "Span | None", attrs: dict):
+        self.id = next(_ids)
+        self.parent = parent.id if parent is not None else None
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.attrs = attrs
+
+    @property
+    def duration(self) -> float | None:
+        return None if self.end is None else self.end - self.start
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id, "parent": self.parent, "kind": self.kind, "name": self.name,
+            "start": round(_EPOCH + self.start, 6),
+            "duration_ms": None if self.end is None else round(self.duration * 1000, 3),
+            "thread": self.thread, **self.attrs,
+        }
+
+    def __repr__(self):
+        return f"Span({self.kind}:{self.name!r}, {self.duration})"
+
+
+_ids = itertools.count(1)
+_lock = threading.Lock()
+_spans: deque[Span] = deque(maxlen=MAX_SPANS)
+_local = threading.local()
+
+
+def _stack() -> list[Span]:
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+def _finish(span: Span):
+    span.end = time.perf_counter()
+    with _lock:
+        _spans.append(span)
+
+
+def current() -> Span | None:
+    stack = _stack()
+    return stack[-1] if stack else None
+
+
+# ---------- recording ----------
+
+@contextmanager
+def span(kind: str, name: str, ignore: tuple = (), **attrs):
+    """
+    Record a span around the block. Exceptions are noted on the span (a
+    subprocess.TimeoutExpired also as timeout=True) and re-raised; exceptions in
+    `ignore` mean "did not really run" and drop the span.
+    """
+    stack = _stack()
+    s = Span(kind, name, stack[-1] if stack else None, attrs)
+    stack.append(s)
+    dropped = False
+    try:
+        yield s
+    except BaseException as e:
+        dropped = isinstance(e, ignore)
+        s.attrs.setdefault("error", type(e).__name__)
+        if isinstance(e, subprocess.TimeoutExpired):
+            s.attrs["timeout"] = True
+        raise
+    finally:
+        # step פתוח מעל ה-span הזה נסגר יחד איתו
+        while stack and stack[-1] is not s:
+            _finish(stack.pop())
+        if stack:
+            stack.pop()
+        if not dropped:
+            _finish(s)
+
+
+def operation(name: str, **attrs):
+    return span(OP, name, **attrs)
+
+
+def traced(name: str):
+    """Decorator: run the function as an operation span."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            with operation(name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def step(text: str):
+    """
+    Start the next step of the current operation (closes the previous step).
+    Commands issued until the next step nest under it.
+    """
+    stack = _stack()
+    if stack and stack[-1].kind == STEP:
+        _finish(stack.pop())
+    if stack:
+        stack.append(Span(STEP, text, stack[-1], {}))
+
+
+def bind(fn):
+    """Wrap fn so that, in a pool thread, its spans nest under the caller's current span."""
+    parent = current()
+    if parent is None:
+        return fn
+
+    @functools.wraps(fn)
+    def inner(*args, **kwargs):
+        stack = _stack()
+        depth = len(stack)
+        stack.append(parent)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            del stack[depth:]
+    return inner
+
+
+def command_type(argv: list[str]) -> str:
+    """'adb shell', 'adb connect', 'scrcpy', 'scrcpy --list-encoders' ..."""
+    if not argv:
+        return "?"
+    exe = os.path.splitext(os.path.basename(argv[0]))[0].lower()
+    rest = list(argv[1:])
+    if len(rest) >= 2 and rest[0] == "-s":
+        rest = rest[2:]
+    if exe == "adb":
+        return f"adb {rest[0]}" if rest else "adb"
+    if "--list-encoders" in rest:
+        return f"{exe} --list-encoders"
+    return exe
+
+
+def serial_of(argv: list[str]) -> str | None:
+    for i, a in enumerate(argv):
+        if a == "-s" and i + 1 < len(argv):
+            return argv[i + 1]
+        if a.startswith("--serial="):
+            return a.split("=", 1)[1]
+    return None
+
+
+def command(argv: list[str], ignore: tuple = (), **attrs):
+    """Span for one external command; fill in the outcome with result()."""
+    return span(CMD, command_type(argv), ignore, argv=list(argv), serial=serial_of(argv), **attrs)
+
+
+def result(s: Span, out):
+    """Return code and output sizes of a finished subprocess.CompletedProcess."""
+    s.set(rc=out.returncode, stdout_bytes=len(out.stdout or ""), stderr_bytes=len(out.stderr or ""))
+    return out
+
+
+# ---------- queries ----------
+
+def spans(kind: str | None = None) -> list[Span]:
+    with _lock:
+        return [s for s in _spans if kind is None or s.kind == kind]
+
+
+def clear():
+    with _lock:
+        _spans.clear()
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    # nearest-rank
+    i = max(0, min(len(sorted_values) - 1, math.ceil(p / 100 * len(sorted_values)) - 1))
+    return sorted_values[i]
+
+
+def summary() -> dict[str, dict]:
+    """Per command type: count, p50/p95/max in ms, timeouts and failures."""
+    groups: dict[str, list[Span]] = {}
+    for s in spans(CMD):
+        groups.setdefault(s.name, []).append(s)
+    out = {}
+    for name, group in sorted(groups.items()):
+        ms = sorted(s.duration * 1000 for s in group)
+        out[name] = {
+            "count": len(group),
+            "p50_ms": round(percentile(ms, 50), 1),
+            "p95_ms": round(percentile(ms, 95), 1),
+            "max_ms": round(ms[-1], 1),
+            "timeouts": sum(1 for s in group if s.attrs.get("timeout")),
+            "failures": sum(1 for s in group if s.attrs.get("rc") not in (0, None) or "error" in s.attrs),
+        }
+    return out
+
+
+def format_summary(stats: dict[str, dict] | None = None) -> str:
+    stats = summary() if stats is None else stats
+    return "\n".join(
+        f"{name}: n={st['count']}  p50={st['p50_ms']}ms  p95={st['p95_ms']}ms  max={st['max_ms']}ms"
+        + (f"  timeouts={st['timeouts']}" if st["timeouts"] else "")
+        + (f"  failures={st['failures']}" if st["failures"] else "")
+        for name, st in stats.items()
+    )
+
+
+# ---------- export ----------
+
+def export_jsonl(path: str, items: list[Span] | None = None):
+    items = spans() if items is None else items
+    with open(path, "w", encoding="utf-8") as f:
+        for s in items:
+            f.write(json.dumps(s.to_dict(), ensure_ascii=False) + "\n")
+
+
+def export_chrome(path: str, items: list[Span] | None = None):
+    """Chrome trace event format ("X" complete events, µs, one track per thread)."""
+    items = spans() if items is None else items
+    pid = os.getpid()
+    tids: dict[str, int] = {}
+    events = []
+    for s in items:
+        tid = tids.setdefault(s.thread, len(tids) + 1)
+        events.append({
+            "name": s.name, "cat": s.kind, "ph": "X", "pid": pid, "tid": tid,
+            "ts": round((_EPOCH + s.start) * 1e6), "dur": round(s.duration * 1e6),
+            "args": {k: v for k, v in s.to_dict().items() if k not in ("name", "kind", "start", "thread")},
+        })
+    events += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+               for name, tid in tids.items()]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f, ensure_ascii=False)
+
+
+def export(directory: str | None = None) -> dict[str, str]:
+    """Write trace-<time>.jsonl / .json (Chrome) / -summary.json → {"jsonl", "chrome", "summary"} paths."""
+    directory = directory or data_path(TRACE_DIR)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, time.strftime("trace-%Y%m%d-%H%M%S"))
+    items = spans()
+    paths = {"jsonl": base + ".jsonl", "chrome": base + ".json", "summary": base + "-summary.json"}
+    export_jsonl(paths["jsonl"], items)
+    export_chrome(paths["chrome"], items)
+    with open(paths["summary"], "w", encoding="utf-8") as f:
+        json.dump(summary(), f, ensure_ascii=False, indent=2)
+    return paths
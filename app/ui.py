@@ -1,42 +1,10 @@
-from PySide6.QtCore import Qt, QSize, QTimer
+from PySide6.QtCore import Qt, QSize
 from PySide6.QtWidgets import (
     QWidget, QMainWindow, QPushButton, QLabel, QHBoxLayout,
-    QVBoxLayout, QApplication, QFrame, QComboBox, QMenuBar, QMenu,
-    QTextBrowser, QMessageBox
+    QVBoxLayout, QFrame, QComboBox, QMenuBar,
 )
 from PySide6.QtGui import QIcon, QAction
 
-class HelpWindow(QWidget):
-    def __init__(self, title: str, html: str, parent=None):
-        super().__init__(parent)
-        self.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose, True)
-        self.setWindowTitle(title)
-        self.setLayoutDirection(Qt.LayoutDirection.RightToLeft)
-        self.resize(560, 460)
-
-        self.view = QTextBrowser(self)
-        self.view.setOpenExternalLinks(True)
-        self.view.setHtml(
-            f"""
-            <html dir="rtl">
-              <head>
-                <meta charset="utf-8">
-                <style>
-                  body {{ font-family: Segoe UI, Arial, sans-serif; line-height: 1.5; }}
-                  h1, h2 {{ margin: 0.4em 0; }}
-                  ol, ul {{ padding-inline-start: 20px; }}
-                  code {{ background:#f3f3f3; padding:2px 4px; border-radius:4px; }}
-                  .note {{ background:#fff8d8; border:1px solid #f0e0a0; padding:8px; border-radius:8px; }}
-                </style>
-              </head>
-              <body>{html}</body>
-            </html>
-            """
-        )
-
-        root = QVBoxLayout(self)
-        root.addWidget(self.view)
-
 class StatusLight(QFrame):
     def __init__(self, color="red"):
         super().__init__()
@@ -53,7 +21,9 @@ class StatusLight(QFrame):
         self.setStyleSheet(f"border-radius: 8px; background: {palette.get(color, '#9aa0a6')};")
 
 class MainWindow(QMainWindow):
-    def __init__(self, on_cast, on_wireless, on_renderer_changed, on_cropmode_changed, on_stop, get_status):
+    def __init__(self, on_cast, on_wireless, on_renderer_changed, on_cropmode_changed, on_stop, get_status,
+                 on_cancel=None, get_devices=None, get_telemetry=None, on_benchmark=None,
+                 on_discover=None, on_trace_export=None, on_relay=None, on_provision=None, on_adb_check=None):
         super().__init__()
         self.setWindowTitle("LoginVRCast")
         self.setMinimumSize(400, 210)
@@ -63,18 +33,27 @@ class MainWindow(QMainWindow):
         self.cast_btn = QPushButton("שידור")
         self.stop_btn = QPushButton("עצור")
         self.wireless_btn = QPushButton("חיבור אלחוטי")
+        self.cancel_btn = QPushButton("ביטול")
+        self.cancel_btn.setEnabled(False)
+
+        # בורר מכשיר (כמה Quest במקביל)
+        self.device_combo = QComboBox()
+        self.device_combo.setMinimumContentsLength(18)
 
         # בוררי מנוע/חיתוך
         self.renderer_combo = QComboBox()
         self.renderer_combo.addItems(["OpenGL", "Direct3D"])
 
         self.cropmode_combo = QComboBox()
-        self.cropmode_combo.addItems([ "crop","client-crop"])  # ברירת מחדל: client-crop למי שמעדיף 1:1, אך נוכל לשנות בהמשך
+        self.cropmode_combo.addItems([ "crop","client-crop"])  # ברירת מחדל: crop — המכשיר מקודד רק את העין (app/geometry.py)
 
         # סטטוס
         self.status_light = StatusLight("red")
         self.status_label = QLabel("מכשיר לא מחובר")
-        
+        self.progress_label = QLabel("")
+        self.fps_label = QLabel("")  # FPS נוכחי + היסטוריה קצרה מה-session הפעיל
+        self.progress_label.setStyleSheet("color: #5f6368;")
+
         self._help_windows = []
 
         # === תפריט עליון ===
@@ -87,6 +66,19 @@ class MainWindow(QMainWindow):
         act_exit.triggered.connect(self.close)
         file_menu.addAction(act_exit)
 
+        # כלים
+        tools = [("שידור + הקלטה + צפייה ברשת (Relay)", on_relay),
+                 ("חיפוש משקפות ברשת", on_discover),
+                 ("חיבור אלחוטי לכל המשקפות בכבל", on_provision), ("בדיקת מקודדים (Benchmark)", on_benchmark),
+                 ("ייצוא מדידות זמנים (Trace)", on_trace_export), ("בדיקת שרת adb", on_adb_check)]
+        if any(cb for _, cb in tools):
+            tools_menu = menubar.addMenu("כלים")
+            for title, cb in tools:
+                if cb is not None:
+                    act = QAction(title, self)
+                    act.triggered.connect(cb)
+                    tools_menu.addAction(act)
+
         # עזרה
         help_menu = menubar.addMenu("עזרה")
 
@@ -108,6 +100,13 @@ class MainWindow(QMainWindow):
         top.addWidget(self.stop_btn)
         top.addWidget(self.wireless_btn)
         top.addStretch(1)
+        top.addWidget(self.cancel_btn)
+
+        # שורת מכשיר
+        dev_row = QHBoxLayout()
+        dev_row.addWidget(QLabel("מכשיר:"))
+        dev_row.addWidget(self.device_combo)
+        dev_row.addStretch(1)
 
         # שורת הגדרות
         mid = QHBoxLayout()
@@ -124,13 +123,16 @@ class MainWindow(QMainWindow):
         status.addWidget(self.status_light)
         status.addWidget(self.status_label)
         status.addStretch(1)
+        status.addWidget(self.fps_label)
 
         root = QVBoxLayout()
         root.addLayout(top)
         root.addSpacing(8)
+        root.addLayout(dev_row)
         root.addLayout(mid)
         root.addSpacing(8)
         root.addLayout(status)
+        root.addWidget(self.progress_label)
 
         container = QWidget()
         container.setLayout(root)
@@ -142,12 +144,13 @@ class MainWindow(QMainWindow):
         self.wireless_btn.clicked.connect(lambda: on_wireless(self.wireless_btn))
         self.renderer_combo.currentTextChanged.connect(on_renderer_changed)
         self.cropmode_combo.currentTextChanged.connect(on_cropmode_changed)
+        if on_cancel is not None:
+            self.cancel_btn.clicked.connect(on_cancel)
 
-        # רענון סטטוס
+        # רענון סטטוס: בלי polling — main מחבר את refresh_status לאירועי DeviceTracker
         self._get_status = get_status
-        self._timer = QTimer(self)
-        self._timer.timeout.connect(self.refresh_status)
-        self._timer.start(2000)
+        self._get_devices = get_devices
+        self._get_telemetry = get_telemetry
         self.refresh_status()
 
 
@@ -160,82 +163,55 @@ class MainWindow(QMainWindow):
         else:
             self.status_light.setColor("red")
         self.status_label.setText(s["text"])
+        if self._get_devices is not None:
+            self._set_devices(self._get_devices())
+        self.refresh_telemetry()
+
+    def refresh_telemetry(self):
+        if self._get_telemetry is not None:
+            self.fps_label.setText(self._get_telemetry())
+
+    def _set_devices(self, serials: list[str]):
+        current = self.device_combo.currentData()
+        self.device_combo.blockSignals(True)
+        self.device_combo.clear()
+        for serial in serials:
+            self.device_combo.addItem(serial, serial)
+        if len(serials) > 1:
+            self.device_combo.addItem("כל המכשירים", "*")
+        idx = self.device_combo.findData(current)
+        self.device_combo.setCurrentIndex(idx if idx >= 0 else 0)
+        self.device_combo.blockSignals(False)
+
+    def selected_device(self) -> str | None:
+        """serial שנבחר; None = כל המכשירים (או אין בחירה — ברירת המחדל הישנה)."""
+        data = self.device_combo.currentData()
+        return None if data in (None, "*") else data
+
+    def set_busy(self, busy: bool):
+        # פעולה ברקע: אפשר לבטל; בסיום מנקים את שורת ההתקדמות
+        self.cancel_btn.setEnabled(busy)
+        if not busy:
+            self.progress_label.setText("")
+
+    def set_progress(self, text: str):
+        self.progress_label.setText(text)
 
     # ====== עזרה ======
     def show_instructions(self):
-        html = """
-        <h1>הוראות שימוש – LoginVRCast</h1>
-        <ol>
-          <li>הדלק את ה‑<b>Meta Quest</b> וודא שמצב מפתח (Developer Mode) פעיל.</li>
-          <li>חבר את הקווסט למחשב באמצעות <b>כבל USB</b>.</li>
-          <li>במסך המכשיר אשר <b>USB debugging</b> ולחץ <b>Always allow</b>.</li>
-          <li>בחלון התוכנה לחץ <b>שידור</b> כדי להתחיל הצגה.</li>
-          <li>רוצה לעבוד בלי כבל? לחץ <b>חיבור אלחוטי</b> — אם ההתחברות מצליחה, אפשר לנתק את ה‑USB.</li>
-        </ol>
-
-        <h2>טיפים</h2>
-        <ul>
-          <li>אם החיבור האלחוטי נכשל — ודא שהמחשב וה‑Quest באותה רשת Wi‑Fi.</li>
-          <li>בחר <b>מנוע גרפע</b> (OpenGL/Direct3D) לפי מה שעובד חלק יותר אצלך.</li>
-          <li>בחר מצב <b>מצב חיתוך</b>: client-crop או crop בהתאם לצורך.</li>
-        </ul>
-
-        <h2>קיצורים</h2>
-        <ul>
-          <li><b>מסך מלא</b> — alt + F </li>
-          <li><b>רענון</b> — alt + shift + R .</li>
-        </ul>
-        """
-        self._open_help("הוראות", html)
+        self._open_help("הוראות", "INSTRUCTIONS_HTML")
 
     def show_faq(self):
-        html = """
-        <h1>שאלות נפוצות (FAQ)</h1>
-
-        <h2>איך מפעילים מצב מפתח?</h2>
-        <p>
-          מדריך וידאו:
-          <a href="https://drive.google.com/file/d/1hYf4B3nKVmHpBGViHWfdY_qgfD-LOKPg/view?usp=drive_link">
-            לחץ כאן
-          </a>
-        </p>
-
-        <h2>חיבור אלחוטי לא מצליח</h2>
-        <ul>
-          <li>ודא שה‑PC וה‑Quest על אותה רשת.</li>
-          <li>חבר USB, אשר Debug, ואז לחץ שוב "חיבור אלחוטי".</li>
-        </ul>
-        
-        <h2>המסך מרצד?</h2>
-        <ul>
-          <li>נסה לשנות את <b>מצב חיתוך</b> ל־client-crop או crop בתפריט.
-          זה יכול לשפר את התצוגה.
-          </li>
-          <li>alt + shift + R מרענן את התצוגה.</li>
-        </ul>
-
-        <h2>יצירת קשר</h2>
-        <p>
-          מייל תמיכה:
-          <a href="mailto:info@loginvr.co.il?subject=%D7%90%D7%A4%D7%9C%D7%99%D7%A7%D7%A6%D7%99%D7%99%D7%AA%20%D7%A7%D7%90%D7%A1%D7%98%D7%99%D7%A0%D7%92&body=%D7%94%D7%99%2C%0A%0A%D7%90%D7%A0%D7%99%20%D7%A6%D7%A8%D7%99%D7%9A%20%D7%A2%D7%96%D7%A8%D7%94%20%D7%A2%D7%9D%E2%80%A6">
-            info@loginvr.co.il
-          </a>
-        </p>
-        """
-        self._open_help("FAQ / Help", html)
+        self._open_help("FAQ / Help", "FAQ_HTML")
 
     def show_about(self):
-        html = """
-        <h1>אודות</h1>
-        <p><b>LoginVRCast</b> — כלי לשיקוף מכשירי <b>Meta Quest</b> למחשב Windows באמצעות scrcpy, עם ממשק בעברית.</p>
-        <p>נוצר על ידי <b>Avi Kohen</b> · 2025 · גרסה v0.2.0</p>
-        <p>All rights reserved to LoginVR — internal use only.</p>
-        """
-        self._open_help("אודות", html)
-
-    def _open_help(self, title: str, html: str):
+        self._open_help("אודות", "ABOUT_HTML")
+
+    def _open_help(self, title: str, content: str):
+        # מכונת העזרה (QTextBrowser + ה-HTML) נטענת רק בפתיחה הראשונה — לא על חשבון זמן העלייה
+        from app import help_content
         # פותחים כחלון עליון עצמאי (parent=None)
-        w = HelpWindow(title, html, parent=None)
+        w = help_content.HelpWindow(title, getattr(help_content, content), parent=None)
         w.show()
         # שומרים רפרנס כדי שה־GC לא יסגור אותו
         self._help_windows.append(w)
@@ -0,0 +1,220 @@
+"""
+One-click wireless connect as an explicit state machine.
+
+    check → cached → wait_usb → probe_ip → tcpip → wait_listener → connect
+                        └─ (no cable) → discover (LAN)      └─ (already listening) ─┘
+
+Every wait is driven by readiness instead of fixed sleeps: device-tracker
+pushes (or `adb wait-for-usb-device` when the tracker is not live), the
+headset's tcpip listener polled with exponential backoff, and one overall
+deadline for the whole flow. The time spent in each stage is kept in
+`timings` and reported with the result. With `serial` the flow is pinned to
+one headset (its cached endpoint, then that USB serial only — no LAN
+discovery), so several flows can run side by side for a fleet.
+"""
+import socket, subprocess, time
+
+from app import scrcpy_runner as runner
+
+DEADLINE_SEC = 45        # כל הזרימה, מקצה לקצה
+USB_WAIT_SEC = 6         # בלי כבל בכלל — אחרי זה עוברים לחיפוש ברשת
+IP_WAIT_SEC = 5          # Wi‑Fi שעוד מתחבר
+WAIT_SLICE_SEC = 1.0     # המתנה חוסמת אחת (נקודת ביטול בין פרוסות)
+BACKOFF_START_SEC = 0.05
+BACKOFF_MAX_SEC = 1.0
+LISTEN_PROBE_SEC = 0.2   # האם כבר מאזין? בדיקה מהירה אחת לפני tcpip
+CONNECT_ATTEMPTS = 3
+
+# מצבים
+CHECK, CACHED, WAIT_USB, DISCOVER, PROBE_IP, TCPIP, WAIT_LISTENER, CONNECT, DONE = (
+    "check", "cached", "wait_usb", "discover", "probe_ip", "tcpip", "wait_listener", "connect", "done")
+
+
+def listening(ip: str, port: int | str, timeout: float) -> bool:
+    """Does ip:port accept a TCP connection (adbd in tcpip mode)?"""
+    try:
+        with socket.create_connection((ip, int(port)), timeout=timeout):
+            return True
+    except OSError:
+        return False
+
+
+def _backoff():
+    delay = BACKOFF_START_SEC
+    while True:
+        yield delay
+        delay = min(delay * 2, BACKOFF_MAX_SEC)
+
+
+class WirelessConnect:
+    def __init__(self, job=None, deadline_sec: float = DEADLINE_SEC, port: str = runner.WIRELESS_PORT,
+                 serial: str | None = None):
+        self.job = job
+        self.port = port
+        self.serial = serial     # None = המכשיר הראשון שנמצא
+        budget = deadline_sec
+        if job is not None and job.remaining() is not None:
+            budget = min(budget, job.remaining())
+        self.deadline = time.monotonic() + budget
+        self.timings: list[tuple[str, float]] = []
+        self.usb = None
+        self.ip = None
+        self.sections: dict[str, str] = {}
+        self.result = (False, "")
+
+    # ---------- driver ----------
+
+    def run(self) -> tuple[bool, str]:
+        state = CHECK
+        while state != DONE:
+            started = time.perf_counter()
+            nxt = getattr(self, f"_{state}")()
+            self.timings.append((state, time.perf_counter() - started))
+            state = nxt
+        ok, msg = self.result
+        return ok, f"{msg}\n\n{self.timings_text()}" if ok else msg
+
+    def timings_text(self) -> str:
+        return "זמנים: " + " · ".join(f"{name} {sec:.2f}s" for name, sec in self.timings)
+
+    def _finish(self, ok: bool, msg: str) -> str:
+        self.result = (ok, msg)
+        return DONE
+
+    def _remaining(self, cap: float | None = None) -> float:
+        rem = max(0.0, self.deadline - time.monotonic())
+        return rem if cap is None else min(rem, cap)
+
+    def _check_job(self):
+        if self.job is not None:
+            self.job.check()
+
+    @property
+    def target(self) -> str:
+        return f"{self.ip}:{self.port}"
+
+    # ---------- states ----------
+
+    def _check(self):
+        runner._step(self.job, "בודק חיבור קיים...")
+        if self.serial is not None:
+            target = self._cached_target()
+            if target and target in runner.adb_devices():
+                return self._finish(True, f"המכשיר כבר מחובר אלחוטית ({target}).")
+            return CACHED
+        t, s, ser = runner.quest_state()
+        if t == "wifi" and s == "device":
+            return self._finish(True, f"המכשיר כבר מחובר אלחוטית ({ser}). אפשר לנתק את הכבל.")
+        return CACHED
+
+    def _cached_target(self) -> str | None:
+        e = runner.ENDPOINTS.entries().get(self.serial)
+        if not e:
+            return None
+        self.ip, self.port = e["ip"], str(e["port"])   # self.target = נקודת הקצה השמורה
+        return self.target
+
+    def _cached(self):
+        if self.serial is not None:
+            target = self._cached_target()
+            if target is None:
+                return WAIT_USB
+            if runner.connect_target(target, runner.CACHED_CONNECT_TIMEOUT_SEC)[0]:
+                runner.ENDPOINTS.mark_ok(self.serial)
+                return self._finish(True, f"התחברות מחדש לכתובת שמורה הצליחה: {target}")
+            runner.ENDPOINTS.mark_failed(self.serial)
+            return WAIT_USB
+        connected = runner.reconnect_cached(self.job)
+        if connected:
+            return self._finish(True, f"התחברות מחדש לכתובת שמורה הצליחה: {', '.join(connected)}")
+        return WAIT_USB
+
+    def _wait_usb(self):
+        runner._step(self.job, "מחפש מכשיר בכבל USB...")
+        until = time.monotonic() + self._remaining(USB_WAIT_SEC)
+        asked = False
+        while True:
+            records = [r for r in runner.DEVICES.snapshot() if r.transport == "usb"
+                       and (self.serial is None or r.serial == self.serial)]
+            ready = next((r.serial for r in records if r.state == "device"), None)
+            if ready:
+                self.usb = ready
+                return PROBE_IP
+            if not asked and any(r.state == "unauthorized" for r in records):
+                # יש כבל, מחכים לאישור — עד הדדליין הכללי
+                runner._step(self.job, "ממתין לאישור Debug ב-Quest (Always allow)...")
+                until, asked = self.deadline, True
+            wait = min(until - time.monotonic(), WAIT_SLICE_SEC)
+            if wait <= 0:
+                return DISCOVER if not records and self.serial is None else self._finish(
+                    False, "לא נמצא USB במצב 'device'. ודא שחיברת כבל ואישרת Debug (Always allow).")
+            self._wait_device_change(wait)
+            self._check_job()
+
+    def _wait_device_change(self, seconds: float):
+        if runner.DEVICES.live:
+            runner.DEVICES.wait(seconds)  # ה-tracker דוחף שינוי → מתעוררים מיד
+            return
+        try:
+            runner._adb(["wait-for-usb-device"], timeout=seconds)
+        except subprocess.TimeoutExpired:
+            pass
+        runner.DEVICES.invalidate()
+
+    def _discover(self):
+        # אין כבל — אולי יש משקפות שכבר מאזינות ל-adb אלחוטי ברשת
+        from app.lan_discovery import discover_and_connect
+        found = discover_and_connect(self.job)
+        if found:
+            return self._finish(True, f"נמצאו ברשת והתחברו: {', '.join(found)}")
+        return self._finish(False, "לא נמצא USB במצב 'device'. ודא שחיברת כבל ואישרת Debug (Always allow).")
+
+    def _probe_ip(self):
+        # ה-IP לא תלוי במצב tcpip: שולפים אותו עוד בחיבור ה-USB, לפני ש-adbd מתאתחל
+        runner._step(self.job, "מאתר כתובת IP אלחוטית...")
+        until = time.monotonic() + self._remaining(IP_WAIT_SEC)
+        for delay in _backoff():
+            self.ip, self.sections = runner._wifi_probe(self.usb)
+            if self.ip:
+                return CONNECT if listening(self.ip, self.port, LISTEN_PROBE_SEC) else TCPIP
+            if time.monotonic() + delay > until:
+                break
+            runner._sleep(self.job, delay)
+        # דיאגנוסטיקה ממוקדת – כבר נאספה באותו סבב
+        return self._finish(False, (
+            "לא נמצא IP אלחוטי. ודא שה‑Wi‑Fi פעיל ושהמחשב וה‑Quest באותה רשת.\n\n"
+            f"ip route:\n{self.sections.get('route', '')}\n"
+            f"ip -o -4 addr:\n{self.sections.get('addr', '')}\n"
+        ))
+
+    def _tcpip(self):
+        runner._step(self.job, f"מעביר את {self.usb} למצב tcpip {self.port}...")
+        out = runner._adb(["-s", self.usb, "tcpip", self.port])
+        if out.returncode != 0:
+            return self._finish(False, f"שגיאה במעבר ל-tcpip {self.port}:\n{out.stdout}\n{out.stderr}")
+        return WAIT_LISTENER
+
+    def _wait_listener(self):
+        runner._step(self.job, f"ממתין ש-{self.target} יהיה זמין...")
+        for delay in _backoff():
+            rem = self._remaining()
+            if rem <= 0:
+                break
+            if listening(self.ip, self.port, min(rem, BACKOFF_MAX_SEC)):
+                return CONNECT
+            runner._sleep(self.job, min(delay, self._remaining()))
+        return self._finish(False, f"ה-Quest עבר ל-tcpip אבל {self.target} לא נגיש מהמחשב.\n"
+                                   "ודא שהמחשב וה‑Quest באותה רשת (ושאין חסימת Firewall).")
+
+    def _connect(self):
+        runner._step(self.job, f"מתחבר אל {self.target}...")
+        delays = _backoff()
+        for attempt in range(CONNECT_ATTEMPTS):
+            ok, out = runner.connect_target(self.target, self._remaining(runner.ADB_TIMEOUT_SEC) or 0.1)
+            if ok:
+                runner.ENDPOINTS.record(self.usb, self.ip, self.port, self.sections.get("model", "").strip())
+                return self._finish(True, f"החיבור האלחוטי הצליח אל {self.target}. אפשר לנתק את הכבל.")
+            if attempt + 1 == CONNECT_ATTEMPTS or self._remaining() <= 0:
+                break
+            runner._sleep(self.job, min(next(delays), self._remaining()))
+        return self._finish(False, f"חיבור אל {self.target} נכשל:\n{out.stdout}\n{out.stderr}")
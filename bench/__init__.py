@@ -0,0 +1,8 @@
+"""
+Performance benchmarks against scriptable adb/scrcpy stand-ins (no headset needed).
+
+    python -m bench                       # 1, 10, 50 fake devices; server + adb-exe paths
+    python -m bench --devices 10 --modes server --repeat 5
+    python -m bench --compare bench/results/old.json   # run, then diff against a baseline
+    python -m bench --compare old.json new.json         # diff two result files only
+"""
@@ -0,0 +1,684 @@
+"""
+Benchmark runner.
+
+For every (mode, device count) case it writes a scenario, points the app at
+the stand-ins (LOGINVRCAST_ADB / LOGINVRCAST_SCRCPY / LOGINVRCAST_DATA_DIR and
+the adb server port) and measures:
+  * status_poll      — one status tick with a cold device snapshot;
+  * shell_roundtrip  — one `adb -s SERIAL shell` command;
+  * wireless_connect — the wireless_auto flow end to end, plus each stage;
+  * provision        — every USB device switched to Wi‑Fi at once (bounded
+                       pool, failed ones retried): total and per-device time.
+  * cast_to_start    — "cast" on every device: click → scrcpy process started,
+                       click → first frame, and stop-all time.
+  * cast_restart     — renderer change while casting: change → first frame of
+                       the relaunched session (old one torn down meanwhile).
+  * server_stage     — scrcpy-server hash check / push per device, cold and warm.
+  * relay_fanout     — one recorded stream fanned out to a file, a fast viewer
+                       and a viewer that never reads: bytes each got, drops.
+  * lan_discover     — sweep + connect over the headsets' 127.0.x.y addresses
+                       (half listening) and unused ones: found / not found,
+                       endpoint cache filled.
+  * codec_bench      — "בדיקת מקודדים" on one device: a trial per hw encoder
+                       (the stand-in runs each at its own FPS); fails unless
+                       the fastest wins and is read back from codecs.json.
+  * relay_split      — the relay's cluster splitter over short, uneven reads:
+                       time and MB/s; fails unless the chunks rebuild the
+                       stream byte for byte, cut at every Cluster.
+  * cast_recover     — every device casting over Wi‑Fi, then all endpoints
+                       dropped at once: drop → first frame again, no clicks.
+  * api_status       — the local control API under load: concurrent keep-alive
+                       clients polling GET /status, and one bulk cast / stop.
+Modes: "server" talks to the fake adb server in-process over the host
+protocol; "exe" has no server, so every command spawns the adb stand-in.
+Results (plus the per-command p50/p95 from app/tracing.py) go to one JSON file.
+"""
+import argparse, json, os, platform, shutil, socket, subprocess, sys, tempfile, time
+
+from bench import scenario as sc
+from bench.fake_adb import FakeAdbServer, FakeListeners
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "bench", "results")
+SCHEMA = 1
+FIRST_FRAME_TIMEOUT_SEC = 30
+
+
+# ---------- environment ----------
+
+def _wrapper(workdir: str, name: str, module: str) -> str:
+    """An executable that runs `python -m <module>` — what the app spawns instead of adb/scrcpy."""
+    if os.name == "nt":
+        path = os.path.join(workdir, name + ".cmd")
+        text = f'@set "PYTHONPATH={ROOT}"\r\n@"{sys.executable}" -m {module} %*\r\n'
+    else:
+        path = os.path.join(workdir, name)
+        text = f'#!/bin/sh\nPYTHONPATH="{ROOT}" exec "{sys.executable}" -m {module} "$@"\n'
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.chmod(path, 0o755)
+    return path
+
+
+def prepare(workdir: str):
+    """Must run before anything from app/ is imported (paths are read at import time)."""
+    os.environ["LOGINVRCAST_ADB"] = _wrapper(workdir, "adb", "bench.fake_adb")
+    os.environ["LOGINVRCAST_SCRCPY"] = _wrapper(workdir, "scrcpy", "bench.fake_scrcpy")
+    os.environ["LOGINVRCAST_DATA_DIR"] = os.path.join(workdir, "data")
+    os.environ[sc.SCENARIO_ENV] = os.path.join(workdir, "scenario.json")
+    os.environ[sc.STATE_ENV] = os.path.join(workdir, "state.json")
+
+
+def _closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _reset_app():
+    """Fresh caches and data dir, as if the app had just started."""
+    from app import scrcpy_runner as runner, tracing
+    from app.codec_cache import CodecCache
+    from app.endpoint_cache import EndpointCache
+    from app.geometry import GeometryCache
+    shutil.rmtree(os.environ["LOGINVRCAST_DATA_DIR"], ignore_errors=True)
+    runner.DEVICES.invalidate()
+    runner._device_keys.clear()
+    runner.SHELLS.close()
+    runner.SERVERS.forget()
+    runner.GEOMETRY = GeometryCache(runner._adb)
+    runner.ENDPOINTS = EndpointCache()
+    runner.CODECS = CodecCache()
+    tracing.clear()
+
+
+class Case:
+    def __init__(self, devices: int, mode: str, latency_ms: dict, fail: dict, seed: int):
+        from app import adb_client
+        self.devices, self.mode = devices, mode
+        data = sc.make_scenario(devices, latency_ms, fail, seed)
+        sc.write(os.environ[sc.SCENARIO_ENV], data)
+        self.world = sc.World(data)
+        self.world.reset()
+        self.server = FakeAdbServer(self.world).start() if mode == "server" else None
+        self.listeners = FakeListeners(self.world).start()
+        adb_client.ADB_SERVER_PORT = self.server.port if self.server else _closed_port()
+        _reset_app()
+
+    def reset(self):
+        self.world.reset()
+        self.listeners.reset()
+        _reset_app()
+
+    def close(self):
+        self.listeners.close()
+        if self.server is not None:
+            self.server.close()
+
+
+# ---------- measurements ----------
+
+def _stats(samples: list[float], prefix: str = "") -> dict:
+    from app.tracing import percentile
+    if not samples:
+        return {f"{prefix}n": 0}
+    ordered = sorted(samples)
+    return {
+        f"{prefix}n": len(ordered),
+        f"{prefix}p50_ms": round(percentile(ordered, 50), 2),
+        f"{prefix}p95_ms": round(percentile(ordered, 95), 2),
+        f"{prefix}max_ms": round(ordered[-1], 2),
+        f"{prefix}mean_ms": round(sum(ordered) / len(ordered), 2),
+    }
+
+
+def bench_status_poll(case: Case, polls: int) -> dict:
+    from app import scrcpy_runner as runner
+    samples = []
+    for _ in range(polls):
+        runner.DEVICES.invalidate()
+        t = time.perf_counter()
+        runner.status()
+        samples.append((time.perf_counter() - t) * 1000)
+    return _stats(samples)
+
+
+def bench_shell_roundtrip(case: Case, polls: int) -> dict:
+    from app import scrcpy_runner as runner
+    serial = case.world.scenario["devices"][0]["serial"]
+    samples, failures = [], 0
+    for _ in range(polls):
+        t = time.perf_counter()
+        out = runner._adb(["-s", serial, "shell", "getprop ro.product.model"])
+        samples.append((time.perf_counter() - t) * 1000)
+        failures += out.returncode != 0 or not out.stdout.strip()
+    return {**_stats(samples), "failures": failures}
+
+
+def bench_wireless_connect(case: Case, repeat: int) -> dict:
+    from app.wireless import WirelessConnect
+    samples, stages, failures = [], {}, 0
+    for _ in range(repeat):
+        case.reset()
+        flow = WirelessConnect()
+        t = time.perf_counter()
+        ok, _ = flow.run()
+        samples.append((time.perf_counter() - t) * 1000)
+        failures += not ok
+        for name, sec in flow.timings:
+            stages.setdefault(name, []).append(sec * 1000)
+    row = {**_stats(samples), "failures": failures}
+    for name, values in stages.items():
+        row.update(_stats(values, f"stage_{name}_"))
+    return row
+
+
+def bench_provision(case: Case, repeat: int) -> dict:
+    from app.provision import Provisioner
+    total, per_device, retried, failures = [], [], 0, 0
+    for _ in range(repeat):
+        case.reset()
+        provisioner = Provisioner()
+        results = provisioner.run()
+        total.append(provisioner.elapsed * 1000)
+        per_device += [r["sec"] * 1000 for r in results.values() if r["ok"]]
+        retried += sum(r["attempts"] > 1 for r in results.values())
+        failures += len(provisioner.failed()) + (case.devices - len(results))
+    return {**_stats(total, "total_"), **_stats(per_device, "device_"), "retried": retried,
+            "failures": failures}
+
+
+def bench_cast_to_start(case: Case, repeat: int) -> dict:
+    from app import scrcpy_runner as runner
+    from app.sessions import SessionManager
+    started, first_frame, launch, stop = [], [], [], []
+    failures = 0
+    for _ in range(repeat):
+        case.reset()
+        serials = runner.castable_devices()
+        manager = SessionManager(runner.start_scrcpy)
+        t0, wall0 = time.perf_counter(), time.time()
+        errors = manager.start_many(serials, "OpenGL", "crop")
+        launch.append((time.perf_counter() - t0) * 1000)
+        failures += len(errors)
+        sessions = [s for s in manager.sessions() if s.telemetry is not None]
+        _wait_first_frames(sessions)
+        for s in sessions:
+            started.append((s.started_at - wall0) * 1000)
+            if s.telemetry.first_frame_at is None:
+                failures += 1
+            else:
+                first_frame.append((s.telemetry.first_frame_at - wall0) * 1000)
+        t1 = time.perf_counter()
+        manager.stop_all()
+        stop.append((time.perf_counter() - t1) * 1000)
+    return {**_stats(started, "start_"), **_stats(first_frame, "first_frame_"),
+            **_stats(launch, "launch_all_"), **_stats(stop, "stop_all_"), "failures": failures}
+
+
+def _wait_first_frames(sessions) -> None:
+    deadline = time.monotonic() + FIRST_FRAME_TIMEOUT_SEC
+    while time.monotonic() < deadline and any(
+            s.telemetry is not None and s.telemetry.first_frame_at is None and s.running for s in sessions):
+        time.sleep(0.005)
+
+
+def bench_cast_restart(case: Case, repeat: int) -> dict:
+    from app import scrcpy_runner as runner
+    from app.sessions import SessionManager
+    samples, failures = [], 0
+    for _ in range(repeat):
+        case.reset()
+        manager = SessionManager(runner.start_scrcpy)
+        failures += len(manager.start_many(runner.castable_devices(), "OpenGL", "crop"))
+        _wait_first_frames(manager.sessions())
+        failures += len(manager.restart_many(renderer="Direct3D"))
+        sessions = manager.sessions()
+        _wait_first_frames(sessions)
+        for s in sessions:
+            if s.first_frame_sec is None:
+                failures += 1
+            else:
+                samples.append(s.first_frame_sec * 1000)
+        manager.stop_all()
+    return {**_stats(samples), "failures": failures}
+
+
+def bench_server_stage(case: Case, repeat: int) -> dict:
+    from app import scrcpy_runner as runner
+    serials = [d["serial"] for d in case.world.scenario["devices"]]
+    cold, warm, failures = [], [], 0
+    for _ in range(repeat):
+        case.reset()
+        for samples in (cold, warm):
+            for serial in serials:
+                t = time.perf_counter()
+                failures += not runner.SERVERS.ensure(serial)
+                samples.append((time.perf_counter() - t) * 1000)
+    return {**_stats(cold, "cold_"), **_stats(warm, "warm_"), "failures": failures}
+
+
+RELAY_SEC = 3
+
+
+def bench_relay_fanout(case: Case) -> dict:
+    from app import scrcpy_runner as runner
+    from app.relay import Relay
+    from app.sessions import SessionManager
+    case.reset()
+    # קצב גבוה: יותר chunks ממה שתור של צרכן מחזיק בזמן הריצה → הצופה האיטי חייב לדלג
+    scenario = case.world.scenario
+    sc.write(os.environ[sc.SCENARIO_ENV], {**scenario, "scrcpy": {**scenario["scrcpy"], "record_fps": 120, "frame_bytes": 32768}})
+    serial = scenario["devices"][0]["serial"]
+    record_dir = os.path.join(os.environ["LOGINVRCAST_DATA_DIR"], "recordings")
+    relay = Relay(serial, record_dir=record_dir, view_port=0).start()
+    manager = SessionManager(runner.start_scrcpy)
+    fast = socket.create_connection(("127.0.0.1", relay.viewers.port))
+    slow = socket.socket()
+    slow.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 4096)
+    slow.connect(("127.0.0.1", relay.viewers.port))
+    got, gaps = 0, []
+    try:
+        manager.start(serial, "OpenGL", "crop", extra_args=relay.scrcpy_args())
+        fast.settimeout(0.5)
+        until = time.monotonic() + RELAY_SEC
+        last = None
+        while time.monotonic() < until:
+            try:
+                data = fast.recv(65536)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            now = time.perf_counter()
+            if last is not None:
+                gaps.append((now - last) * 1000)
+            last, got = now, got + len(data)
+        stats = relay.stats()
+    finally:
+        manager.stop_all()
+        relay.close()
+        fast.close()
+        slow.close()
+        sc.write(os.environ[sc.SCENARIO_ENV], scenario)
+    recorded = relay.recorder.bytes
+    slow_stats = [v for k, v in stats.items() if k != "recorder"]
+    dropped = max((v["dropped"] for v in slow_stats), default=0)
+    return {**_stats(gaps, "fast_gap_"), "recorded_kb": recorded // 1024, "fast_viewer_kb": got // 1024,
+            "slow_viewer_dropped": dropped, "files": len(relay.recorder.files),
+            "failures": int(not recorded or got < recorded * 0.9)}
+
+
+LAN_SPARE_HOSTS = ["127.0.250.1", "127.0.250.2"]   # אף אחד לא מאזין שם
+LISTEN_TIMEOUT_SEC = 5
+
+
+def _wait_listening(targets: set[str], timeout: float) -> bool:
+    until = time.monotonic() + timeout
+    pending = set(targets)
+    while pending and time.monotonic() < until:
+        for target in list(pending):
+            host, _, port = target.rpartition(":")
+            try:
+                socket.create_connection((host, int(port)), timeout=0.2).close()
+                pending.discard(target)
+            except OSError:
+                pass
+        time.sleep(0.01)
+    return not pending
+
+
+def bench_lan_discover(case: Case, repeat: int) -> dict:
+    """
+    LAN discovery against real listeners on 127.0.x.y: half of the headsets in
+    tcpip mode (listening), half not, plus addresses nobody uses. Fails unless
+    the sweep and the connect find exactly the listening ones and each lands
+    in the endpoint cache under its hardware serial.
+    """
+    from app import lan_discovery, scrcpy_runner as runner
+    devices = case.world.scenario["devices"]
+    sweep_ms, discover_ms, failures = [], [], 0
+    for _ in range(repeat):
+        case.reset()
+        listening = devices[::2]
+        for d in listening:
+            case.world.tcpip(d)
+        expected = {f"{d['ip']}:{runner.WIRELESS_PORT}" for d in listening}
+        if not _wait_listening(expected, LISTEN_TIMEOUT_SEC):
+            failures += 1
+            continue
+        hosts = [d["ip"] for d in devices] + LAN_SPARE_HOSTS
+        t0 = time.perf_counter()
+        found = lan_discovery.sweep(hosts=hosts)
+        sweep_ms.append((time.perf_counter() - t0) * 1000)
+        t0 = time.perf_counter()
+        connected = lan_discovery.discover_and_connect(hosts=hosts)
+        discover_ms.append((time.perf_counter() - t0) * 1000)
+        cached = {serial: (e["ip"], e["port"]) for serial, e in runner.ENDPOINTS.entries().items()}
+        failures += (set(found) != expected or set(connected) != expected
+                     or cached != {d["serial"]: (d["ip"], int(runner.WIRELESS_PORT)) for d in listening})
+    return {**_stats(sweep_ms, "sweep_"), **_stats(discover_ms, "discover_"),
+            "listening": len(devices[::2]), "hosts": len(devices) + len(LAN_SPARE_HOSTS), "failures": failures}
+
+
+CODEC_TRIAL_SEC = 1.0
+CODEC_FPS = {"c2.qti.avc.encoder": 45, "c2.qti.hevc.encoder": 72}   # המנצח הצפוי: hevc
+
+
+def bench_codec_bench(case: Case, repeat: int) -> dict:
+    """The encoder benchmark against the stand-in: every hw encoder tried, the fastest stored in codecs.json."""
+    from app import codec_bench, scrcpy_runner as runner
+    from app.codec_cache import CodecCache
+    scenario = case.world.scenario
+    sc.write(os.environ[sc.SCENARIO_ENV], {**scenario, "scrcpy": {
+        **scenario["scrcpy"], "fps_interval_ms": 100, "encoder_fps": CODEC_FPS}})
+    serial = scenario["devices"][0]["serial"]
+    expected = max(CODEC_FPS, key=CODEC_FPS.get)
+    samples, failures = [], 0
+    try:
+        for _ in range(repeat):
+            case.reset()
+            t0 = time.perf_counter()
+            res = codec_bench.benchmark(serial, seconds=CODEC_TRIAL_SEC)
+            samples.append((time.perf_counter() - t0) * 1000)
+            stored = CodecCache().get(res["key"]) if res["key"] else None   # נקרא מחדש מ-codecs.json
+            failures += (len(res["results"]) != len(CODEC_FPS) or res["winner"] is None
+                         or res["winner"][1] != expected or stored != res["winner"])
+    finally:
+        sc.write(os.environ[sc.SCENARIO_ENV], scenario)
+    return {**_stats(samples), "trials": len(CODEC_FPS), "failures": failures}
+
+
+SPLIT_CLUSTERS = 2000
+
+
+def _mkv_like(rng, clusters: int) -> bytes:
+    """A stand-in Matroska stream: a header, then clusters of random payload (some tiny)."""
+    from app.relay import CLUSTER_ID
+    parts = [b"\x1a\x45\xdf\xa3" + rng.randbytes(200)]
+    for _ in range(clusters):
+        parts.append(CLUSTER_ID + rng.randbytes(rng.choice((0, 1, 3, 5, rng.randrange(64, 16384)))))
+    return b"".join(parts)
+
+
+def bench_relay_split(case: Case, repeat: int) -> dict:
+    """ClusterSplitter over short, uneven reads: the chunks joined must be the stream, cut at every Cluster."""
+    import io, random
+    from app.relay import CLUSTER_ID, ClusterSplitter
+
+    class ShortReads(io.BytesIO):
+        def __init__(self, data, rng):
+            super().__init__(data)
+            self._rng = rng
+
+        def readinto(self, b):
+            return super().readinto(b[:self._rng.randrange(1, len(b) + 1)])
+
+    rng = random.Random(case.world.scenario.get("seed", 0))
+    times, mbps, failures = [], [], 0
+    for _ in range(repeat):
+        data = _mkv_like(rng, SPLIT_CLUSTERS)
+        src, splitter, chunks = ShortReads(data, rng), ClusterSplitter(), []
+        t0 = time.perf_counter()
+        while (out := splitter.fill(src)) is not None:
+            chunks.extend(out)
+        elapsed = time.perf_counter() - t0
+        times.append(elapsed * 1000)
+        mbps.append(len(data) / 2**20 / elapsed)
+        starts, pos = set(), 0
+        for chunk in chunks:
+            if chunk.boundary:
+                starts.add(pos)
+            pos += len(chunk.data)
+        ids, i = set(), data.find(CLUSTER_ID)
+        while i != -1:
+            ids.add(i)
+            i = data.find(CLUSTER_ID, i + 1)
+        failures += b"".join(bytes(c.data) for c in chunks) != data or starts != ids
+    return {**_stats(times), "mb_per_sec": round(min(mbps), 1), "failures": failures}
+
+
+def bench_cast_recover(case: Case, repeat: int) -> dict:
+    from app import scrcpy_runner as runner
+    from app.sessions import SessionManager
+    from app.supervisor import CastSupervisor, RECOVERED
+    samples, attempts, failures = [], [], 0
+    devices = case.world.scenario["devices"]
+    for _ in range(repeat):
+        case.reset()
+        for d in devices:
+            case.world.tcpip(d)
+            case.world.connect(f"{d['ip']}:5555")
+        runner.DEVICES.invalidate()
+        supervisor = None
+        manager = SessionManager(runner.start_scrcpy, on_exit=lambda s: supervisor.on_exit(s))
+        supervisor = CastSupervisor(manager)
+        failures += len(manager.start_many([f"{d['ip']}:5555" for d in devices], "OpenGL", "crop"))
+        _wait_first_frames(manager.sessions())
+        dropped_at = time.time()
+        case.world.disconnect("")   # Wi‑Fi נופל לכולם יחד
+        deadline = time.monotonic() + 60
+        while time.monotonic() < deadline and len(supervisor.outages()) < len(devices):
+            time.sleep(0.05)
+        outages = supervisor.outages()
+        supervisor.close()
+        manager.stop_all()
+        for o in outages:
+            if o["result"] == RECOVERED:
+                samples.append((o["recovered_at"] - dropped_at) * 1000)
+                attempts.append(o["attempts"])
+        failures += len(devices) - sum(o["result"] == RECOVERED for o in outages)
+    return {**_stats(samples), "attempts_max": max(attempts, default=0), "failures": failures}
+
+
+def bench_api_status(case: Case, polls: int, clients: int = 32) -> dict:
+    import http.client, threading
+    from app import daemon
+    from app.admission import Budget
+    from app.fleet import Fleet
+    case.reset()
+    fleet = Fleet()
+    # ה-stand-ins לא מפענחים וידאו: תקציב המחשב לא אמור לדחות כאן שידורים
+    fleet.admission.budget = Budget(float("inf"), 2**62)
+    api = daemon.serve_in_thread(fleet, port=0)
+    samples, errors, lock = [], [0], threading.Lock()
+
+    def call(conn, method, path, body=None):
+        conn.request(method, path, body=None if body is None else json.dumps(body),
+                     headers={"Content-Type": "application/json"})
+        resp = conn.getresponse()
+        return resp.status, json.loads(resp.read())
+
+    def client():
+        conn = http.client.HTTPConnection(daemon.HOST, api.port, timeout=30)
+        mine, failed = [], 0
+        for _ in range(polls):
+            t = time.perf_counter()
+            try:
+                status, _ = call(conn, "GET", "/status")
+            except (OSError, http.client.HTTPException, ValueError):
+                # חיבור שנפל / תשובה שבורה: נספר ככישלון, ממשיכים בחיבור חדש
+                failed += 1
+                conn.close()
+                conn = http.client.HTTPConnection(daemon.HOST, api.port, timeout=30)
+                continue
+            mine.append((time.perf_counter() - t) * 1000)
+            failed += status != 200
+        conn.close()
+        with lock:
+            samples.extend(mine)
+            errors[0] += failed
+
+    try:
+        threads = [threading.Thread(target=client) for _ in range(clients)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        wall = time.perf_counter() - t0
+        conn = http.client.HTTPConnection(daemon.HOST, api.port, timeout=60)
+        bulk = {}
+        for name, path, body in (("cast", "/cast", {"serials": fleet.castable()}), ("stop", "/stop", {})):
+            t1 = time.perf_counter()
+            try:
+                status, reply = call(conn, "POST", path, body)
+                ok = status == 200 and reply.get("ok") is True
+            except (OSError, http.client.HTTPException, ValueError):
+                ok = False
+                conn.close()
+                conn = http.client.HTTPConnection(daemon.HOST, api.port, timeout=60)
+            bulk[name] = ((time.perf_counter() - t1) * 1000, ok)
+        conn.close()
+    finally:
+        api.close()
+        fleet.shutdown()
+    return {**_stats(samples, "status_"), "requests_per_sec": round(len(samples) / wall),
+            "bulk_cast_ms": round(bulk["cast"][0], 2), "bulk_stop_ms": round(bulk["stop"][0], 2),
+            # בלי אף דגימה אין כאן מדידה — זה כישלון ולא "0 שגיאות"
+            "failures": errors[0] + (not samples) + (not bulk["cast"][1]) + (not bulk["stop"][1])}
+
+
+BENCHES = {
+    "status_poll": lambda case, args: bench_status_poll(case, args.polls),
+    "shell_roundtrip": lambda case, args: bench_shell_roundtrip(case, args.polls),
+    "wireless_connect": lambda case, args: bench_wireless_connect(case, args.repeat),
+    "provision": lambda case, args: bench_provision(case, args.repeat),
+    "cast_to_start": lambda case, args: bench_cast_to_start(case, args.repeat),
+    "cast_restart": lambda case, args: bench_cast_restart(case, args.repeat),
+    "server_stage": lambda case, args: bench_server_stage(case, args.repeat),
+    "relay_fanout": lambda case, args: bench_relay_fanout(case),
+    "relay_split": lambda case, args: bench_relay_split(case, args.repeat),
+    "codec_bench": lambda case, args: bench_codec_bench(case, args.repeat),
+    "lan_discover": lambda case, args: bench_lan_discover(case, args.repeat),
+    "cast_recover": lambda case, args: bench_cast_recover(case, args.repeat),
+    "api_status": lambda case, args: bench_api_status(case, args.polls),
+}
+
+
+# ---------- results ----------
+
+def _git_rev() -> str | None:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, timeout=5)
+        return out.stdout.strip() or None
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+
+
+def _key(row: dict) -> tuple:
+    return row["bench"], row["mode"], row["devices"]
+
+
+def compare(old: dict, new: dict, threshold_pct: float) -> tuple[list[str], int]:
+    """p50/p95 deltas per case → (report lines, number of regressions above threshold_pct)."""
+    before = {_key(r): r for r in old["results"]}
+    lines, regressions = [], 0
+    for row in new["results"]:
+        base = before.get(_key(row))
+        if base is None:
+            continue
+        for metric in [m for m in base if m.endswith(("p50_ms", "p95_ms")) and m not in row]:
+            # בבסיס נמדד, עכשיו אין דגימות בכלל
+            regressions += 1
+            lines.append(f"{row['bench']:<17} {row['mode']:<6} n={row['devices']:<3} {metric:<20} "
+                         f"{base[metric]:>9.1f} → no samples  << regression")
+        for metric, value in row.items():
+            if not (metric.endswith("p50_ms") or metric.endswith("p95_ms")) or not base.get(metric):
+                continue
+            delta = (value - base[metric]) / base[metric] * 100
+            flag = ""
+            if delta > threshold_pct:
+                flag, regressions = "  << regression", regressions + 1
+            lines.append(f"{row['bench']:<17} {row['mode']:<6} n={row['devices']:<3} {metric:<20} "
+                         f"{base[metric]:>9.1f} → {value:>9.1f} ms ({delta:+.0f}%){flag}")
+    return lines, regressions
+
+
+def run(args) -> dict:
+    from app import __version__, tracing
+    results = []
+    for mode in args.modes:
+        for devices in args.devices:
+            case = Case(devices, mode, args.latency, args.fail, args.seed)
+            try:
+                for name in args.benches:
+                    row = {"bench": name, "mode": mode, "devices": devices, **BENCHES[name](case, args),
+                           "commands": tracing.summary()}
+                    results.append(row)
+                    print(f"{name:<17} {mode:<6} n={devices:<3} " + "  ".join(
+                        f"{k}={v}" for k, v in row.items() if k.endswith(("p50_ms", "p95_ms", "failures"))),
+                        flush=True)
+            finally:
+                case.close()
+    return {
+        "schema": SCHEMA,
+        "app_version": __version__,
+        "git_rev": _git_rev(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "started_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {"devices": args.devices, "modes": args.modes, "repeat": args.repeat, "polls": args.polls,
+                   "latency_ms": sc.make_scenario(0, args.latency)["latency_ms"], "fail": args.fail,
+                   "seed": args.seed},
+        "results": results,
+    }
+
+
+def _pairs(items: list[str], cast) -> dict:
+    out = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        out[key] = cast(value)
+    return out
+
+
+def main(argv: list[str] | None = None) -> int:
+    p = argparse.ArgumentParser(prog="python -m bench", description=__doc__.split("\n\n")[0])
+    p.add_argument("--devices", default="1,10,50", help="comma-separated fake device counts")
+    p.add_argument("--modes", default="server,exe", help="server (host protocol) and/or exe (spawned adb)")
+    p.add_argument("--bench", dest="benches", default=",".join(BENCHES), help="which benchmarks to run")
+    p.add_argument("--repeat", type=int, default=3, help="runs of wireless_connect / cast_to_start per case")
+    p.add_argument("--polls", type=int, default=50, help="status ticks per case")
+    p.add_argument("--latency", nargs="*", default=[], metavar="CMD=MS", help="e.g. shell=80 connect=300")
+    p.add_argument("--fail", nargs="*", default=[], metavar="CMD=P", help="failure rate, e.g. connect=0.2")
+    p.add_argument("--seed", type=int, default=1)
+    p.add_argument("--out", help="result file (default: bench/results/bench-<version>-<time>.json)")
+    p.add_argument("--compare", nargs="+", metavar="FILE",
+                   help="baseline to diff against after the run; with two files, only diff them")
+    p.add_argument("--max-regression", type=float, default=None, metavar="PCT",
+                   help="exit 1 if any p50/p95 got slower than this percentage")
+    args = p.parse_args(argv)
+
+    if args.compare and len(args.compare) == 2:
+        old, new = (json.load(open(f, encoding="utf-8")) for f in args.compare)
+    else:
+        args.devices = [int(n) for n in args.devices.split(",")]
+        args.modes = args.modes.split(",")
+        args.benches = args.benches.split(",")
+        args.latency = _pairs(args.latency, float)
+        args.fail = _pairs(args.fail, float)
+        workdir = tempfile.mkdtemp(prefix="lvc-bench-")
+        try:
+            prepare(workdir)
+            new = run(args)
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+        out = args.out or os.path.join(
+            RESULTS_DIR, f"bench-{new['app_version']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            json.dump(new, f, ensure_ascii=False, indent=2)
+        print(f"\nresults: {out}")
+        if not args.compare:
+            return 0
+        old = json.load(open(args.compare[0], encoding="utf-8"))
+
+    lines, regressions = compare(old, new, args.max_regression if args.max_regression is not None else 10.0)
+    print("\n".join(lines) or "nothing to compare")
+    return 1 if args.max_regression is not None and regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
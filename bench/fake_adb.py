@@ -0,0 +1,262 @@
+"""
+Scriptable stand-in for adb.
+
+Two faces over the same World (bench/scenario.py):
+  * FakeAdbServer — the host protocol on a local port (what app/adb_client.py
+    talks to), run in a thread of the benchmark process;
+  * the command line (`python -m bench.fake_adb devices -l`, `-s SERIAL shell ...`,
+    `connect HOST:PORT`, ...) — what scrcpy_runner spawns when no server is up.
+FakeListeners plays adbd after `tcpip`: a real listener on the headset's ip:5555.
+"""
+import re, socket, sys, threading, time
+
+from bench.scenario import World
+
+RC_MARKER = ":LVC_RC:"
+_SENTINEL_RE = re.compile(r"^printf '\\n%s:%s\\n' (\S+) ")
+
+
+# ---------- host protocol ----------
+
+def _recv_exact(conn: socket.socket, n: int) -> bytes:
+    buf = b""
+    while len(buf) < n:
+        chunk = conn.recv(n - len(buf))
+        if not chunk:
+            raise ConnectionError("client closed")
+        buf += chunk
+    return buf
+
+
+def _read_request(conn: socket.socket) -> str:
+    return _recv_exact(conn, int(_recv_exact(conn, 4), 16)).decode("utf-8", errors="ignore")
+
+
+def _block(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return b"%04x" % len(data) + data
+
+
+class FakeAdbServer:
+    def __init__(self, world: World, host: str = "127.0.0.1", port: int = 0):
+        self.world = world
+        self.requests: list[str] = []
+        self._sock = socket.create_server((host, port))
+        self.port = self._sock.getsockname()[1]
+        self._thread = threading.Thread(target=self._accept, name="fake-adb-server", daemon=True)
+
+    def start(self) -> "FakeAdbServer":
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._sock.close()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self._sock.accept()
+            except OSError:
+                return
+            threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: socket.socket):
+        with conn:
+            try:
+                self._serve(conn, _read_request(conn))
+            except (OSError, ConnectionError, ValueError):
+                pass
+
+    def _serve(self, conn: socket.socket, service: str):
+        w = self.world
+        self.requests.append(service)
+        if service in ("host:devices", "host:devices-l"):
+            w.delay("devices")
+            conn.sendall(b"OKAY" + _block(w.devices_l()))
+        elif "wait-for-" in service:
+            conn.sendall(b"OKAY")
+            if w.usb_ready():
+                conn.sendall(b"OKAY")
+            else:
+                conn.recv(1)  # לא יקרה בתרחיש סטטי: מחכים שהלקוח יוותר
+        elif service == "host:version":
+            conn.sendall(b"OKAY" + _block("0029"))
+        elif service.startswith("host:connect:"):
+            w.delay("connect")
+            conn.sendall(b"OKAY" + _block(w.connect(service[len("host:connect:"):])))
+        elif service.startswith("host:disconnect:"):
+            w.delay("disconnect")
+            conn.sendall(b"OKAY" + _block(w.disconnect(service[len("host:disconnect:"):])))
+        elif service.startswith(("host:transport:", "host:transport-any")):
+            serial = service[len("host:transport:"):] if service.startswith("host:transport:") else None
+            device = w.device(serial)
+            if device is None:
+                conn.sendall(b"FAIL" + _block(f"device '{serial}' not found"))
+                return
+            conn.sendall(b"OKAY")
+            self._device_service(conn, device, _read_request(conn))
+        else:
+            conn.sendall(b"FAIL" + _block(f"unknown host service '{service}'"))
+
+    def _device_service(self, conn: socket.socket, device: dict, service: str):
+        w = self.world
+        self.requests.append(service)
+        if service == "shell:sh":
+            w.delay("shell")
+            conn.sendall(b"OKAY")
+            self._interactive_shell(conn, device)
+        elif service.startswith("shell:"):
+            w.delay("shell")
+            if w.fails("shell"):
+                conn.sendall(b"FAIL" + _block("closed"))
+                return
+            out, _ = w.shell(device, service[len("shell:"):])
+            conn.sendall(b"OKAY" + out.replace("\n", "\r\n").encode("utf-8"))
+        elif service.startswith("tcpip:"):
+            w.delay("tcpip")
+            if not w.tcpip(device):
+                conn.sendall(b"FAIL" + _block("closed"))
+                return
+            conn.sendall(b"OKAY" + f"restarting in TCP mode port: {service[6:]}\n".encode())
+        elif service == "usb:":
+            w.delay("usb")
+            conn.sendall(b"OKAY" + b"restarting in USB mode\n")
+        else:
+            conn.sendall(b"FAIL" + _block(f"unknown service '{service}'"))
+
+    def _interactive_shell(self, conn: socket.socket, device: dict):
+        """`sh` reading stdin: run everything up to each sentinel printf as one command."""
+        w, buf, pending = self.world, b"", []
+        while True:
+            chunk = conn.recv(65536)
+            if not chunk:
+                return
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                text = line.decode("utf-8", errors="ignore")
+                m = _SENTINEL_RE.match(text)
+                if m is None:
+                    # app/shell_session.py עוטף כל פקודה ב-"{ cmd\n} </dev/null"
+                    if text.startswith("{ "):
+                        text = text[2:]
+                    if text.strip() not in ("exec 2>&1", "} </dev/null"):
+                        pending.append(text)
+                    continue
+                w.delay("shell_cmd")
+                out, rc = w.shell(device, ";".join(pending)) if not w.fails("shell") else ("", 1)
+                pending.clear()
+                conn.sendall(f"{out}\n{m.group(1)}:{rc}\n".encode("utf-8"))
+
+
+class FakeListeners:
+    """
+    adbd in tcpip mode: once a headset is switched with `tcpip`, a real TCP
+    listener opens on its ip:5555 after latency_ms["listen"] — what the
+    wireless flow polls for before `adb connect`.
+    """
+
+    def __init__(self, world: World, port: int = 5555, poll_sec: float = 0.005):
+        self.world = world
+        self.port = port
+        self._poll = poll_sec
+        self._seen: dict[str, float] = {}
+        self._socks: dict[str, socket.socket] = {}
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="fake-adbd-listeners", daemon=True)
+
+    def start(self) -> "FakeListeners":
+        self._thread.start()
+        return self
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(1)
+        self.reset()
+
+    def reset(self):
+        for s in self._socks.values():
+            s.close()
+        self._socks.clear()
+        self._seen.clear()
+
+    def _loop(self):
+        delay = self.world.scenario.get("latency_ms", {}).get("listen", 0) / 1000
+        by_serial = {d["serial"]: d for d in self.world.scenario["devices"]}
+        while not self._stop.wait(self._poll):
+            now = time.monotonic()
+            for serial in self.world.tcpip_serials():
+                since = self._seen.setdefault(serial, now)
+                if serial not in self._socks and now - since >= delay and serial in by_serial:
+                    try:
+                        self._socks[serial] = socket.create_server((by_serial[serial]["ip"], self.port))
+                    except OSError:
+                        pass
+
+
+# ---------- command line ----------
+
+def main(argv: list[str]) -> int:
+    w = World()
+    serial = None
+    if len(argv) >= 2 and argv[0] == "-s":
+        serial, argv = argv[1], argv[2:]
+    if not argv:
+        print("adb: usage: no command", file=sys.stderr)
+        return 1
+    cmd, params = argv[0], argv[1:]
+    w.delay(cmd)
+    if cmd in ("start-server", "kill-server"):
+        return 0
+    if cmd.startswith("wait-for-"):
+        while not w.usb_ready():
+            time.sleep(0.05)
+        return 0
+    if cmd == "version":
+        print("Android Debug Bridge version 1.0.41 (fake)")
+        return 0
+    if cmd == "devices":
+        print("List of devices attached")
+        sys.stdout.write(w.devices_l())
+        return 0
+    if cmd == "connect" and params:
+        msg = w.connect(params[0])
+        print(msg)
+        return 0 if "connected to" in msg else 1
+    if cmd == "disconnect":
+        print(w.disconnect(params[0] if params else ""))
+        return 0
+
+    device = w.device(serial)
+    if device is None:
+        print(f"adb: device '{serial}' not found" if serial else "adb: no devices/emulators found",
+              file=sys.stderr)
+        return 1
+    if cmd == "shell":
+        if w.fails("shell"):
+            print("adb: error: closed", file=sys.stderr)
+            return 1
+        out, rc = w.shell(device, " ".join(params))
+        sys.stdout.write(out)
+        return rc
+    if cmd == "push" and len(params) == 2:
+        if not w.push(device, params[0], params[1]):
+            print(f"adb: error: failed to copy '{params[0]}' to '{params[1]}'", file=sys.stderr)
+            return 1
+        print(f"{params[0]}: 1 file pushed, 0 skipped.")
+        return 0
+    if cmd == "tcpip" and params:
+        if not w.tcpip(device):
+            print("adb: error: closed", file=sys.stderr)
+            return 1
+        print(f"restarting in TCP mode port: {params[0]}")
+        return 0
+    if cmd == "usb":
+        print("restarting in USB mode")
+        return 0
+    print(f"adb: unknown command {cmd}", file=sys.stderr)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
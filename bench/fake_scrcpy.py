@@ -0,0 +1,90 @@
+"""
+Scriptable stand-in for scrcpy.
+
+Reads the "scrcpy" part of the scenario: startup delay before the first
+frame, FPS value and skipped frames per sample, sample interval, how long a
+terminate takes to shut down (stop_ms), the encoder list for
+--list-encoders and, per --video-encoder, the FPS it reaches (encoder_fps);
+fail["scrcpy"] is the launch failure rate. With --record it
+writes a Matroska-shaped stream (header, then one cluster of frame_bytes per
+frame at record_fps) to the given path — a pipe, when app/relay.py runs it.
+Exits with code 2 ("Device disconnected") once its serial is gone, e.g.
+after the Wi‑Fi endpoint was disconnected in the shared state.
+Logs in scrcpy's own format (INFO/ERROR lines, "Texture: WxH",
+"N fps (+K frames skipped)") so app/telemetry.py parses it like the real
+thing. Runs until terminated.
+"""
+import signal, sys, threading, time
+
+from bench.scenario import World
+
+
+EBML_HEADER = b"\x1a\x45\xdf\xa3" + bytes(28) + b"\x18\x53\x80\x67" + bytes(60)   # EBML, Segment, Tracks
+CLUSTER_ID = b"\x1f\x43\xb6\x75"
+
+
+def _record(path: str, cfg: dict):
+    """One cluster per frame; ends when the reader goes away or the process exits."""
+    frame = CLUSTER_ID + bytes(max(0, cfg.get("frame_bytes", 4000) - len(CLUSTER_ID)))
+    interval = 1 / cfg.get("record_fps", 30)
+    try:
+        with open(path, "wb", buffering=0) as f:
+            f.write(EBML_HEADER)
+            while True:
+                f.write(frame)
+                time.sleep(interval)
+    except OSError:
+        pass
+
+
+def main(argv: list[str]) -> int:
+    w = World()
+    cfg = w.scenario.get("scrcpy", {})
+    serial = next((a.split("=", 1)[1] for a in argv if a.startswith("--serial=")), None)
+
+    def log(text: str, err: bool = False):
+        print(text, file=sys.stderr if err else sys.stdout, flush=True)
+
+    log("scrcpy 3.3.1 (fake) <https://github.com/Genymobile/scrcpy>")
+    if w.device(serial) is None:
+        log("ERROR: Could not find any ADB device" + (f" with serial {serial}" if serial else ""), err=True)
+        return 1
+
+    if "--list-encoders" in argv:
+        log("[server] INFO: List of video encoders:")
+        for codec, encoder, kind in cfg.get("encoders", []):
+            log(f"    --video-codec={codec} --video-encoder={encoder}    ({kind})")
+        return 0
+
+    def shutdown(*_):
+        # כמו scrcpy: סגירה מסודרת של השרת במכשיר לפני היציאה
+        time.sleep(cfg.get("stop_ms", 0) / 1000)
+        sys.exit(0)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    time.sleep(cfg.get("startup_ms", 0) / 1000)
+    if w.fails("scrcpy"):
+        log("ERROR: Server connection failed", err=True)
+        return 1
+    record = next((a.split("=", 1)[1] for a in argv if a.startswith("--record=")), None)
+    if record:
+        threading.Thread(target=_record, args=(record, cfg), daemon=True).start()
+    log("INFO: Renderer: opengl", err=True)
+    log("INFO: Texture: 1600x904", err=True)
+    interval = cfg.get("fps_interval_ms", 1000) / 1000
+    encoder = next((a.split("=", 1)[1] for a in argv if a.startswith("--video-encoder=")), None)
+    fps, skip = cfg.get("encoder_fps", {}).get(encoder, cfg.get("fps", 60)), cfg.get("skip", 0)
+    try:
+        while True:
+            time.sleep(interval)
+            if w.device(serial) is None:
+                # Wi‑Fi נפל / adb disconnect — כמו scrcpy: יציאה עם קוד 2
+                log("WARN: Device disconnected", err=True)
+                return 2
+            log(f"INFO: {fps} fps" + (f" (+{skip} frames skipped)" if skip else ""))
+    except KeyboardInterrupt:
+        return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
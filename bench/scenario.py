@@ -0,0 +1,260 @@
+"""
+Scenario and shared state for the fake adb / scrcpy stand-ins.
+
+A scenario (JSON, path in $LVC_FAKE_SCENARIO) describes the fake headsets,
+per-command latency, failure-injection probabilities and the shell
+transcripts each headset answers with. Mutable state (which headsets are in
+tcpip mode, which Wi‑Fi endpoints are connected) lives in $LVC_FAKE_STATE so
+the in-process fake server and every spawned stand-in see the same world.
+"""
+import contextlib, hashlib, json, os, random, tempfile, threading, time
+
+if os.name == "nt":
+    import msvcrt
+else:
+    import fcntl
+
+SCENARIO_ENV = "LVC_FAKE_SCENARIO"
+STATE_ENV = "LVC_FAKE_STATE"
+
+# "listen": מ-tcpip ועד ש-adbd מאזין על ip:5555 (אתחול adbd)
+# "shell": פקודה בודדת / פתיחת ערוץ; "shell_cmd": פקודה על ערוץ shell פתוח
+DEFAULT_LATENCY_MS = {
+    "devices": 3, "shell": 25, "shell_cmd": 8, "connect": 40, "disconnect": 5,
+    "tcpip": 150, "usb": 150, "listen": 300, "push": 60, "start-server": 1, "default": 2,
+}
+
+# תגובות shell לכל מכשיר; {ip} {model} {serial} {product} מוחלפים לפי המכשיר
+DEFAULT_SHELL = {
+    "ip route get 8.8.8.8": "8.8.8.8 via 192.168.1.1 dev wlan0 src {ip} uid 2000",
+    "ip -o link show": "1: lo: <LOOPBACK,UP,LOWER_UP> mtu 65536\n3: wlan0: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500",
+    "ip -o -4 addr": "1: lo    inet 127.0.0.1/8 scope host lo\n3: wlan0    inet {ip}/24 brd 192.168.1.255 scope global wlan0",
+    "ip route": "192.168.1.0/24 dev wlan0 proto kernel scope link src {ip}",
+    "getprop ro.product.model": "{model}",
+    "getprop ro.serialno": "{serial}",
+    "getprop ro.build.fingerprint": "oculus/{product}/{product}:12/SQ3A/51154110129:user/release-keys",
+    "wm size": "Physical size: {width}x{height}",
+    "wm density": "Physical density: 480",
+    "dumpsys display | grep -m 1 mBaseDisplayInfo":
+        '  mBaseDisplayInfo=DisplayInfo{{"Built-in Screen", displayId 0, real {width} x {height}, '
+        'largest app {width} x {height}, 90.0 fps, density 480 (480.0 x 480.0) dpi}}',
+}
+
+DEFAULT_ENCODERS = [
+    ("h264", "c2.qti.avc.encoder", "hw"),
+    ("h265", "c2.qti.hevc.encoder", "hw"),
+    ("h264", "c2.android.avc.encoder", "sw"),
+]
+
+
+def make_scenario(devices: int = 1, latency_ms: dict | None = None, fail: dict | None = None,
+                  seed: int = 1, scrcpy: dict | None = None) -> dict:
+    """
+    `devices` USB headsets. Their "Wi‑Fi" IPs are loopback aliases (127.0.1.101, ...)
+    so the tcpip listeners the suite opens for them are really reachable.
+    """
+    return {
+        "seed": seed,
+        "latency_ms": {**DEFAULT_LATENCY_MS, **(latency_ms or {})},
+        "fail": dict(fail or {}),
+        "devices": [
+            {"serial": f"1WMHH{i:09d}", "state": "device", "model": "Quest_3", "product": "eureka",
+             "ip": f"127.0.{1 + i // 150}.{101 + i % 150}", "width": 4128, "height": 2208}
+            for i in range(devices)
+        ],
+        "shell": dict(DEFAULT_SHELL),
+        "scrcpy": {"startup_ms": 150, "stop_ms": 100, "fps": 60, "fps_interval_ms": 1000, "skip": 0,
+                   "encoders": DEFAULT_ENCODERS, **(scrcpy or {})},
+    }
+
+
+def write(path: str, data: dict):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def load_scenario() -> dict:
+    with open(os.environ[SCENARIO_ENV], encoding="utf-8") as f:
+        return json.load(f)
+
+
+class World:
+    """
+    Scenario + mutable state, re-read per call. Updates hold a lock file next to
+    the state, so spawned stand-ins (exe mode) do not overwrite each other's changes.
+    """
+
+    def __init__(self, scenario: dict | None = None, state_path: str | None = None):
+        self.scenario = scenario if scenario is not None else load_scenario()
+        self.state_path = state_path or os.environ.get(STATE_ENV)
+        self._lock = threading.Lock()
+        self._rng_lock = threading.Lock()
+        self._rng = random.Random(self.scenario.get("seed"))
+
+    # ---------- state ----------
+
+    def _state(self) -> dict:
+        try:
+            with open(self.state_path, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError, TypeError):
+            return {"tcpip": [], "connected": [], "pushed": {}}
+
+    def _save(self, state: dict):
+        if self.state_path:
+            write(self.state_path, state)
+
+    @contextlib.contextmanager
+    def _updating(self):
+        """Read-modify-write of the state: this process's threads and every other stand-in."""
+        with self._lock:
+            if not self.state_path:
+                yield
+                return
+            with open(self.state_path + ".lock", "a+b") as f:
+                if os.name == "nt":
+                    f.seek(0)
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                else:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    if os.name == "nt":
+                        f.seek(0)
+                        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+                    else:
+                        fcntl.flock(f, fcntl.LOCK_UN)
+
+    def reset(self):
+        with self._updating():
+            self._save({"tcpip": [], "connected": [], "pushed": {}})
+
+    # ---------- behaviour knobs ----------
+
+    def delay(self, cmd: str):
+        lat = self.scenario.get("latency_ms", {})
+        ms = lat.get(cmd, lat.get("default", 0))
+        if ms:
+            time.sleep(ms / 1000)
+
+    def fails(self, cmd: str) -> bool:
+        p = self.scenario.get("fail", {}).get(cmd, 0)
+        with self._rng_lock:
+            return p > 0 and self._rng.random() < p
+
+    # ---------- queries ----------
+
+    def device(self, serial: str | None) -> dict | None:
+        devices = self.scenario["devices"]
+        if serial is None:
+            return devices[0] if devices else None
+        state = self._state()
+        for d in devices:
+            if serial == d["serial"] or (serial == f"{d['ip']}:5555" and serial in state["connected"]):
+                return d
+        return None
+
+    def usb_ready(self) -> bool:
+        return any(d["state"] == "device" for d in self.scenario["devices"])
+
+    def tcpip_serials(self) -> list[str]:
+        return list(self._state()["tcpip"])
+
+    def devices_l(self) -> str:
+        state = self._state()
+        lines, tid = [], 1
+        for d in self.scenario["devices"]:
+            lines.append(f"{d['serial']}\t{d['state']} usb:1-{tid} product:{d['product']} "
+                         f"model:{d['model']} device:{d['product']} transport_id:{tid}")
+            tid += 1
+        for d in self.scenario["devices"]:
+            target = f"{d['ip']}:5555"
+            if target in state["connected"]:
+                lines.append(f"{target}\tdevice product:{d['product']} model:{d['model']} "
+                             f"device:{d['product']} transport_id:{tid}")
+                tid += 1
+        return "".join(l + "\n" for l in lines)
+
+    def shell(self, device: dict, command: str) -> tuple[str, int]:
+        """Run a `;`-separated command line against the transcripts → (output, last exit code)."""
+        transcripts = self.scenario.get("shell", {})
+        out, rc = [], 0
+        for part in command.split(";"):
+            part = part.strip().replace("2>/dev/null", "").strip()
+            if not part:
+                continue
+            if part.startswith("echo "):
+                out.append(part[5:].replace("$?", str(rc)))
+                rc = 0
+            elif part in transcripts:
+                out.append(transcripts[part].format(**device))
+                rc = 0
+            elif part == "getprop | grep dhcp":
+                out.append(f"[dhcp.wlan0.ipaddress]: [{device['ip']}]")
+                rc = 0
+            elif part.startswith("sha256sum "):
+                path = part.split(None, 1)[1]
+                digest = self._state().get("pushed", {}).get(f"{device['serial']}:{path}")
+                if digest:
+                    out.append(f"{digest}  {path}")
+                rc = 0 if digest else 1
+            else:
+                rc = 1
+        return "".join(l + "\n" for l in out), rc
+
+    # ---------- mutations ----------
+
+    def tcpip(self, device: dict) -> bool:
+        if self.fails("tcpip"):
+            return False
+        with self._updating():
+            state = self._state()
+            if device["serial"] not in state["tcpip"]:
+                state["tcpip"].append(device["serial"])
+            self._save(state)
+        return True
+
+    def push(self, device: dict, local: str, remote: str) -> bool:
+        """Remember the sha256 of what landed on the device (what `sha256sum` answers)."""
+        if self.fails("push"):
+            return False
+        try:
+            with open(local, "rb") as f:
+                digest = hashlib.sha256(f.read()).hexdigest()
+        except OSError:
+            return False
+        with self._updating():
+            state = self._state()
+            state.setdefault("pushed", {})[f"{device['serial']}:{remote}"] = digest
+            self._save(state)
+        return True
+
+    def connect(self, target: str) -> str:
+        host = target.rsplit(":", 1)[0]
+        if ":" not in target:
+            target += ":5555"
+        with self._updating():
+            state = self._state()
+            d = next((d for d in self.scenario["devices"] if d["ip"] == host), None)
+            if d is None or d["serial"] not in state["tcpip"] or self.fails("connect"):
+                return f"failed to connect to '{target}': Connection refused"
+            if target in state["connected"]:
+                return f"already connected to {target}"
+            state["connected"].append(target)
+            self._save(state)
+        return f"connected to {target}"
+
+    def disconnect(self, target: str) -> str:
+        with self._updating():
+            state = self._state()
+            if target:
+                if target not in state["connected"]:
+                    return f"error: no such device '{target}'"
+                state["connected"].remove(target)
+            else:
+                state["connected"] = []
+            self._save(state)
+        return f"disconnected {target or 'everything'}"